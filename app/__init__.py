@@ -1,3 +1,8 @@
 # Telegram ID Finder | Telegram ID 查詢器
 # A web tool to find Telegram group/channel/user IDs
 # 網頁工具：取得 Telegram 群組、頻道、用戶 ID
+
+import time
+
+# When the package was first imported, for cold-start metrics | 套件首次匯入的時間，用於冷啟動指標
+STARTED_AT = time.perf_counter()
@@ -0,0 +1,432 @@
+"""
+Broker | Broker
+One process owning every Telegram connection, serving HTTP workers over a
+Unix socket.
+持有所有 Telegram 連線的單一程序，透過 Unix socket 服務 HTTP 工作程序。
+
+Each uvicorn worker would otherwise open its own client on the same session
+file and keep its own login state. With a broker, workers forward service
+calls over local IPC while HTTP, serialization and export scale across cores,
+and each account keeps exactly one MTProto connection.
+否則每個 uvicorn 工作程序都會以同一個 session 檔案開啟自己的客戶端並保有各自的登入狀態。
+使用 broker 時，工作程序經由本機 IPC 轉送服務呼叫，HTTP、序列化與匯出可擴展至多核心，
+而每個帳號只保持一條 MTProto 連線。
+
+Protocol: one JSON object per line in each direction. Requests carry an id
+chosen by the client; replies to a call are a single result or error frame,
+streams send item frames followed by an end frame. Results are tagged so
+models, enums and sets survive the round trip.
+協定：雙向皆為每行一個 JSON 物件。請求帶有客戶端選擇的 id；呼叫的回覆為單一結果或錯誤框，
+串流則送出多個項目框後接結束框。結果帶有標記，使模型、列舉與集合可完整往返。
+
+Usage | 用法:
+    python -m app.broker [--socket PATH]
+    TELEGRAM_BROKER_SOCKET=PATH uvicorn app.main:app --workers 4
+"""
+
+import os
+import json
+import signal
+import asyncio
+import argparse
+from dataclasses import fields, is_dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+from telethon.errors import FloodWaitError
+
+from . import metrics
+from .caches import Versioned
+from .models import (
+    AuthState,
+    ChatSendersResult,
+    DialogInfo,
+    DialogPage,
+    DialogType,
+    ResolvedPeer,
+    SenderActivity,
+    SenderInfo,
+)
+from .search_index import SearchHit
+from .serialization import json_bytes
+from .service_factory import create_session_pool
+from .session_pool import SessionPool, DEFAULT_KEY
+from .telegram_service import TelegramService
+
+try:
+    # Optional C accelerator | 選用的 C 加速器
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+
+# Largest frame accepted, in bytes | 可接受的最大框（位元組）
+FRAME_LIMIT = 64 * 1024 * 1024
+
+# Service coroutines and plain methods workers may call | 工作程序可呼叫的服務協程與一般方法
+CALLS = frozenset({
+    "send_code",
+    "verify_code",
+    "logout",
+    "get_status",
+    "is_authorized",
+    "get_dialogs",
+    "get_dialogs_versioned",
+    "get_dialogs_page",
+    "search",
+    "resolve",
+    "get_messages_senders",
+    "get_messages_senders_versioned",
+    "get_chat_senders",
+    "get_sender_activity",
+    "start_warm_up",
+})
+
+# Service async iterators workers may stream | 工作程序可串流的服務非同步迭代器
+STREAMS = frozenset({
+    "iter_dialogs",
+    "iter_messages_senders",
+    "iter_participants",
+    "scan_senders_batch",
+})
+
+
+# ============================================================================
+# Wire Format | 傳輸格式
+# ============================================================================
+
+# Types rebuilt by decode(), keyed by tag | decode() 重建的類型，以標記為鍵
+_TYPES = {
+    cls.__name__: cls for cls in (
+        AuthState,
+        ChatSendersResult,
+        DialogInfo,
+        DialogPage,
+        DialogType,
+        ResolvedPeer,
+        SearchHit,
+        SenderActivity,
+        SenderInfo,
+        Versioned,
+    )
+}
+
+# Field names per dataclass | 各 dataclass 的欄位名稱
+_FIELDS: dict[type, tuple[str, ...]] = {}
+
+
+def encode(value: Any) -> Any:
+    """
+    Convert a value to JSON-ready data, tagging models, enums and sets.
+    將值轉為可 JSON 化的資料，並標記模型、列舉與集合。
+
+    Tagged values are {"$": tag, "v": data}; models are sent as positional
+    field lists and datetimes as ISO 8601 strings. Tuples become lists.
+    帶標記的值為 {"$": 標記, "v": 資料}；模型以依序的欄位列表傳送，datetime 以 ISO 8601 字串傳送。
+    tuple 轉為列表。
+    """
+    if isinstance(value, Enum):
+        return {"$": type(value).__name__, "v": value.value}
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, datetime):
+        return {"$": "datetime", "v": value.isoformat()}
+    if isinstance(value, Versioned):
+        return {"$": "Versioned", "v": [encode(item) for item in value]}
+    if is_dataclass(value):
+        cls = type(value)
+        names = _FIELDS.get(cls)
+        if names is None:
+            names = _FIELDS[cls] = tuple(f.name for f in fields(cls))
+        return {"$": cls.__name__, "v": [encode(getattr(value, name)) for name in names]}
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return {"$": "set", "v": [encode(item) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: encode(item) for key, item in value.items()}
+        # JSON keys are strings; keep others as pairs | JSON 鍵為字串；其他鍵以配對保存
+        return {"$": "dict", "v": [[encode(key), encode(item)] for key, item in value.items()]}
+    raise TypeError(f"Cannot send {type(value).__name__} to the broker | 無法傳送 {type(value).__name__} 至 broker")
+
+
+def decode(data: Any) -> Any:
+    """
+    Rebuild a value produced by encode().
+    重建由 encode() 產生的值。
+    """
+    if isinstance(data, list):
+        return [decode(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+
+    tag = data.get("$")
+    if tag is None:
+        return {key: decode(item) for key, item in data.items()}
+    if tag == "set":
+        return {decode(item) for item in data["v"]}
+    if tag == "dict":
+        return {decode(key): decode(item) for key, item in data["v"]}
+    if tag == "datetime":
+        return datetime.fromisoformat(data["v"])
+
+    cls = _TYPES[tag]
+    if issubclass(cls, Enum):
+        return cls(data["v"])
+    return cls(*(decode(item) for item in data["v"]))
+
+
+def dump_frame(message: dict) -> bytes:
+    """Encode one protocol frame | 編碼一個協定框"""
+    return json_bytes(message) + b"\n"
+
+
+def load_frame(line: bytes) -> dict:
+    """Decode one protocol frame | 解碼一個協定框"""
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def error_to_dict(error: BaseException) -> dict:
+    """
+    Describe an exception for the client to raise again.
+    描述例外，供客戶端重新拋出。
+    """
+    data = {"type": type(error).__name__, "message": str(error)}
+    if isinstance(error, FloodWaitError):
+        data["seconds"] = error.seconds
+    return data
+
+
+# ============================================================================
+# Server | 伺服器
+# ============================================================================
+
+class BrokerServer:
+    """
+    Serves a SessionPool to HTTP workers over a Unix socket.
+    透過 Unix socket 向 HTTP 工作程序提供 SessionPool。
+    """
+
+    def __init__(self, pool: SessionPool):
+        """
+        Initialize the broker.
+        初始化 broker。
+
+        Args:
+            pool: Pool owning the Telegram connections | 持有 Telegram 連線的池
+        """
+        self.pool = pool
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Open worker connections and their handlers | 開啟中的工作程序連線及其處理器
+        self._connections: dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self.path: Optional[str] = None
+
+    async def start(self, path: str) -> None:
+        """
+        Listen on a Unix socket only the current user can open.
+        於僅目前使用者可開啟的 Unix socket 上監聽。
+        """
+        self.path = path
+        # Sockets are created with the process umask | socket 以程序 umask 建立
+        umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(self._serve_connection, path, limit=FRAME_LIMIT)
+        finally:
+            os.umask(umask)
+
+    async def close(self) -> None:
+        """Stop listening and remove the socket | 停止監聽並移除 socket"""
+        if self._server is not None:
+            self._server.close()
+            # Handlers end once their sockets close | socket 關閉後處理器即結束
+            handlers = list(self._connections.values())
+            for writer in list(self._connections):
+                writer.close()
+            if handlers:
+                await asyncio.wait(handlers)
+            await self._server.wait_closed()
+            self._server = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Run every request of one worker connection concurrently.
+        並行執行單一工作程序連線的所有請求。
+        """
+        tasks: dict[int, asyncio.Task] = {}
+        self._connections[writer] = asyncio.current_task()
+
+        async def send(message: dict) -> None:
+            writer.write(dump_frame(message))
+            await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                frame = load_frame(line)
+                request_id = frame["id"]
+                if frame["op"] == "cancel":
+                    # The worker stopped reading a stream | 工作程序已停止讀取串流
+                    task = tasks.get(request_id)
+                    if task is not None:
+                        task.cancel()
+                    continue
+
+                task = asyncio.create_task(self._serve_request(frame, send))
+                tasks[request_id] = task
+                task.add_done_callback(lambda _, request_id=request_id: tasks.pop(request_id, None))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for task in list(tasks.values()):
+                task.cancel()
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _serve_request(self, frame: dict, send) -> None:
+        """
+        Answer one request, reporting failures to the worker.
+        回應單一請求，並向工作程序回報失敗。
+        """
+        request_id = frame["id"]
+        try:
+            op = frame["op"]
+            key = frame.get("key")
+            args = decode(frame.get("args", []))
+            kwargs = decode(frame.get("kwargs", {}))
+
+            if op == "stream":
+                if frame["method"] not in STREAMS:
+                    raise ValueError(f"Unknown stream {frame['method']} | 未知的串流 {frame['method']}")
+                service = await self._service(key)
+                try:
+                    async for item in getattr(service, frame["method"])(*args, **kwargs):
+                        await send({"id": request_id, "item": encode(item)})
+                    await send({"id": request_id, "end": True, "state": service_state(service)})
+                finally:
+                    await self.pool.release(key)
+                return
+
+            reply = {"id": request_id}
+            if op == "call":
+                if frame["method"] not in CALLS:
+                    raise ValueError(f"Unknown method {frame['method']} | 未知的方法 {frame['method']}")
+                service = await self._service(key)
+                try:
+                    result = getattr(service, frame["method"])(*args, **kwargs)
+                    if asyncio.iscoroutine(result):
+                        result = await result
+                    reply["result"] = encode(result)
+                    reply["state"] = service_state(service)
+                finally:
+                    await self.pool.release(key)
+            elif op == "get":
+                service = await self.pool.get(key)
+                reply["result"] = None if service is None else service_state(service)
+            elif op == "create":
+                reply["result"] = service_state(await self.pool.create(key, *args))
+            elif op == "register":
+                self.pool.register(key, *args)
+            elif op == "remove":
+                await self.pool.remove(key)
+            elif op == "stats":
+                service = await self.pool.get(key) if key else None
+                stats = {"pool": self.pool.stats()}
+                if service is not None:
+                    stats.update(service.get_stats())
+                reply["result"] = encode(stats)
+            elif op == "metrics":
+                reply["result"] = metrics.telegram_lines(
+                    self.pool.stats(),
+                    [service.get_stats() for service in self.pool.live_services()]
+                )
+            else:
+                raise ValueError(f"Unknown operation {op} | 未知的操作 {op}")
+            await send(reply)
+        except asyncio.CancelledError:
+            raise
+        except ConnectionError:
+            # The worker went away | 工作程序已離開
+            pass
+        except Exception as e:
+            try:
+                await send({"id": request_id, "error": error_to_dict(e)})
+            except ConnectionError:
+                pass
+
+    async def _service(self, key: str) -> TelegramService:
+        """
+        Get and hold a key's service, restoring it if evicted; the caller releases it.
+        取得並持有鍵對應的服務，若已被淘汰則還原；由呼叫端釋放。
+        """
+        service = await self.pool.acquire(key)
+        if service is None:
+            raise LookupError(f"Unknown session {key} | 未知的 session {key}")
+        return service
+
+
+def service_state(service: TelegramService) -> dict:
+    """
+    State workers mirror locally after each reply.
+    工作程序於每次回覆後在本機同步的狀態。
+    """
+    return {
+        "instance_id": service.instance_id,
+        "connected": service.is_connected(),
+        "auth": encode(service.auth_state),
+    }
+
+
+# ============================================================================
+# Entry Point | 程式進入點
+# ============================================================================
+
+async def serve(path: str) -> None:
+    """
+    Run the broker until SIGINT or SIGTERM.
+    執行 broker 直到收到 SIGINT 或 SIGTERM。
+    """
+    pool = create_session_pool()
+    api_id = os.getenv("TELEGRAM_API_ID")
+    api_hash = os.getenv("TELEGRAM_API_HASH")
+    if api_id and api_hash:
+        # Connected on the first worker request | 於第一個工作程序請求時連線
+        pool.register(DEFAULT_KEY, int(api_id), api_hash)
+    pool.start()
+
+    broker = BrokerServer(pool)
+    await broker.start(path)
+    print(f"Broker listening on {path} | Broker 監聽於 {path}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await stop.wait()
+
+    await broker.close()
+    # Saves sessions and closes indexes | 儲存 session 並關閉索引
+    await pool.close()
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Telegram connection broker | Telegram 連線 broker")
+    parser.add_argument(
+        "--socket",
+        default=os.getenv("TELEGRAM_BROKER_SOCKET"),
+        help="Unix socket path (default: TELEGRAM_BROKER_SOCKET) | Unix socket 路徑（預設：TELEGRAM_BROKER_SOCKET）"
+    )
+    args = parser.parse_args()
+    if not args.socket:
+        parser.error("--socket or TELEGRAM_BROKER_SOCKET is required | 需要 --socket 或 TELEGRAM_BROKER_SOCKET")
+    asyncio.run(serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
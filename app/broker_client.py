@@ -0,0 +1,418 @@
+"""
+Broker Client | Broker 客戶端
+Session pool and service stand-ins that forward calls to the broker.
+將呼叫轉送至 broker 的 session 池與服務替代品。
+
+HTTP workers use these when TELEGRAM_BROKER_SOCKET is set. They offer the
+methods app.main calls, so routes work unchanged; all requests of a worker
+share one multiplexed socket connection, reopened after the broker restarts.
+設定 TELEGRAM_BROKER_SOCKET 時，HTTP 工作程序使用這些類別。它們提供 app.main 呼叫的方法，
+因此路由無需修改；同一工作程序的所有請求共用一條多工 socket 連線，broker 重新啟動後會重新開啟。
+"""
+
+import asyncio
+import itertools
+from typing import AsyncIterator, Optional
+
+from telethon.errors import FloodWaitError
+
+from .broker import FRAME_LIMIT, decode, dump_frame, encode, load_frame
+from .models import AuthState
+
+
+class BrokerError(RuntimeError):
+    """A call failed inside the broker | broker 內的呼叫失敗"""
+
+
+class BrokerUnavailableError(BrokerError):
+    """The broker could not be reached | 無法連線至 broker"""
+
+
+def _check(frame: Optional[dict]) -> dict:
+    """
+    Raise the error carried by a reply frame.
+    拋出回覆框中帶有的錯誤。
+    """
+    if frame is None:
+        raise BrokerUnavailableError("Broker connection lost | Broker 連線中斷")
+
+    error = frame.get("error")
+    if error is None:
+        return frame
+    if error["type"] == "FloodWaitError":
+        raise FloodWaitError(request=None, capture=error["seconds"])
+    if error["type"] == "ValueError":
+        # Routes turn these into 400 responses | 路由會將其轉為 400 回應
+        raise ValueError(error["message"])
+    raise BrokerError(f"{error['type']}: {error['message']}")
+
+
+# ============================================================================
+# Connection | 連線
+# ============================================================================
+
+class _Connection:
+    """
+    One socket to the broker, shared by concurrent requests.
+    與 broker 之間由並行請求共用的單一 socket。
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        # Reply queue per request; None marks a lost connection | 每個請求的回覆佇列；None 表示連線中斷
+        self._pending: dict[int, asyncio.Queue] = {}
+        self.closed = False
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def call(self, frame: dict) -> dict:
+        """Send a request and wait for its reply | 送出請求並等待回覆"""
+        request_id, queue = await self._send(frame)
+        try:
+            return _check(await queue.get())
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def stream(self, frame: dict) -> AsyncIterator[dict]:
+        """
+        Send a request and yield its frames through the end frame.
+        送出請求並產出其各框，直到結束框。
+
+        Stopping early cancels the stream in the broker.
+        提前停止時會取消 broker 中的串流。
+        """
+        request_id, queue = await self._send(frame)
+        finished = False
+        try:
+            while not finished:
+                reply = _check(await queue.get())
+                finished = "item" not in reply
+                yield reply
+        finally:
+            self._pending.pop(request_id, None)
+            if not finished and not self.closed:
+                self._writer.write(dump_frame({"id": request_id, "op": "cancel"}))
+
+    def close(self) -> None:
+        """Close the socket | 關閉 socket"""
+        self._reader_task.cancel()
+        self._writer.close()
+
+    async def _send(self, frame: dict) -> tuple[int, asyncio.Queue]:
+        """Assign an ID and write a request | 指派 ID 並寫入請求"""
+        if self.closed:
+            raise BrokerUnavailableError("Broker connection lost | Broker 連線中斷")
+        request_id = next(self._ids)
+        queue = self._pending[request_id] = asyncio.Queue()
+        try:
+            self._writer.write(dump_frame({"id": request_id, **frame}))
+            await self._writer.drain()
+        except ConnectionError as e:
+            self._pending.pop(request_id, None)
+            raise BrokerUnavailableError(f"Broker connection lost: {e} | Broker 連線中斷：{e}") from e
+        return request_id, queue
+
+    async def _read_loop(self) -> None:
+        """Route reply frames to their requests | 將回覆框分派至對應的請求"""
+        try:
+            while line := await self._reader.readline():
+                frame = load_frame(line)
+                queue = self._pending.get(frame["id"])
+                if queue is not None:
+                    queue.put_nowait(frame)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self.closed = True
+            for queue in self._pending.values():
+                queue.put_nowait(None)
+
+
+# ============================================================================
+# Remote Service | 遠端服務
+# ============================================================================
+
+def _forward(name: str):
+    """Build a method forwarding a TelegramService coroutine | 建立轉送 TelegramService 協程的方法"""
+    async def method(self, *args, **kwargs):
+        return await self._call(name, args, kwargs)
+
+    method.__name__ = name
+    method.__doc__ = f"Forward TelegramService.{name} | 轉送 TelegramService.{name}"
+    return method
+
+
+def _forward_stream(name: str):
+    """Build a method forwarding a TelegramService async iterator | 建立轉送 TelegramService 非同步迭代器的方法"""
+    def method(self, *args, **kwargs):
+        return self._stream(name, args, kwargs)
+
+    method.__name__ = name
+    method.__doc__ = f"Forward TelegramService.{name} | 轉送 TelegramService.{name}"
+    return method
+
+
+class RemoteTelegramService:
+    """
+    Worker-side stand-in for a TelegramService living in the broker.
+    位於 broker 中之 TelegramService 的工作程序端替代品。
+
+    Connection, login state and instance ID are mirrored from every reply,
+    so they can be read without a round trip.
+    連線、登入狀態與實例 ID 由每次回覆同步，因此讀取時無需往返。
+    """
+
+    def __init__(self, pool: "RemoteSessionPool", key: str):
+        self._pool = pool
+        self.key = key
+        self.instance_id = ""
+        self._connected = False
+        self._auth_state = AuthState()
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def auth_state(self) -> AuthState:
+        """Last known authentication state | 最後已知的認證狀態"""
+        return self._auth_state
+
+    def is_connected(self) -> bool:
+        """Whether the broker and its client were connected at the last reply | 上次回覆時 broker 與其客戶端是否已連線"""
+        return self._pool.connected and self._connected
+
+    send_code = _forward("send_code")
+    verify_code = _forward("verify_code")
+    logout = _forward("logout")
+    get_status = _forward("get_status")
+    is_authorized = _forward("is_authorized")
+    get_dialogs = _forward("get_dialogs")
+    get_dialogs_versioned = _forward("get_dialogs_versioned")
+    get_dialogs_page = _forward("get_dialogs_page")
+    search = _forward("search")
+    resolve = _forward("resolve")
+    get_messages_senders = _forward("get_messages_senders")
+    get_messages_senders_versioned = _forward("get_messages_senders_versioned")
+    get_chat_senders = _forward("get_chat_senders")
+    get_sender_activity = _forward("get_sender_activity")
+
+    iter_dialogs = _forward_stream("iter_dialogs")
+    iter_messages_senders = _forward_stream("iter_messages_senders")
+    iter_participants = _forward_stream("iter_participants")
+    scan_senders_batch = _forward_stream("scan_senders_batch")
+
+    def cached_dialogs(self) -> None:
+        """
+        Caches live in the broker; callers fall back to the async calls.
+        快取位於 broker；呼叫者會退回非同步呼叫。
+        """
+        return None
+
+    def get_cached_senders(self, *args, **kwargs) -> None:
+        """
+        Caches live in the broker; callers fall back to the async calls.
+        快取位於 broker；呼叫者會退回非同步呼叫。
+        """
+        return None
+
+    def start_warm_up(self, *args, **kwargs) -> None:
+        """
+        Ask the broker to warm caches without waiting.
+        要求 broker 預熱快取而不等待。
+        """
+        task = asyncio.create_task(self._call("start_warm_up", args, kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def update(self, state: dict) -> None:
+        """Mirror the state sent by the broker | 同步 broker 送來的狀態"""
+        self.instance_id = state["instance_id"]
+        self._connected = state["connected"]
+        self._auth_state = decode(state["auth"])
+
+    async def _call(self, method: str, args: tuple, kwargs: dict):
+        """Call a service method in the broker | 呼叫 broker 中的服務方法"""
+        reply = await self._pool.request("call", self.key, method=method, args=args, kwargs=kwargs)
+        self.update(reply["state"])
+        return decode(reply["result"])
+
+    async def _stream(self, method: str, args: tuple, kwargs: dict):
+        """Iterate a service async iterator in the broker | 迭代 broker 中的服務非同步迭代器"""
+        connection = await self._pool.connection()
+        frames = connection.stream({
+            "op": "stream",
+            "key": self.key,
+            "method": method,
+            "args": encode(args),
+            "kwargs": encode(kwargs),
+        })
+        async for frame in frames:
+            if "item" in frame:
+                yield decode(frame["item"])
+            else:
+                self.update(frame["state"])
+
+
+# ============================================================================
+# Remote Pool | 遠端池
+# ============================================================================
+
+class RemoteSessionPool:
+    """
+    Worker-side stand-in for the broker's SessionPool.
+    broker 之 SessionPool 的工作程序端替代品。
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the remote pool; the socket is opened on first use.
+        初始化遠端池；socket 於首次使用時開啟。
+
+        Args:
+            path: Broker Unix socket | Broker 的 Unix socket
+        """
+        self.path = path
+        self._connection: Optional[_Connection] = None
+        self._connect_lock = asyncio.Lock()
+        # Sent again whenever the socket is reopened | 每次重新開啟 socket 時再次送出
+        self._credentials: dict[str, tuple[int, str]] = {}
+        self._services: dict[str, RemoteTelegramService] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def connected(self) -> bool:
+        """Whether the socket to the broker is open | 與 broker 的 socket 是否開啟"""
+        return self._connection is not None and not self._connection.closed
+
+    async def connection(self) -> _Connection:
+        """
+        Get the broker connection, opening it if needed.
+        取得 broker 連線，必要時開啟。
+        """
+        if self.connected:
+            return self._connection
+
+        async with self._connect_lock:
+            if not self.connected:
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.path, limit=FRAME_LIMIT)
+                except OSError as e:
+                    raise BrokerUnavailableError(
+                        f"Broker unavailable at {self.path}: {e} | 無法連線至 {self.path} 的 broker：{e}"
+                    ) from e
+                connection = _Connection(reader, writer)
+                for key, (api_id, api_hash) in self._credentials.items():
+                    await connection.call({"op": "register", "key": key, "args": [api_id, api_hash]})
+                self._connection = connection
+        return self._connection
+
+    async def request(
+        self,
+        op: str,
+        key: Optional[str] = None,
+        method: Optional[str] = None,
+        args: tuple = (),
+        kwargs: Optional[dict] = None
+    ) -> dict:
+        """
+        Send one request to the broker and return its reply frame.
+        向 broker 送出單一請求並回傳其回覆框。
+        """
+        frame = {"op": op, "key": key, "args": encode(args), "kwargs": encode(kwargs or {})}
+        if method is not None:
+            frame["method"] = method
+        connection = await self.connection()
+        return await connection.call(frame)
+
+    # ==================== SessionPool API | SessionPool 介面 ====================
+
+    def register(self, key: str, api_id: int, api_hash: str) -> None:
+        """
+        Remember credentials and register them with the broker.
+        記住憑證並向 broker 註冊。
+        """
+        self._credentials[key] = (api_id, api_hash)
+        if self.connected:
+            task = asyncio.create_task(self.request("register", key, args=(api_id, api_hash)))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def is_registered(self, key: str) -> bool:
+        """Whether credentials are known for a key | 鍵是否有已知憑證"""
+        return key in self._credentials or key in self._services
+
+    def peek(self, key: str) -> Optional[RemoteTelegramService]:
+        """Get a key's mirrored service without a round trip | 取得鍵對應的同步服務，無需往返"""
+        return self._services.get(key)
+
+    async def get(self, key: str) -> Optional[RemoteTelegramService]:
+        """
+        Get the service for a key; the broker restores evicted ones.
+        取得鍵對應的服務；broker 會還原已淘汰者。
+        """
+        state = (await self.request("get", key))["result"]
+        if state is None:
+            self._services.pop(key, None)
+            return None
+        return self._mirror(key, state)
+
+    async def acquire(self, key: str) -> Optional[RemoteTelegramService]:
+        """
+        Same as get(); the broker holds services while it serves each call.
+        與 get() 相同；broker 在處理每個呼叫時持有服務。
+        """
+        return await self.get(key)
+
+    async def release(self, key: str) -> None:
+        """Nothing is held in the worker | 工作程序端不持有任何服務"""
+
+    async def create(self, key: str, api_id: int, api_hash: str) -> RemoteTelegramService:
+        """
+        Create (or replace) the service for a key with new credentials.
+        以新憑證建立（或取代）鍵對應的服務。
+        """
+        self._credentials[key] = (api_id, api_hash)
+        state = (await self.request("create", key, args=(api_id, api_hash)))["result"]
+        return self._mirror(key, state)
+
+    async def remove(self, key: str) -> None:
+        """
+        Disconnect a key's service and forget its credentials.
+        中斷鍵對應服務的連線並忘記其憑證。
+        """
+        self._credentials.pop(key, None)
+        self._services.pop(key, None)
+        await self.request("remove", key)
+
+    def start(self) -> None:
+        """Idle clients are reaped by the broker | 閒置客戶端由 broker 回收"""
+
+    async def close(self) -> None:
+        """Close the broker connection; services stay up | 關閉 broker 連線；服務保持運作"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    # ==================== Broker Statistics | Broker 統計 ====================
+
+    async def fetch_stats(self, service: Optional[RemoteTelegramService]) -> dict:
+        """
+        Get the broker's pool statistics and a service's cache statistics.
+        取得 broker 的池統計與服務的快取統計。
+        """
+        reply = await self.request("stats", service.key if service is not None else None)
+        return decode(reply["result"])
+
+    async def fetch_metrics(self) -> list[str]:
+        """
+        Get Telegram metrics recorded by the broker.
+        取得 broker 記錄的 Telegram 指標。
+        """
+        return (await self.request("metrics"))["result"]
+
+    def _mirror(self, key: str, state: dict) -> RemoteTelegramService:
+        """Get or create a key's mirrored service | 取得或建立鍵對應的同步服務"""
+        service = self._services.get(key)
+        if service is None:
+            service = self._services[key] = RemoteTelegramService(self, key)
+        service.update(state)
+        return service
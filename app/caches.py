@@ -0,0 +1,361 @@
+"""
+Caches | 快取
+In-process caches used by TelegramService to avoid repeated Telegram RPCs.
+TelegramService 使用的程序內快取，避免重複呼叫 Telegram RPC。
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, NamedTuple, Optional
+
+from .models import DialogInfo, SenderInfo
+from .search_index import SearchIndex
+
+
+class Versioned(NamedTuple):
+    """A cached value with the version it was read at | 帶有讀取時版本的快取值"""
+    version: int
+    # Wall-clock time of the last change | 最後變更的實際時間
+    modified_at: float
+    value: Any
+
+
+class DialogCache:
+    """
+    Dialog list cache with TTL and incremental updates.
+    具 TTL 與增量更新的對話列表快取。
+
+    Entries keep the order returned by Telegram (most recent activity first).
+    項目保留 Telegram 回傳的順序（最近活動在前）。
+    """
+
+    def __init__(self, ttl: float = 600.0, search_index: Optional[SearchIndex] = None):
+        """
+        Initialize the dialog cache.
+        初始化對話快取。
+
+        Args:
+            ttl: Seconds before a full re-fetch is required | 需要完整重新取得前的秒數
+            search_index: Index kept in step with every change | 隨每次變更同步的索引
+        """
+        self.ttl = ttl
+        self.search_index = search_index
+        self._entries: "OrderedDict[int, DialogInfo]" = OrderedDict()
+        self._loaded_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+        # Bumped on every change | 每次變更時遞增
+        self.version = 0
+        self.modified_at = time.time()
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether a full dialog list is held | 是否持有完整對話列表"""
+        return self._loaded_at is not None
+
+    def is_fresh(self) -> bool:
+        """Whether the cached list is within its TTL | 快取列表是否在 TTL 內"""
+        if self._loaded_at is None:
+            return False
+        return time.monotonic() - self._loaded_at < self.ttl
+
+    def get(self) -> Optional[list[DialogInfo]]:
+        """
+        Get the cached dialogs, counting a hit or miss.
+        取得快取的對話，並計算命中或未命中。
+
+        Returns:
+            List of DialogInfo, or None if stale | DialogInfo 列表，過期則為 None
+        """
+        if self.is_fresh():
+            self.hits += 1
+            return list(self._entries.values())
+        self.misses += 1
+        return None
+
+    def snapshot(self, require_fresh: bool = True) -> Optional[Versioned]:
+        """
+        Get the cached dialogs together with their version.
+        取得快取的對話及其版本。
+
+        Counts a hit when served; a miss is counted by the fetch that follows.
+        回應時計為命中；未命中由隨後的取得計算。
+
+        Args:
+            require_fresh: Only return a list within its TTL | 只回傳 TTL 內的列表
+        """
+        if not self.is_loaded or (require_fresh and not self.is_fresh()):
+            return None
+        if require_fresh:
+            self.hits += 1
+        return Versioned(self.version, self.modified_at, list(self._entries.values()))
+
+    def set(self, dialogs: list[DialogInfo]) -> None:
+        """Replace the cached list | 取代快取列表"""
+        # An identical re-fetch keeps the version | 相同的重新取得保留版本
+        unchanged = self.is_loaded and list(self._entries.values()) == dialogs
+        self._entries = OrderedDict((d.id, d) for d in dialogs)
+        self._loaded_at = time.monotonic()
+        if not unchanged:
+            self._changed()
+            if self.search_index is not None:
+                self.search_index.set_dialogs(dialogs)
+
+    def upsert(self, dialog: DialogInfo) -> None:
+        """
+        Insert or replace a dialog, moving it to the front.
+        插入或取代對話，並移至最前。
+        """
+        if not self.is_loaded:
+            return
+        self._entries[dialog.id] = dialog
+        self._entries.move_to_end(dialog.id, last=False)
+        self._changed()
+        if self.search_index is not None:
+            self.search_index.upsert_dialog(dialog)
+
+    def rename(self, dialog_id: int, name: str) -> None:
+        """
+        Update a dialog's title, keeping its position.
+        更新對話標題並保留其位置。
+
+        The entry is replaced rather than changed, so lists already handed
+        out keep the names their version was computed from.
+        項目以取代而非修改的方式更新，因此已交出的列表保留其版本所依據的名稱。
+        """
+        dialog = self._entries.get(dialog_id)
+        if dialog is None or dialog.name == name:
+            return
+        dialog = self._entries[dialog_id] = replace(dialog, name=name)
+        self._changed()
+        if self.search_index is not None:
+            self.search_index.upsert_dialog(dialog)
+
+    def remove(self, dialog_id: int) -> None:
+        """Remove a dialog (left, kicked or migrated) | 移除對話（離開、被踢或遷移）"""
+        if self._entries.pop(dialog_id, None) is not None:
+            self._changed()
+            if self.search_index is not None:
+                self.search_index.remove_dialog(dialog_id)
+
+    def invalidate(self) -> None:
+        """Drop all cached dialogs | 清除所有快取對話"""
+        self._entries.clear()
+        self._loaded_at = None
+        self._changed()
+        if self.search_index is not None:
+            self.search_index.clear_dialogs()
+
+    def _changed(self) -> None:
+        """Bump the version | 遞增版本"""
+        self.version += 1
+        self.modified_at = time.time()
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+        取得快取統計。
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "ttl": self.ttl,
+            "fresh": self.is_fresh(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "version": self.version,
+        }
+
+
+class EntityCache:
+    """
+    Bounded LRU cache of resolved entities keyed by peer ID.
+    以 peer ID 為鍵、有上限的已解析實體 LRU 快取。
+
+    Entries are stored as SenderInfo (display name, username, bot flag) and
+    shared by callers, so they must not be mutated.
+    項目以 SenderInfo（顯示名稱、用戶名、機器人旗標）儲存並由呼叫者共用，不得修改。
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = None):
+        """
+        Initialize the entity cache.
+        初始化實體快取。
+
+        Args:
+            max_size: Maximum entries before LRU eviction | LRU 淘汰前的最大項目數
+            ttl: Optional seconds before an entry expires | 項目過期前的秒數（選用）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple[float, SenderInfo]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, peer_id: int) -> Optional[SenderInfo]:
+        """
+        Get a cached entity, refreshing its LRU position.
+        取得快取實體並更新其 LRU 位置。
+        """
+        entry = self._entries.get(peer_id)
+        if entry is not None:
+            stored_at, info = entry
+            if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                self._entries.move_to_end(peer_id)
+                self.hits += 1
+                return info
+            del self._entries[peer_id]
+
+        self.misses += 1
+        return None
+
+    def put(self, peer_id: int, info: SenderInfo) -> None:
+        """
+        Store an entity, evicting the least recently used over max_size.
+        儲存實體，超過 max_size 時淘汰最久未使用者。
+        """
+        self._entries[peer_id] = (time.monotonic(), info)
+        self._entries.move_to_end(peer_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached entities | 清除所有快取實體"""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+        取得快取統計。
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+@dataclass(slots=True)
+class SenderScan:
+    """
+    Result of a complete message scan of one chat.
+    單一聊天完整訊息掃描的結果。
+
+    positions[i] is the 1-based index of the message where senders[i] was
+    first seen, so shorter scans and stop conditions can be replayed.
+    positions[i] 為 senders[i] 首次出現之訊息的序號（從 1 起算），
+    因此可重播較短的掃描與停止條件。
+    """
+    senders: list[SenderInfo]
+    positions: list[int]
+    # Messages scanned | 已掃描的訊息數
+    messages: int
+    # Whether the scan reached the start of the chat | 掃描是否已到達聊天開頭
+    exhausted: bool
+    stored_at: float = 0.0
+    # Per-chat version, unchanged when a re-scan finds the same senders
+    # 每聊天版本，重新掃描找到相同發送者時不變
+    version: int = 0
+    modified_at: float = 0.0
+
+
+class SenderCache:
+    """
+    Per-chat cache of recent sender scans with TTL.
+    具 TTL 的每聊天最近發送者掃描快取。
+    """
+
+    def __init__(self, ttl: float = 300.0, max_chats: int = 256):
+        """
+        Initialize the sender cache.
+        初始化發送者快取。
+
+        Args:
+            ttl: Seconds a scan stays usable (0 disables the cache) | 掃描可用的秒數（0 停用快取）
+            max_chats: Maximum chats kept before LRU eviction | LRU 淘汰前保留的最大聊天數
+        """
+        self.ttl = ttl
+        self.max_chats = max_chats
+        self._entries: "OrderedDict[int, SenderScan]" = OrderedDict()
+        # Outlive their scans so re-scans can keep the version | 比掃描存活更久，使重新掃描可保留版本
+        self._versions: dict[int, tuple[int, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chat_id: int, limit: int, count_miss: bool = True) -> Optional[SenderScan]:
+        """
+        Get a fresh scan covering the latest `limit` messages.
+        取得涵蓋最新 `limit` 則訊息的新鮮掃描。
+
+        Args:
+            count_miss: Count a miss (off when a counted scan follows)
+                        | 計算未命中（隨後有計數的掃描時關閉）
+        """
+        scan = self._entries.get(chat_id)
+        if scan is not None and time.monotonic() - scan.stored_at < self.ttl:
+            if scan.exhausted or scan.messages >= limit:
+                self._entries.move_to_end(chat_id)
+                self.hits += 1
+                return scan
+        if count_miss:
+            self.misses += 1
+        return None
+
+    def put(self, chat_id: int, scan: SenderScan) -> None:
+        """
+        Store a scan unless a fresh one already covers more messages.
+        儲存掃描，除非已有涵蓋更多訊息的新鮮掃描。
+        """
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        current = self._entries.get(chat_id)
+        if (
+            current is not None
+            and now - current.stored_at < self.ttl
+            and (current.exhausted or current.messages > scan.messages)
+        ):
+            return
+
+        version, modified_at = self._versions.get(chat_id, (0, 0.0))
+        if current is None or (current.senders, current.positions) != (scan.senders, scan.positions):
+            version, modified_at = version + 1, time.time()
+            self._versions[chat_id] = (version, modified_at)
+
+        scan.stored_at = now
+        scan.version = version
+        scan.modified_at = modified_at
+        self._entries[chat_id] = scan
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self.max_chats:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, chat_id: Optional[int] = None) -> None:
+        """Drop one chat's scan, or all of them | 清除單一聊天的掃描或全部"""
+        if chat_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(chat_id, None)
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+        取得快取統計。
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
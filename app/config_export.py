@@ -0,0 +1,216 @@
+"""
+Config Export | 設定匯出
+Builds telegram-signal-parser settings from selected chats and senders.
+由選取的聊天與發送者建立 telegram-signal-parser 設定。
+
+Output is produced chat by chat, so large configs can be streamed without
+building the whole document first. YAML uses the libyaml C emitter when
+PyYAML was built with it.
+輸出逐一聊天產生，大型設定可直接串流而不需先建立整份文件。
+YAML 在 PyYAML 具備 libyaml 時使用其 C 發射器。
+"""
+
+import json
+from itertools import islice
+from typing import Iterable, Iterator
+
+
+# Supported output formats and their media types | 支援的輸出格式與媒體類型
+FORMATS = {
+    "yaml": "application/yaml",
+    "json": "application/json",
+    "toml": "application/toml",
+}
+
+# Chats emitted per YAML dump call | 每次 YAML dump 呼叫輸出的聊天數
+_YAML_BATCH = 500
+
+# PyYAML's default line width | PyYAML 預設行寬
+_YAML_WIDTH = 80
+
+
+def iter_chat_configs(chats: list[dict], senders: list[dict]) -> Iterator[dict]:
+    """
+    Yield one config entry per chat with its selected senders.
+    為每個聊天產出一個設定項目，含其選取的發送者。
+
+    Args:
+        chats: List of {id, name} | {id, name} 列表
+        senders: List of {id, name, chat_id} | {id, name, chat_id} 列表
+
+    Yields:
+        {id, name[, senders]} dicts | {id, name[, senders]} 字典
+    """
+    # Group senders by chat | 按聊天分組發送者
+    senders_by_chat: dict = {}
+    for sender in senders:
+        senders_by_chat.setdefault(sender.get("chat_id"), []).append({
+            "id": sender["id"],
+            "name": sender.get("name", "")
+        })
+
+    for chat in chats:
+        chat_config = {
+            "id": chat["id"],
+            "name": chat.get("name", ""),
+        }
+
+        # Add senders if any selected for this chat
+        # 如果此聊天有選擇的發送者則加入
+        chat_senders = senders_by_chat.get(chat["id"])
+        if chat_senders:
+            chat_config["senders"] = chat_senders
+
+        yield chat_config
+
+
+def build_config(chats: list[dict], senders: list[dict]) -> dict:
+    """
+    Build the full config structure.
+    建立完整設定結構。
+    """
+    return {
+        "telegram": {
+            "chats": list(iter_chat_configs(chats, senders))
+        }
+    }
+
+
+def iter_export(chat_configs: Iterable[dict], fmt: str = "yaml") -> Iterator[str]:
+    """
+    Serialize chat configs incrementally.
+    逐步序列化聊天設定。
+
+    Joining the chunks gives the same document as serializing build_config()
+    (byte for byte, except that libyaml escapes some non-BMP characters).
+    串接所有片段等同於序列化 build_config() 的文件
+    （逐位元組相同，僅 libyaml 會跳脫部分非 BMP 字元）。
+
+    Args:
+        chat_configs: Chat config entries | 聊天設定項目
+        fmt: "yaml", "json" or "toml" | "yaml"、"json" 或 "toml"
+
+    Yields:
+        Text chunks | 文字片段
+    """
+    if fmt == "yaml":
+        return _iter_yaml(chat_configs)
+    if fmt == "json":
+        return _iter_json(chat_configs)
+    if fmt == "toml":
+        return _iter_toml(chat_configs)
+    raise ValueError(f"Unknown format: {fmt} | 未知的格式：{fmt}")
+
+
+def export(chat_configs: Iterable[dict], fmt: str = "yaml") -> str:
+    """
+    Serialize chat configs to a single string.
+    將聊天設定序列化為單一字串。
+    """
+    return "".join(iter_export(chat_configs, fmt))
+
+
+def _iter_yaml(chat_configs: Iterable[dict]) -> Iterator[str]:
+    """
+    Emit YAML in batches of chats, indented under telegram.chats.
+    以批次輸出聊天的 YAML，縮排於 telegram.chats 之下。
+    """
+    # Imported on first use to keep startup fast | 首次使用時才匯入，以加快啟動
+    import yaml
+
+    # Prefer the C emitter | 優先使用 C 發射器
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+    chat_configs = iter(chat_configs)
+    batch = list(islice(chat_configs, _YAML_BATCH))
+    if not batch:
+        yield "telegram:\n  chats: []\n"
+        return
+
+    yield "telegram:\n  chats:\n"
+    while batch:
+        text = yaml.dump(
+            batch,
+            Dumper=dumper,
+            allow_unicode=True,
+            default_flow_style=False,
+            sort_keys=False,
+            # Lines gain two spaces of indent below | 下方會多加兩格縮排
+            width=_YAML_WIDTH - 2
+        )
+        yield "".join(
+            # Blank lines inside multi-line scalars stay empty | 多行純量中的空行保持空白
+            line if line == "\n" else "  " + line
+            for line in text.splitlines(keepends=True)
+        )
+        batch = list(islice(chat_configs, _YAML_BATCH))
+
+
+def _iter_json(chat_configs: Iterable[dict]) -> Iterator[str]:
+    """
+    Emit JSON (2-space indent) one chat at a time.
+    逐一聊天輸出 JSON（2 格縮排）。
+    """
+    first = True
+    for chat_config in chat_configs:
+        text = json.dumps(chat_config, ensure_ascii=False, indent=2)
+        text = "\n".join("      " + line for line in text.split("\n"))
+        if first:
+            yield '{\n  "telegram": {\n    "chats": [\n' + text
+            first = False
+        else:
+            yield ",\n" + text
+
+    if first:
+        yield '{\n  "telegram": {\n    "chats": []\n  }\n}'
+    else:
+        yield "\n    ]\n  }\n}"
+
+
+def _iter_toml(chat_configs: Iterable[dict]) -> Iterator[str]:
+    """
+    Emit TOML arrays of tables one chat at a time.
+    逐一聊天輸出 TOML 表格陣列。
+    """
+    empty = True
+    for chat_config in chat_configs:
+        lines = ["[[telegram.chats]]", *_toml_pairs(chat_config)]
+        for sender in chat_config.get("senders", ()):
+            lines += ["", "[[telegram.chats.senders]]", *_toml_pairs(sender)]
+        yield ("" if empty else "\n") + "\n".join(lines) + "\n"
+        empty = False
+
+    if empty:
+        yield "[telegram]\nchats = []\n"
+
+
+def _toml_pairs(entry: dict) -> list[str]:
+    """
+    Format an entry's id and name as TOML key/value lines.
+    將項目的 id 與 name 格式化為 TOML 鍵值行。
+
+    TOML has no null, so keys whose value is None are left out.
+    TOML 沒有 null，因此值為 None 的鍵會被省略。
+    """
+    return [
+        f"{key} = {_toml_value(entry[key])}"
+        for key in ("id", "name")
+        if entry.get(key) is not None
+    ]
+
+
+def _toml_value(value) -> str:
+    """
+    Format a scalar as a TOML value.
+    將純量格式化為 TOML 值。
+
+    JSON string escapes are a subset of TOML basic-string escapes; DEL is
+    the one control character JSON leaves as is, so it is escaped here.
+    JSON 字串跳脫為 TOML 基本字串跳脫的子集；DEL 是 JSON 唯一保留原樣的控制字元，
+    因此在此另行跳脫。
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    return json.dumps(str(value), ensure_ascii=False).replace("\x7f", "\\u007F")
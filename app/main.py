@@ -7,22 +7,50 @@ A web tool to find Telegram group/channel/user IDs for configuration.
 """
 
 import os
+import time
+import asyncio
+import secrets
 from contextlib import asynccontextmanager
-from typing import Optional
-from dataclasses import asdict
-
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncIterator, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import yaml
+from starlette.concurrency import run_in_threadpool
 
 from dotenv import load_dotenv
-
+from telethon.errors import FloodWaitError
+
+from . import STARTED_AT, metrics
+from .broker_client import BrokerUnavailableError, RemoteSessionPool
+from .offline import OfflineModeError, OfflineSessionPool
+from .service_factory import create_session_pool, start_warm_up
+from .config_export import (
+    FORMATS,
+    build_config,
+    export,
+    iter_chat_configs,
+    iter_export,
+)
+from .serialization import (
+    FastJSONResponse,
+    dialog_to_dict,
+    sender_to_dict,
+    chat_senders_to_dict,
+    search_hit_to_dict,
+    resolved_peer_to_dict,
+    json_bytes,
+)
+from .snapshot import write_snapshot
+from .session_pool import DEFAULT_KEY, LeaseMiddleware, is_valid_key
 from .telegram_service import (
+    DIALOG_PAGE_SIZE,
     TelegramService,
-    get_telegram_service,
-    set_telegram_service,
+    DialogType,
     DialogInfo,
     SenderInfo,
 )
@@ -48,42 +76,178 @@ class VerifyCodeRequest(BaseModel):
     password: Optional[str] = None
 
 
+class BatchSendersRequest(BaseModel):
+    """Request model for scanning several chats | 多聊天掃描的請求模型"""
+    chat_ids: list[int]
+    limit: int = 100  # Default messages per chat | 每個聊天的預設訊息數
+    limits: dict[int, int] = {}  # Per-chat overrides | 各聊天覆寫值
+    concurrency: Optional[int] = None
+    stream: bool = False
+
+
+class ResolveRequest(BaseModel):
+    """Request model for resolving peers | 解析對象的請求模型"""
+    ids: list[str]  # @usernames, t.me links or numeric IDs | @用戶名、t.me 連結或數字 ID
+    concurrency: Optional[int] = None
+
+
+class SnapshotRequest(BaseModel):
+    """Request model for writing a snapshot | 寫入快照的請求模型"""
+    chat_ids: Optional[list[int]] = None  # Default: every group and channel | 預設：所有群組與頻道
+    limit: int = 100  # Messages scanned per chat | 每個聊天掃描的訊息數
+    concurrency: Optional[int] = None
+
+
 class GenerateConfigRequest(BaseModel):
     """Request model for generating config | 產生設定的請求模型"""
     chats: list[dict]  # List of {id, name} | {id, name} 列表
     senders: list[dict]  # List of {id, name, chat_id} | {id, name, chat_id} 列表
+    format: str = "yaml"  # yaml, json or toml | yaml、json 或 toml
+    output: str = "both"  # both, content or config | both、content 或 config
+    stream: bool = False  # Stream the file content only | 僅串流檔案內容
+
+
+# ============================================================================
+# Session Pool | Session 池
+# ============================================================================
+
+# Browser session cookie selecting the pool key | 選擇 pool 鍵的瀏覽器 session cookie
+SESSION_COOKIE = "tif_session"
+
+# Workers share one broker process when a broker socket is configured
+# 設定 broker socket 時，各工作程序共用同一個 broker 程序
+BROKER_SOCKET = os.getenv("TELEGRAM_BROKER_SOCKET")
+
+# Everything is answered from this snapshot file, without Telegram, when set
+# 設定時所有查詢皆由此快照檔案回應，不連線 Telegram
+OFFLINE_SNAPSHOT = os.getenv("TELEGRAM_OFFLINE_SNAPSHOT")
+
+# Where POST /api/snapshot writes | POST /api/snapshot 的寫入位置
+SNAPSHOT_PATH = os.getenv("TELEGRAM_SNAPSHOT_PATH", "snapshot.jsonl")
+
+if OFFLINE_SNAPSHOT:
+    session_pool = OfflineSessionPool(OFFLINE_SNAPSHOT)
+elif BROKER_SOCKET:
+    session_pool = RemoteSessionPool(BROKER_SOCKET)
+else:
+    session_pool = create_session_pool()
 
 
 # ============================================================================
 # Application Lifecycle | 應用程式生命週期
 # ============================================================================
 
+@dataclass
+class StartupState:
+    """Progress of application startup | 應用程式啟動進度"""
+    # Seconds from package import until requests were accepted | 自套件匯入至開始接受請求的秒數
+    serving_after: Optional[float] = None
+    # Seconds from package import until first ready | 自套件匯入至首次就緒的秒數
+    ready_after: Optional[float] = None
+    # Whether the default account's startup connect has finished | 預設帳號的啟動連線是否已完成
+    connected: bool = False
+    # Why the startup connect failed | 啟動連線失敗的原因
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+
+
+startup = StartupState()
+
+
+async def connect_default() -> None:
+    """
+    Connect the default account and start warming its caches.
+    連線預設帳號並開始預熱其快取。
+    """
+    service = await session_pool.get(DEFAULT_KEY)
+    startup.connected = True
+    startup.error = None
+    # Records the time to ready when already logged in | 已登入時記錄就緒所需時間
+    readiness()
+    # Runs in the background, so startup is not delayed | 於背景執行，不延遲啟動
+    start_warm_up(service)
+
+
+async def connect_default_in_background() -> None:
+    """
+    Connect the default account without failing startup.
+    連線預設帳號而不使啟動失敗。
+
+    On failure the next request retries through the session pool.
+    失敗時，下一個請求會經由 session 池重試。
+    """
+    try:
+        await connect_default()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        startup.error = f"{type(e).__name__}: {e}"
+        print(f"Error connecting to Telegram: {e}")
+
+
+def readiness() -> Optional[str]:
+    """
+    Check whether the default account is connected and authorized.
+    檢查預設帳號是否已連線並已授權。
+
+    Uses cached state only, so probes never issue RPCs.
+    僅使用快取狀態，因此探測不會發出 RPC。
+
+    Returns:
+        None when ready, otherwise the reason | 就緒時為 None，否則為原因
+    """
+    if not session_pool.is_registered(DEFAULT_KEY):
+        return "no default credentials | 未設定預設憑證"
+
+    service = session_pool.peek(DEFAULT_KEY)
+    if service is None:
+        if not startup.connected and startup.ready_after is None:
+            return startup.error or "connecting | 連線中"
+        # Evicted while idle; restored on the next request | 閒置時被淘汰，下一個請求時還原
+    elif not service.is_connected():
+        return "disconnected | 已中斷連線"
+    elif not service.auth_state.is_logged_in:
+        return "not logged in | 未登入"
+
+    if startup.ready_after is None:
+        startup.ready_after = time.perf_counter() - STARTED_AT
+    return None
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Application lifespan handler.
     應用程式生命週期處理器。
+
+    By default the default account connects in the background, so requests
+    are accepted at once; /readyz reports when it is connected and authorized.
+    預設帳號預設於背景連線，因此可立即接受請求；/readyz 回報其是否已連線並已授權。
     """
     # Startup | 啟動
     api_id = os.getenv("TELEGRAM_API_ID")
     api_hash = os.getenv("TELEGRAM_API_HASH")
-    session_name = os.getenv("TELEGRAM_SESSION_NAME", "telegram_id_finder")
 
     if api_id and api_hash:
-        service = TelegramService(
-            api_id=int(api_id),
-            api_hash=api_hash,
-            session_name=session_name
-        )
-        set_telegram_service(service)
-        await service.start()
+        session_pool.register(DEFAULT_KEY, int(api_id), api_hash)
+        if os.getenv("TELEGRAM_BACKGROUND_CONNECT", "true").lower() in ("1", "true", "yes"):
+            # Early requests wait on the same connect in the pool | 提早的請求會在池中等待同一次連線
+            startup.task = asyncio.create_task(connect_default_in_background())
+        else:
+            await connect_default()
+
+    session_pool.start()
+    loop_monitor = asyncio.create_task(metrics.monitor_event_loop())
+    startup.serving_after = time.perf_counter() - STARTED_AT
 
     yield
 
     # Shutdown | 關閉
-    service = get_telegram_service()
-    if service:
-        await service.stop()
+    if startup.task:
+        startup.task.cancel()
+        startup.task = None
+    loop_monitor.cancel()
+    await session_pool.close()
 
 
 # ============================================================================
@@ -97,22 +261,103 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Templates configuration | 模板設定
-templates = Jinja2Templates(
-    directory=os.path.join(os.path.dirname(__file__), "templates")
-)
+# Per-route latency for /metrics | /metrics 的各路由延遲
+app.add_middleware(metrics.MetricsMiddleware)
+# Services in use are not evicted until their response is sent | 使用中的服務在回應送出前不會被淘汰
+app.add_middleware(LeaseMiddleware, pool=session_pool)
+
+
+@app.middleware("http")
+async def session_key_middleware(request: Request, call_next):
+    """
+    Assign each browser a session key cookie for the session pool.
+    為每個瀏覽器指派 session 池使用的 session 鍵 cookie。
+    """
+    key = request.cookies.get(SESSION_COOKIE)
+    is_new = not is_valid_key(key) or key == DEFAULT_KEY
+    if is_new:
+        key = secrets.token_urlsafe(16)
+    request.state.session_key = key
+
+    response = await call_next(request)
+    if is_new:
+        response.set_cookie(SESSION_COOKIE, key, httponly=True, samesite="lax")
+    return response
+
+
+@app.exception_handler(FloodWaitError)
+async def flood_wait_handler(request: Request, exc: FloodWaitError):
+    """
+    Answer FloodWaits the scheduler could not absorb with 429.
+    以 429 回應排程器無法吸收的 FloodWait。
+    """
+    return JSONResponse(
+        status_code=429,
+        content={
+            "detail": f"Too many requests. Wait {exc.seconds} seconds | 請求過多，請等待 {exc.seconds} 秒"
+        },
+        headers={"Retry-After": str(exc.seconds)}
+    )
+
+
+@app.exception_handler(BrokerUnavailableError)
+async def broker_unavailable_handler(request: Request, exc: BrokerUnavailableError):
+    """
+    Answer with 503 while the broker cannot be reached.
+    無法連線至 broker 時以 503 回應。
+    """
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Telegram broker unavailable | Telegram broker 無法使用"}
+    )
+
+
+@app.exception_handler(OfflineModeError)
+async def offline_mode_handler(request: Request, exc: OfflineModeError):
+    """
+    Answer calls that need Telegram with 503 in offline mode.
+    離線模式下以 503 回應需要 Telegram 的呼叫。
+    """
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@lru_cache(maxsize=None)
+def get_templates():
+    """
+    Get the page templates, importing Jinja2 on first use.
+    取得頁面模板，首次使用時才匯入 Jinja2。
+    """
+    from fastapi.templating import Jinja2Templates
+
+    return Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
 
 
 # ============================================================================
 # Helper Functions | 輔助函式
 # ============================================================================
 
-def get_service_or_error() -> TelegramService:
+async def get_session_service(request: Request) -> Optional[TelegramService]:
+    """
+    Get this browser's service, falling back to the default account.
+    取得此瀏覽器的服務，否則退回預設帳號。
+    """
+    key = request.state.session_key
+    service = await session_pool.acquire(key)
+    if service is None:
+        key = DEFAULT_KEY
+        service = await session_pool.acquire(key)
+    if service is not None:
+        # Released by LeaseMiddleware after the response | 回應後由 LeaseMiddleware 釋放
+        request.state.session_leases.append(key)
+    return service
+
+
+async def get_service_or_error(request: Request) -> TelegramService:
     """
     Get the Telegram service or raise an error.
     取得 Telegram 服務或拋出錯誤。
     """
-    service = get_telegram_service()
+    service = await get_session_service(request)
     if not service:
         raise HTTPException(
             status_code=503,
@@ -122,6 +367,140 @@ def get_service_or_error() -> TelegramService:
     return service
 
 
+def validate_stream_format(fmt: str) -> None:
+    """Reject unknown stream formats | 拒絕未知的串流格式"""
+    if fmt not in ("ndjson", "sse"):
+        raise HTTPException(
+            status_code=400,
+            detail="format must be ndjson or sse | format 必須為 ndjson 或 sse"
+        )
+
+
+def stream_response(
+    items: AsyncIterator[dict],
+    fmt: str = "ndjson",
+    headers: Optional[dict] = None
+) -> StreamingResponse:
+    """
+    Stream dicts as NDJSON lines or server-sent events.
+    以 NDJSON 行或 server-sent events 串流字典。
+
+    Args:
+        items: Async iterator of JSON-serializable dicts | 可序列化字典的非同步迭代器
+        fmt: "ndjson" or "sse" | "ndjson" 或 "sse"
+        headers: Extra response headers | 額外的回應標頭
+    """
+    validate_stream_format(fmt)
+
+    def encode(item: dict) -> bytes:
+        line = json_bytes(item)
+        return b"data: " + line + b"\n\n" if fmt == "sse" else line + b"\n"
+
+    async def body():
+        try:
+            async for item in items:
+                yield encode(item)
+        except Exception as e:
+            # Headers are already sent, so report the error in-band
+            # 標頭已送出，因此在串流中回報錯誤
+            yield encode({"error": str(e)})
+        if fmt == "sse":
+            yield b"event: end\ndata: {}\n\n"
+
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        # Disable proxy buffering so each item is flushed | 停用代理緩衝以即時送出
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})}
+    )
+
+
+def parse_dialog_types(value: Optional[str]) -> Optional[set[DialogType]]:
+    """
+    Parse a comma-separated dialog type filter.
+    解析以逗號分隔的對話類型篩選。
+    """
+    if not value:
+        return None
+
+    allowed = {t.value: t for t in (DialogType.GROUP, DialogType.CHANNEL, DialogType.BOT)}
+    types = set()
+    for name in value.split(","):
+        name = name.strip().lower()
+        if name not in allowed:
+            raise HTTPException(
+                status_code=400,
+                detail="type must be group, channel or bot | type 必須為 group、channel 或 bot"
+            )
+        types.add(allowed[name])
+    return types
+
+
+def cache_headers(service: TelegramService, tag: str, modified_at: float) -> dict:
+    """
+    Build validator headers for a versioned response.
+    為帶版本的回應建立驗證標頭。
+
+    Args:
+        service: Service the data belongs to | 資料所屬的服務
+        tag: Kind and version of the data, e.g. "d12" | 資料種類與版本，例如 "d12"
+        modified_at: Wall-clock time of the last change (0 = unknown)
+                     | 最後變更的實際時間（0 為未知）
+    """
+    headers = {
+        "ETag": f'W/"{service.instance_id}-{tag}"',
+        # Always revalidate; data is per browser session | 一律重新驗證；資料屬於各瀏覽器 session
+        "Cache-Control": "private, no-cache",
+        "Vary": "Cookie",
+    }
+    if modified_at:
+        headers["Last-Modified"] = formatdate(modified_at, usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, headers: dict) -> Optional[Response]:
+    """
+    Answer a conditional GET with 304 if the client's copy is current.
+    若客戶端副本為最新，則以 304 回應條件式 GET。
+
+    Returns:
+        304 response, or None to send the full body | 304 回應，或 None 表示送出完整內容
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison | 弱比較
+        etag = headers["ETag"].removeprefix("W/")
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        matched = etag in tags or "*" in tags
+    else:
+        matched = False
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and "Last-Modified" in headers:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+                matched = int(parsedate_to_datetime(headers["Last-Modified"]).timestamp()) <= since
+            except (TypeError, ValueError):
+                pass
+
+    return Response(status_code=304, headers=headers) if matched else None
+
+
+async def get_logged_in_service(
+    service: TelegramService = Depends(get_service_or_error)
+) -> TelegramService:
+    """
+    Get the service, raising 401 unless logged in (answered from the auth cache).
+    取得服務，除非已登入否則拋出 401（由認證快取回應）。
+    """
+    if not await service.is_authorized():
+        raise HTTPException(
+            status_code=401,
+            detail="Not logged in | 未登入"
+        )
+    return service
+
+
 # ============================================================================
 # Frontend Routes | 前端路由
 # ============================================================================
@@ -132,7 +511,7 @@ async def index(request: Request):
     Render the main page.
     渲染主頁面。
     """
-    return templates.TemplateResponse("index.html", {"request": request})
+    return get_templates().TemplateResponse("index.html", {"request": request})
 
 
 # ============================================================================
@@ -140,7 +519,7 @@ async def index(request: Request):
 # ============================================================================
 
 @app.post("/api/auth/send-code")
-async def send_code(request: SendCodeRequest):
+async def send_code(request: SendCodeRequest, http_request: Request):
     """
     Send verification code to phone number.
     發送驗證碼到手機號碼。
@@ -150,16 +529,11 @@ async def send_code(request: SendCodeRequest):
     """
     # If credentials provided, create new service | 如果提供憑證，建立新服務
     if request.api_id and request.api_hash:
-        session_name = os.getenv("TELEGRAM_SESSION_NAME", "telegram_id_finder")
-        service = TelegramService(
-            api_id=request.api_id,
-            api_hash=request.api_hash,
-            session_name=session_name
+        service = await session_pool.create(
+            http_request.state.session_key, request.api_id, request.api_hash
         )
-        set_telegram_service(service)
-        await service.start()
     else:
-        service = get_service_or_error()
+        service = await get_service_or_error(http_request)
 
     result = await service.send_code(request.phone)
     if not result["success"]:
@@ -169,27 +543,32 @@ async def send_code(request: SendCodeRequest):
 
 
 @app.post("/api/auth/verify")
-async def verify_code(request: VerifyCodeRequest):
+async def verify_code(
+    request: VerifyCodeRequest,
+    service: TelegramService = Depends(get_service_or_error)
+):
     """
     Verify the login code.
     驗證登入碼。
     """
-    service = get_service_or_error()
     result = await service.verify_code(request.code, request.password)
 
     if not result["success"] and not result.get("needs_2fa"):
         raise HTTPException(status_code=400, detail=result["message"])
 
+    if result["success"]:
+        start_warm_up(service)
+
     return result
 
 
 @app.get("/api/auth/status")
-async def auth_status():
+async def auth_status(request: Request):
     """
     Get current authentication status.
     取得當前認證狀態。
     """
-    service = get_telegram_service()
+    service = await get_session_service(request)
     if not service:
         return {
             "is_logged_in": False,
@@ -201,17 +580,21 @@ async def auth_status():
 
 
 @app.post("/api/auth/logout")
-async def logout():
+async def logout(request: Request):
     """
     Log out from Telegram.
     從 Telegram 登出。
     """
-    service = get_service_or_error()
+    service = await get_service_or_error(request)
     result = await service.logout()
 
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
 
+    # Release this browser's own client | 釋放此瀏覽器自己的客戶端
+    if await session_pool.get(request.state.session_key) is service:
+        await session_pool.remove(request.state.session_key)
+
     return result
 
 
@@ -220,54 +603,542 @@ async def logout():
 # ============================================================================
 
 @app.get("/api/dialogs")
-async def get_dialogs():
+async def get_dialogs(
+    request: Request,
+    refresh: bool = False,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    folder: Optional[int] = None,
+    archived: Optional[bool] = None,
+    type: Optional[str] = None,
+    service: TelegramService = Depends(get_logged_in_service)
+):
     """
     Get all groups and channels.
     取得所有群組和頻道。
+
+    Answers If-None-Match / If-Modified-Since with 304 while the dialog
+    cache version is unchanged.
+    對話快取版本未變時，以 304 回應 If-None-Match / If-Modified-Since。
+
+    With limit, cursor, folder or archived, one page is read straight from
+    Telegram instead and the response carries next_cursor.
+    指定 limit、cursor、folder 或 archived 時，改為直接向 Telegram 讀取一頁，
+    回應中帶有 next_cursor。
+
+    Args:
+        refresh: Bypass the dialog cache | 略過對話快取
+        limit: Dialogs per page (max 100) | 每頁對話數（最多 100）
+        cursor: next_cursor of the previous page | 上一頁的 next_cursor
+        folder: 0 main list, 1 archive | 0 主列表、1 封存
+        archived: Shortcut for folder=1 (true) or folder=0 (false) | folder=1（true）或 folder=0（false）的簡寫
+        type: Comma-separated group, channel, bot | 以逗號分隔的 group、channel、bot
     """
-    service = get_service_or_error()
-    status = await service.get_status()
+    types = parse_dialog_types(type)
+
+    if archived is not None:
+        if folder is not None and folder != int(archived):
+            raise HTTPException(
+                status_code=400,
+                detail="folder conflicts with archived | folder 與 archived 衝突"
+            )
+        folder = int(archived)
+
+    if limit is not None or cursor or folder is not None:
+        try:
+            page = await service.get_dialogs_page(
+                DIALOG_PAGE_SIZE if limit is None else min(limit, DIALOG_PAGE_SIZE),
+                cursor=cursor,
+                folder=folder,
+                types=types
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return FastJSONResponse({
+            "dialogs": [dialog_to_dict(d) for d in page.dialogs],
+            "next_cursor": page.next_cursor
+        })
 
-    if not status.get("is_logged_in"):
-        raise HTTPException(
-            status_code=401,
-            detail="Not logged in | 未登入"
-        )
+    snapshot = await service.get_dialogs_versioned(refresh=refresh)
+    if snapshot is None:
+        return FastJSONResponse({"dialogs": []})
+
+    headers = cache_headers(service, f"d{snapshot.version}", snapshot.modified_at)
+    dialogs = snapshot.value
+    if types:
+        dialogs = [d for d in dialogs if d.dialog_type in types]
+    return not_modified(request, headers) or FastJSONResponse(
+        {"dialogs": [dialog_to_dict(d) for d in dialogs]},
+        headers=headers
+    )
 
-    dialogs = await service.get_dialogs()
-    return {
-        "dialogs": [asdict(d) for d in dialogs]
-    }
+
+@app.get("/api/dialogs/stream")
+async def stream_dialogs(
+    request: Request,
+    format: str = "ndjson",
+    refresh: bool = False,
+    service: TelegramService = Depends(get_logged_in_service)
+):
+    """
+    Stream groups and channels as they are fetched.
+    在取得時即串流群組和頻道。
+
+    Args:
+        format: "ndjson" (default) or "sse" | "ndjson"（預設）或 "sse"
+        refresh: Bypass the dialog cache | 略過對話快取
+    """
+    validate_stream_format(format)
+
+    # Served from a fresh cache, the stream carries validators | 由新鮮快取回應時，串流帶有驗證標頭
+    snapshot = None if refresh else service.cached_dialogs()
+    if snapshot is not None:
+        headers = cache_headers(service, f"d{snapshot.version}", snapshot.modified_at)
+        response = not_modified(request, headers)
+        if response:
+            return response
+
+        async def cached_items():
+            for dialog in snapshot.value:
+                yield dialog_to_dict(dialog)
+
+        return stream_response(cached_items(), format, headers)
+
+    async def items():
+        async for dialog in service.iter_dialogs(refresh=refresh):
+            yield dialog_to_dict(dialog)
+
+    return stream_response(items(), format)
 
 
 @app.get("/api/dialogs/{chat_id}/messages")
-async def get_dialog_messages(chat_id: int, limit: int = 100):
+async def get_dialog_messages(
+    request: Request,
+    chat_id: int,
+    limit: Optional[int] = None,
+    max_senders: Optional[int] = None,
+    idle_limit: Optional[int] = None,
+    backfill: int = 0,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    service: TelegramService = Depends(get_logged_in_service)
+):
     """
     Get recent message senders from a chat.
     從聊天中取得最近的訊息發送者。
 
+    With the sender index enabled, each call only scans messages newer than
+    the previous one and returns every sender found so far. Scans without
+    stop conditions answer conditional GETs with 304 when nothing changed.
+    啟用發送者索引時，每次只掃描上次之後的新訊息，並回傳至今找到的所有發送者。
+    不含停止條件的掃描在無變更時以 304 回應條件式 GET。
+
+    With since or until, only messages in that window are read and each
+    sender carries message_count, first_seen and last_seen.
+    指定 since 或 until 時，只讀取該區間內的訊息，且每個發送者附帶
+    message_count、first_seen 與 last_seen。
+
     Args:
         chat_id: The chat/group/channel ID
-        limit: Maximum messages to fetch (default 100) | 最大訊息數（預設 100）
+        limit: Maximum messages to fetch (default 100, or 10000 for a window)
+               | 最大訊息數（預設 100，區間掃描為 10000）
+        max_senders: Stop after this many senders | 找到此數量發送者後停止
+        idle_limit: Stop after this many messages without a new sender
+                    | 連續此數量訊息無新發送者時停止
+        backfill: Older messages to scan past the indexed range
+                  | 在已索引範圍之前額外掃描的較舊訊息數
+        since: Oldest message date, inclusive (ISO 8601, default UTC)
+               | 最舊訊息日期，包含（ISO 8601，預設 UTC）
+        until: Newest message date, exclusive (ISO 8601, default UTC)
+               | 最新訊息日期，不包含（ISO 8601，預設 UTC）
     """
-    service = get_service_or_error()
-    status = await service.get_status()
+    if since or until:
+        return await get_dialog_activity(chat_id, limit, max_senders, idle_limit, since, until, service)
+
+    # Limit the maximum to prevent abuse | 限制最大值以防止濫用
+    limit = min(limit or 100, 500)
+    backfill = min(backfill, 500)
+
+    headers = None
+    if max_senders or idle_limit:
+        senders = await service.get_messages_senders(
+            chat_id,
+            limit,
+            max_senders=max_senders,
+            idle_limit=idle_limit,
+            backfill=backfill
+        )
+    else:
+        result = await service.get_messages_senders_versioned(chat_id, limit, backfill)
+        senders = result.value
+        # Unversioned results are sent without validators | 無版本的結果不帶驗證器送出
+        if result.version:
+            headers = cache_headers(service, f"m{result.version}", result.modified_at)
+            response = not_modified(request, headers)
+            if response:
+                return response
+
+    return FastJSONResponse(
+        {
+            "chat_id": chat_id,
+            "senders": [sender_to_dict(s) for s in senders]
+        },
+        headers=headers
+    )
+
 
-    if not status.get("is_logged_in"):
+async def get_dialog_activity(
+    chat_id: int,
+    limit: Optional[int],
+    max_senders: Optional[int],
+    idle_limit: Optional[int],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    service: TelegramService
+) -> Response:
+    """
+    Answer a date-windowed sender scan with per-sender activity.
+    以每個發送者的活動回應日期區間的發送者掃描。
+    """
+    if max_senders or idle_limit:
         raise HTTPException(
-            status_code=401,
-            detail="Not logged in | 未登入"
+            status_code=400,
+            detail="max_senders and idle_limit cannot be combined with since/until"
+                   " | max_senders 與 idle_limit 不可與 since/until 併用"
         )
 
     # Limit the maximum to prevent abuse | 限制最大值以防止濫用
-    limit = min(limit, 500)
+    limit = min(limit or 10000, 10000)
+
+    try:
+        activity = await service.get_sender_activity(chat_id, since=since, until=until, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse({
+        "chat_id": chat_id,
+        "messages": activity.messages,
+        "complete": activity.complete,
+        "senders": [sender_to_dict(s) for s in activity.senders]
+    })
+
+
+@app.get("/api/dialogs/{chat_id}/senders")
+async def get_dialog_senders(
+    chat_id: int,
+    mode: str = "auto",
+    limit: int = 200,
+    filter: Optional[str] = None,
+    search: str = "",
+    service: TelegramService = Depends(get_logged_in_service)
+):
+    """
+    Get chat members via the participant list or a message scan.
+    透過成員列表或訊息掃描取得聊天成員。
+
+    Args:
+        chat_id: The chat/group/channel ID
+        mode: "auto" (default), "participants" or "messages"
+              | "auto"（預設）、"participants" 或 "messages"
+        limit: Maximum members or messages (default 200) | 最大成員數或訊息數（預設 200）
+        filter: "admins" or "bots" | "admins" 或 "bots"
+        search: Name/username prefix | 名稱/用戶名前綴
+    """
+    # Limit the maximum to prevent abuse | 限制最大值以防止濫用
+    max_limit = 10000 if mode == "participants" else 500
+    limit = min(limit, max_limit)
 
-    senders = await service.get_messages_senders(chat_id, limit)
-    return {
+    try:
+        used_mode, senders = await service.get_chat_senders(
+            chat_id, mode=mode, limit=limit, filter=filter, search=search
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse({
         "chat_id": chat_id,
-        "senders": [asdict(s) for s in senders]
+        "mode": used_mode,
+        "senders": [sender_to_dict(s) for s in senders]
+    })
+
+
+@app.get("/api/dialogs/{chat_id}/senders/stream")
+async def stream_dialog_senders(
+    request: Request,
+    chat_id: int,
+    limit: int = 100,
+    max_senders: Optional[int] = None,
+    idle_limit: Optional[int] = None,
+    format: str = "ndjson",
+    service: TelegramService = Depends(get_logged_in_service)
+):
+    """
+    Stream each new unique sender as soon as it is seen.
+    在看到每個新的唯一發送者時立即串流。
+
+    A recent cached scan is replayed at once and answers conditional GETs.
+    近期的快取掃描會立即重播，並回應條件式 GET。
+
+    Args:
+        chat_id: The chat/group/channel ID
+        limit: Maximum messages to scan (default 100) | 最大掃描訊息數（預設 100）
+        max_senders: Stop after this many senders | 找到此數量發送者後停止
+        idle_limit: Stop after this many messages without a new sender
+                    | 連續此數量訊息無新發送者時停止
+        format: "ndjson" (default) or "sse" | "ndjson"（預設）或 "sse"
+    """
+    # Limit the maximum to prevent abuse | 限制最大值以防止濫用
+    limit = min(limit, 500)
+    validate_stream_format(format)
+
+    # Replayed from a cached scan, the stream carries validators | 由快取掃描重播時，串流帶有驗證標頭
+    cached = service.get_cached_senders(chat_id, limit, max_senders, idle_limit)
+    if cached is not None:
+        headers = cache_headers(service, f"s{cached.version}", cached.modified_at)
+        response = not_modified(request, headers)
+        if response:
+            return response
+
+        async def cached_items():
+            for sender in cached.value:
+                yield sender_to_dict(sender)
+
+        return stream_response(cached_items(), format, headers)
+
+    async def items():
+        async for sender in service.iter_messages_senders(
+            chat_id, limit, max_senders=max_senders, idle_limit=idle_limit
+        ):
+            yield sender_to_dict(sender)
+
+    return stream_response(items(), format)
+
+
+@app.post("/api/senders/batch")
+async def batch_senders(
+    request: BatchSendersRequest,
+    service: TelegramService = Depends(get_logged_in_service)
+):
+    """
+    Scan senders of several chats concurrently.
+    並行掃描多個聊天的發送者。
+
+    Returns all results in request order, or streams each chat as NDJSON
+    as soon as it finishes when stream is set.
+    依請求順序回傳所有結果；若設定 stream 則每個聊天完成即以 NDJSON 串流。
+    """
+    # Limit the maximum to prevent abuse | 限制最大值以防止濫用
+    max_concurrency = int(os.getenv("TELEGRAM_BATCH_CONCURRENCY", "4"))
+    concurrency = min(request.concurrency or max_concurrency, max_concurrency)
+    limits = {chat_id: min(n, 500) for chat_id, n in request.limits.items()}
+
+    results = service.scan_senders_batch(
+        request.chat_ids,
+        limit=min(request.limit, 500),
+        limits=limits,
+        concurrency=concurrency
+    )
+
+    if request.stream:
+        async def items():
+            async for result in results:
+                yield chat_senders_to_dict(result)
+
+        return stream_response(items())
+
+    by_chat = {result.chat_id: result async for result in results}
+    return FastJSONResponse({
+        "results": [
+            chat_senders_to_dict(by_chat[chat_id]) for chat_id in dict.fromkeys(request.chat_ids)
+        ]
+    })
+
+
+@app.get("/api/search")
+async def search(
+    q: str = "",
+    kind: Optional[str] = None,
+    type: Optional[str] = None,
+    bot: Optional[bool] = None,
+    min_members: Optional[int] = None,
+    max_members: Optional[int] = None,
+    limit: int = 20,
+    service: TelegramService = Depends(get_logged_in_service)
+):
+    """
+    Type-ahead search over known dialogs and senders.
+    對已知對話與發送者的即時輸入搜尋。
+
+    Args:
+        q: Name or username; 1-2 characters match word starts
+           | 名稱或用戶名；1-2 個字元時比對字首
+        kind: "dialog" or "sender" | "dialog" 或 "sender"
+        type: Comma-separated group, channel, bot | 以逗號分隔的 group、channel、bot
+        bot: Only bots (true) or no bots (false) | 只有機器人（true）或排除機器人（false）
+        min_members: Minimum member count | 最小成員數
+        max_members: Maximum member count | 最大成員數
+        limit: Maximum results (max 100) | 最大結果數（最多 100）
+    """
+    if kind not in (None, "dialog", "sender"):
+        raise HTTPException(
+            status_code=400,
+            detail="kind must be dialog or sender | kind 必須為 dialog 或 sender"
+        )
+
+    hits = await service.search(
+        q,
+        kind=kind,
+        types=parse_dialog_types(type),
+        is_bot=bot,
+        min_members=min_members,
+        max_members=max_members,
+        limit=max(1, min(limit, 100))
+    )
+    return FastJSONResponse({
+        "query": q,
+        "results": [search_hit_to_dict(hit) for hit in hits]
+    })
+
+
+@app.post("/api/resolve")
+async def resolve(
+    request: ResolveRequest,
+    service: TelegramService = Depends(get_logged_in_service)
+):
+    """
+    Resolve usernames, t.me links and numeric IDs in bulk.
+    批次解析用戶名、t.me 連結與數字 ID。
+
+    Returns the ID, type and display name of each distinct input in
+    request order; inputs that cannot be resolved carry an error.
+    依請求順序回傳每個不同輸入的 ID、類型與顯示名稱；無法解析的輸入帶有錯誤。
+    """
+    # Limit the maximum to prevent abuse | 限制最大值以防止濫用
+    if len(request.ids) > 1000:
+        raise HTTPException(status_code=400, detail="At most 1000 ids | 最多 1000 個 ids")
+    max_concurrency = int(os.getenv("TELEGRAM_RESOLVE_CONCURRENCY", "4"))
+    concurrency = min(request.concurrency or max_concurrency, max_concurrency)
+
+    peers = await service.resolve(request.ids, concurrency=concurrency)
+    return FastJSONResponse({"results": [resolved_peer_to_dict(peer) for peer in peers]})
+
+
+@app.post("/api/snapshot")
+async def create_snapshot(
+    request: SnapshotRequest,
+    service: TelegramService = Depends(get_logged_in_service)
+):
+    """
+    Write dialogs and per-chat senders to the snapshot file.
+    將對話與各聊天發送者寫入快照檔案。
+
+    Senders come from the same scans as /api/dialogs/{id}/messages, so each
+    chat holds the senders the live API would serve. Freshly cached chats
+    cost no RPCs and indexed chats only fetch messages newer than their last
+    scan. Serve the file with TELEGRAM_OFFLINE_SNAPSHOT for lookups without
+    Telegram.
+    發送者來自與 /api/dialogs/{id}/messages 相同的掃描，因此每個聊天保存線上 API
+    會回應的發送者。新鮮快取的聊天不需 RPC，已索引的聊天只取得上次掃描後的新訊息。
+    以 TELEGRAM_OFFLINE_SNAPSHOT 提供此檔案，即可在無 Telegram 時查詢。
+    """
+    if OFFLINE_SNAPSHOT:
+        raise OfflineModeError("Snapshots are written online | 快照需於線上模式寫入")
+
+    # Limit the maximum to prevent abuse | 限制最大值以防止濫用
+    max_concurrency = int(os.getenv("TELEGRAM_BATCH_CONCURRENCY", "4"))
+    concurrency = min(request.concurrency or max_concurrency, max_concurrency)
+
+    dialogs = await service.get_dialogs()
+    chat_ids = [dialog.id for dialog in dialogs] if request.chat_ids is None else request.chat_ids
+    by_chat = {
+        result.chat_id: result async for result in service.scan_senders_batch(
+            chat_ids, limit=min(request.limit, 500), concurrency=concurrency
+        )
     }
 
+    senders = {}
+    errors = {}
+    for chat_id in dict.fromkeys(chat_ids):
+        result = by_chat[chat_id]
+        if result.error:
+            errors[str(chat_id)] = result.error
+        # Partial scans are kept | 保留部分掃描結果
+        if result.senders or not result.error:
+            senders[chat_id] = result.senders
+
+    auth = service.auth_state
+    account = {"id": auth.user_id, "name": auth.user_name, "username": auth.username}
+    # Keep file writes off the event loop | 檔案寫入不佔用事件迴圈
+    header = await run_in_threadpool(write_snapshot, SNAPSHOT_PATH, dialogs, senders, account)
+    return FastJSONResponse({"path": SNAPSHOT_PATH, **header, "errors": errors})
+
+
+@app.get("/api/stats")
+async def get_stats(request: Request):
+    """
+    Get session pool and service cache statistics.
+    取得 session 池與服務快取統計。
+    """
+    service = await get_session_service(request)
+    if BROKER_SOCKET:
+        # The pool and caches live in the broker | 池與快取位於 broker
+        return await session_pool.fetch_stats(service)
+
+    stats = {"pool": session_pool.stats()}
+    if service:
+        stats.update(service.get_stats())
+    return stats
+
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness probe: the process is up and serving.
+    存活探測：程序已啟動並在服務中。
+    """
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness probe: the default account is connected and authorized.
+    就緒探測：預設帳號已連線並已授權。
+    """
+    reason = readiness()
+    if reason is not None:
+        return JSONResponse(status_code=503, content={"ready": False, "reason": reason})
+    return {"ready": True}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus metrics for routes, Telegram RPCs, caches and the session pool.
+    路由、Telegram RPC、快取與 session 池的 Prometheus 指標。
+    """
+    if BROKER_SOCKET:
+        # Telegram metrics are recorded by the broker | Telegram 指標由 broker 記錄
+        telegram = await session_pool.fetch_metrics()
+    else:
+        telegram = metrics.telegram_lines(
+            session_pool.stats(),
+            [service.get_stats() for service in session_pool.live_services()]
+        )
+
+    extra = [
+        *telegram,
+        *metrics.gauge("app_ready", "Whether the default account is connected and authorized", [({}, readiness() is None)]),
+        *metrics.gauge(
+            "app_startup_seconds", "Seconds from package import until serving and until first ready",
+            [({"phase": phase}, value) for phase, value in (
+                ("serving", startup.serving_after), ("ready", startup.ready_after)
+            ) if value is not None]
+        ),
+    ]
+    return Response(metrics.render(extra, metrics.HTTP_METRICS), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 
 # ============================================================================
 # Config Generation API | 設定產生 API
@@ -278,51 +1149,52 @@ async def generate_config(request: GenerateConfigRequest):
     """
     Generate settings.yaml content for telegram-signal-parser.
     為 telegram-signal-parser 產生 settings.yaml 內容。
-    """
-    # Build the config structure | 建立設定結構
-    config = {
-        "telegram": {
-            "chats": []
-        }
-    }
-
-    # Group senders by chat | 按聊天分組發送者
-    senders_by_chat = {}
-    for sender in request.senders:
-        chat_id = sender.get("chat_id")
-        if chat_id not in senders_by_chat:
-            senders_by_chat[chat_id] = []
-        senders_by_chat[chat_id].append({
-            "id": sender["id"],
-            "name": sender.get("name", "")
-        })
 
-    # Build chat configurations | 建立聊天設定
-    for chat in request.chats:
-        chat_config = {
-            "id": chat["id"],
-            "name": chat.get("name", ""),
-        }
+    The content key is named after the format ("yaml", "json" or "toml").
+    output selects the content, the config object, or both (default).
+    With stream set, only the file content is streamed as it is generated.
+    內容鍵依格式命名（"yaml"、"json" 或 "toml"）。output 選擇內容、設定物件或兩者（預設）。
+    設定 stream 時，只在產生時串流檔案內容。
+    """
+    if request.format not in FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail="format must be yaml, json or toml | format 必須為 yaml、json 或 toml"
+        )
+    if request.output not in ("both", "content", "config"):
+        raise HTTPException(
+            status_code=400,
+            detail="output must be both, content or config | output 必須為 both、content 或 config"
+        )
 
-        # Add senders if any selected for this chat
-        # 如果此聊天有選擇的發送者則加入
-        if chat["id"] in senders_by_chat:
-            chat_config["senders"] = senders_by_chat[chat["id"]]
+    chats, senders = request.chats, request.senders
+    if OFFLINE_SNAPSHOT:
+        # IDs sent without names are named from the snapshot | 未附名稱的 ID 由快照補上名稱
+        chats, senders = (await session_pool.get(DEFAULT_KEY)).complete_names(chats, senders)
 
-        config["telegram"]["chats"].append(chat_config)
+    if request.stream:
+        # Sync iterators are consumed in a worker thread | 同步迭代器於工作執行緒中消耗
+        return StreamingResponse(
+            iter_export(iter_chat_configs(chats, senders), request.format),
+            media_type=FORMATS[request.format]
+        )
 
-    # Convert to YAML | 轉換為 YAML
-    yaml_content = yaml.dump(
-        config,
-        allow_unicode=True,
-        default_flow_style=False,
-        sort_keys=False
-    )
+    def render() -> dict:
+        result = {}
+        if request.output == "config":
+            result["config"] = build_config(chats, senders)
+        elif request.output == "content":
+            result[request.format] = export(
+                iter_chat_configs(chats, senders), request.format
+            )
+        else:
+            config = build_config(chats, senders)
+            result[request.format] = export(config["telegram"]["chats"], request.format)
+            result["config"] = config
+        return result
 
-    return {
-        "yaml": yaml_content,
-        "config": config
-    }
+    # Keep large exports off the event loop | 大型匯出不佔用事件迴圈
+    return FastJSONResponse(await run_in_threadpool(render))
 
 
 # ============================================================================
@@ -335,9 +1207,12 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "127.0.0.1")
     port = int(os.getenv("PORT", "8000"))
 
+    # The reloader runs the app in a second process, slowing startup | 重新載入器於第二個程序執行應用程式，會拖慢啟動
+    reload = os.getenv("RELOAD", "false").lower() in ("1", "true", "yes")
+
     uvicorn.run(
         "app.main:app",
         host=host,
         port=port,
-        reload=True
+        reload=reload
     )
@@ -0,0 +1,355 @@
+"""
+Metrics | 指標
+Prometheus text-format metrics for HTTP routes and Telegram RPCs.
+HTTP 路由與 Telegram RPC 的 Prometheus 文字格式指標。
+
+Recording is a dict lookup and a few integer additions; nothing is
+formatted until /metrics is scraped.
+記錄僅為一次字典查找與數次整數加法；直到 /metrics 被抓取時才進行格式化。
+"""
+
+import time
+import asyncio
+import functools
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+# TelegramService method issuing the current RPCs | 目前發出 RPC 的 TelegramService 方法
+_operation: ContextVar[str] = ContextVar("telegram_operation", default="other")
+
+# Latency buckets in seconds | 延遲區間（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# ============================================================================
+# Metric Types | 指標類型
+# ============================================================================
+
+class Counter:
+    """Monotonic counter with labels | 具標籤的單調計數器"""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        """Add to the counter | 增加計數"""
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        """Yield exposition lines | 產出輸出行"""
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Fixed-bucket histogram with labels | 具標籤的固定區間直方圖"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per-bucket (non-cumulative) counts, last slot is +Inf, then the sum
+        # 各區間（非累計）次數，最後一格為 +Inf，接著為總和
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        """Record one observation | 記錄一次觀測"""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> Iterator[str]:
+        """Yield exposition lines | 產出輸出行"""
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(bound)
+                names = (*self.labelnames, "le")
+                yield f"{self.name}_bucket{_labels(names, (*labels, le))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+def gauge(name: str, help: str, samples: Iterable[tuple[dict, float]]) -> Iterator[str]:
+    """
+    Yield exposition lines for a gauge computed at scrape time.
+    產出於抓取時計算之 gauge 的輸出行。
+    """
+    yield f"# HELP {name} {help}"
+    yield f"# TYPE {name} gauge"
+    for labels, value in samples:
+        yield f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}"
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    """Format a label set | 格式化標籤組"""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    """Escape a label value | 跳脫標籤值"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    """Format a sample value | 格式化樣本值"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# ============================================================================
+# Metrics | 指標
+# ============================================================================
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response body is sent",
+    ("method", "route")
+)
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by status code",
+    ("method", "route", "status")
+)
+RPC_DURATION = Histogram(
+    "telegram_rpc_duration_seconds",
+    "Telegram RPC latency, including scheduler queueing and FloodWait retries",
+    ("method", "request")
+)
+RPC_ERRORS = Counter(
+    "telegram_rpc_errors_total",
+    "Telegram RPCs that raised",
+    ("method", "error")
+)
+ITEMS_ITERATED = Counter(
+    "telegram_items_iterated_total",
+    "Dialogs, messages and participants iterated from Telegram",
+    ("method", "kind")
+)
+FLOOD_WAITS = Counter(
+    "telegram_flood_waits_total",
+    "FloodWait errors received"
+)
+FLOOD_WAIT_SECONDS = Counter(
+    "telegram_flood_wait_seconds_total",
+    "Seconds of FloodWait requested by Telegram"
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of a periodic event loop wake-up beyond its schedule",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+# Recorded by the process calling Telegram (the broker in broker mode)
+# 由呼叫 Telegram 的程序記錄（broker 模式下為 broker）
+TELEGRAM_METRICS = (
+    RPC_DURATION,
+    RPC_ERRORS,
+    ITEMS_ITERATED,
+    FLOOD_WAITS,
+    FLOOD_WAIT_SECONDS,
+)
+
+# Recorded by the process serving HTTP | 由提供 HTTP 服務的程序記錄
+HTTP_METRICS = (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    EVENT_LOOP_LAG,
+)
+
+_METRICS = (*HTTP_METRICS, *TELEGRAM_METRICS)
+
+
+# ============================================================================
+# Recording Helpers | 記錄輔助
+# ============================================================================
+
+@contextmanager
+def operation(name: str) -> Iterator[None]:
+    """
+    Attribute RPCs made inside the block to a service method.
+    將區塊內發出的 RPC 歸屬於某個服務方法。
+    """
+    token = _operation.set(name)
+    try:
+        yield
+    finally:
+        try:
+            _operation.reset(token)
+        except ValueError:
+            # Async generator closed from another context | 非同步產生器於其他 context 中關閉
+            pass
+
+
+def instrumented(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Decorate a coroutine method so its RPCs are attributed to it.
+    裝飾協程方法，使其 RPC 歸屬於該方法。
+    """
+    name = func.__name__.lstrip("_")
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with operation(name):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def observe_rpc(request: str, seconds: float, error: Optional[BaseException] = None) -> None:
+    """
+    Record one Telegram RPC.
+    記錄一次 Telegram RPC。
+
+    Args:
+        request: TL request name | TL 請求名稱
+        seconds: Wall time including queueing | 含排隊的實際時間
+        error: Exception raised, if any | 拋出的例外（若有）
+    """
+    method = _operation.get()
+    RPC_DURATION.observe((method, request), seconds)
+    if error is not None:
+        RPC_ERRORS.inc((method, type(error).__name__))
+
+
+def observe_flood_wait(seconds: float) -> None:
+    """Record a FloodWait | 記錄一次 FloodWait"""
+    FLOOD_WAITS.inc()
+    FLOOD_WAIT_SECONDS.inc(amount=seconds)
+
+
+def count_items(kind: str, count: int) -> None:
+    """
+    Record items iterated by the current service method.
+    記錄目前服務方法迭代的項目數。
+    """
+    if count:
+        ITEMS_ITERATED.inc((_operation.get(), kind), count)
+
+
+async def monitor_event_loop(interval: float = 1.0) -> None:
+    """
+    Sample event loop lag until cancelled.
+    取樣事件迴圈延遲直到被取消。
+    """
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe((), max(0.0, time.perf_counter() - started - interval))
+
+
+def telegram_lines(pool: dict, services: list[dict]) -> list[str]:
+    """
+    Render Telegram metrics with gauges for the session pool and its caches.
+    輸出 Telegram 指標，以及 session 池與其快取的 gauge。
+
+    Args:
+        pool: SessionPool.stats() | SessionPool.stats() 的結果
+        services: get_stats() of each live service | 各存活服務的 get_stats() 結果
+    """
+    def total(section: str, field: str) -> float:
+        return sum(stats[section][field] for stats in services)
+
+    def hit_ratio(section: str) -> float:
+        hits, misses = total(section, "hits"), total(section, "misses")
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    caches = (("dialog", "dialog_cache"), ("entity", "entity_cache"), ("sender", "sender_cache"))
+    return [
+        *(line for metric in TELEGRAM_METRICS for line in metric.render()),
+        *gauge("telegram_live_clients", "Connected Telegram clients", [({}, pool["live_clients"])]),
+        *gauge("telegram_max_clients", "Client pool capacity", [({}, pool["max_clients"])]),
+        *gauge(
+            "telegram_cache_hits", "Cache hits across live clients",
+            [({"cache": name}, total(section, "hits")) for name, section in caches]
+        ),
+        *gauge(
+            "telegram_cache_misses", "Cache misses across live clients",
+            [({"cache": name}, total(section, "misses")) for name, section in caches]
+        ),
+        *gauge(
+            "telegram_cache_hit_ratio", "Cache hit ratio across live clients",
+            [({"cache": name}, hit_ratio(section)) for name, section in caches]
+        ),
+        *gauge("telegram_rpc_queue_depth", "RPCs waiting in schedulers", [({}, total("rpc", "queue_depth"))]),
+        *gauge("telegram_coalesced_calls", "Calls served by a shared in-flight fetch", [({}, total("coalescing", "shared"))]),
+    ]
+
+
+def render(extra: Iterable[str] = (), families: tuple = _METRICS) -> str:
+    """
+    Render metrics in the Prometheus text format.
+    以 Prometheus 文字格式輸出指標。
+
+    Args:
+        extra: Additional exposition lines (scrape-time gauges) | 額外輸出行（抓取時的 gauge）
+        families: Metrics recorded in this process | 此程序記錄的指標
+    """
+    lines = [line for metric in families for line in metric.render()]
+    lines.extend(extra)
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# ASGI Middleware | ASGI 中介軟體
+# ============================================================================
+
+class MetricsMiddleware:
+    """
+    Time HTTP requests per route template.
+    依路由範本計時 HTTP 請求。
+
+    Timing ends when the last body chunk is sent, so streamed responses are
+    measured in full. Unmatched paths share one label to bound cardinality.
+    計時於最後一個內容片段送出時結束，因此串流回應會被完整測量。
+    未匹配的路徑共用同一標籤以限制基數。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"))
+            HTTP_REQUEST_DURATION.observe(labels, time.perf_counter() - started)
+            HTTP_REQUESTS.inc((*labels, str(status)))
@@ -0,0 +1,102 @@
+"""
+Models | 資料模型
+Result and state structures shared across the application.
+應用程式共用的結果與狀態結構。
+"""
+
+from typing import Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+
+
+class DialogType(str, Enum):
+    """Dialog type enumeration | 對話類型枚舉"""
+    GROUP = "group"
+    CHANNEL = "channel"
+    USER = "user"
+    BOT = "bot"
+    UNKNOWN = "unknown"
+
+
+@dataclass(slots=True)
+class DialogInfo:
+    """Dialog information structure | 對話資訊結構"""
+    id: int
+    name: str
+    dialog_type: DialogType
+    username: Optional[str] = None
+    members_count: Optional[int] = None
+
+
+@dataclass(slots=True)
+class DialogPage:
+    """One page of dialogs | 一頁對話"""
+    dialogs: list[DialogInfo]
+    # Opaque cursor of the next page, None on the last page | 下一頁的不透明游標，最後一頁為 None
+    next_cursor: Optional[str] = None
+
+
+@dataclass(slots=True)
+class SenderInfo:
+    """Message sender information | 訊息發送者資訊"""
+    id: int
+    name: str
+    username: Optional[str] = None
+    is_bot: bool = False
+    # Activity within a date window, set by activity scans only
+    # 日期區間內的活動，僅由活動掃描設定
+    message_count: Optional[int] = None
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+
+
+@dataclass(slots=True)
+class SenderActivity:
+    """Sender activity within a date window | 日期區間內的發送者活動"""
+    senders: list[SenderInfo]
+    # Messages read inside the window | 區間內讀取的訊息數
+    messages: int
+    # Whether the whole window was read within the message limit | 是否在訊息上限內讀完整個區間
+    complete: bool
+
+
+@dataclass
+class ScanProgress:
+    """Message range covered by a sender scan | 發送者掃描涵蓋的訊息範圍"""
+    messages: int = 0
+    min_id: Optional[int] = None
+    max_id: Optional[int] = None
+    # Latest message ID per sender | 每個發送者的最新訊息 ID
+    sender_message_ids: dict[int, int] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class ChatSendersResult:
+    """Sender scan result for one chat in a batch | 批次中單一聊天的發送者掃描結果"""
+    chat_id: int
+    senders: list[SenderInfo] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ResolvedPeer:
+    """Resolution of one username, link or ID | 單一用戶名、連結或 ID 的解析結果"""
+    query: str
+    id: Optional[int] = None
+    dialog_type: Optional[DialogType] = None
+    name: Optional[str] = None
+    username: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class AuthState:
+    """Authentication state | 認證狀態"""
+    is_logged_in: bool = False
+    phone_code_hash: Optional[str] = None
+    phone_number: Optional[str] = None
+    needs_2fa: bool = False
+    user_id: Optional[int] = None
+    user_name: Optional[str] = None
+    username: Optional[str] = None
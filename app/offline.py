@@ -0,0 +1,375 @@
+"""
+Offline Mode | 離線模式
+Session pool and service stand-ins answering from a snapshot file.
+由快照檔案回應的 session 池與服務替代品。
+
+The app uses these when TELEGRAM_OFFLINE_SNAPSHOT is set. Dialogs, sender
+lookups, search and config generation are served without a Telegram
+connection or a single RPC; calls that need Telegram raise OfflineModeError.
+設定 TELEGRAM_OFFLINE_SNAPSHOT 時，應用程式使用這些類別。對話、發送者查詢、搜尋與設定產生
+無需 Telegram 連線，也不發出任何 RPC；需要 Telegram 的呼叫會拋出 OfflineModeError。
+"""
+
+from typing import AsyncIterator, Optional
+
+from .caches import Versioned
+from .models import AuthState, ChatSendersResult, DialogInfo, DialogPage, DialogType, SenderInfo
+from .search_index import SearchHit, SearchIndex, matches_prefix
+from .snapshot import SnapshotReader
+from .telegram_service import (
+    SENDER_MODE_AUTO,
+    SENDER_MODE_MESSAGES,
+    SENDER_MODE_PARTICIPANTS,
+    PARTICIPANT_FILTERS,
+)
+
+
+# Mode reported for sender lists read from a snapshot | 由快照讀取之發送者列表回報的模式
+SENDER_MODE_SNAPSHOT = "snapshot"
+
+
+class OfflineModeError(RuntimeError):
+    """The call needs a Telegram connection | 此呼叫需要 Telegram 連線"""
+
+
+def _unavailable(name: str):
+    """Build a method that is not available offline | 建立離線時無法使用的方法"""
+    async def method(self, *args, **kwargs):
+        raise OfflineModeError(
+            f"{name} is not available in offline mode | 離線模式無法使用 {name}"
+        )
+
+    method.__name__ = name
+    method.__doc__ = "Not available offline | 離線時無法使用"
+    return method
+
+
+# ============================================================================
+# Offline Service | 離線服務
+# ============================================================================
+
+class OfflineTelegramService:
+    """
+    TelegramService stand-in backed by a snapshot.
+    以快照為後端的 TelegramService 替代品。
+
+    The snapshot never changes while served, so every result has version 1
+    and the snapshot's creation time; ETags change with each new snapshot.
+    快照在服務期間不會變更，因此所有結果的版本皆為 1 並帶有快照建立時間；ETag 隨新快照改變。
+    """
+
+    def __init__(self, reader: SnapshotReader):
+        self.reader = reader
+        self.instance_id = format(int(reader.created_at * 1000) & 0xFFFFFFFF, "08x")
+        account = reader.header.get("account") or {}
+        self._auth_state = AuthState(
+            is_logged_in=True,
+            user_id=account.get("id"),
+            user_name=account.get("name"),
+            username=account.get("username")
+        )
+        self._search_index: Optional[SearchIndex] = None
+
+    @property
+    def auth_state(self) -> AuthState:
+        """Account the snapshot was taken from | 快照來源帳號"""
+        return self._auth_state
+
+    def is_connected(self) -> bool:
+        """A loaded snapshot is always available | 已載入的快照永遠可用"""
+        return True
+
+    async def is_authorized(self) -> bool:
+        return True
+
+    async def get_status(self, force_refresh: bool = False) -> dict:
+        """Report the snapshot's account | 回報快照的帳號"""
+        return {
+            "is_logged_in": True,
+            "offline": True,
+            "snapshot_created_at": self.reader.created_at,
+            "user": {
+                "id": self._auth_state.user_id,
+                "name": self._auth_state.user_name,
+                "username": self._auth_state.username
+            }
+        }
+
+    send_code = _unavailable("send_code")
+    verify_code = _unavailable("verify_code")
+    logout = _unavailable("logout")
+    resolve = _unavailable("resolve")
+    get_sender_activity = _unavailable("get_sender_activity")
+
+    def start_warm_up(self, *args, **kwargs) -> None:
+        """Nothing to warm | 無需預熱"""
+
+    # ==================== Dialogs | 對話 ====================
+
+    def _versioned(self, value) -> Versioned:
+        """Wrap a result with the snapshot version | 以快照版本包裝結果"""
+        return Versioned(1, self.reader.created_at, value)
+
+    async def get_dialogs(self, refresh: bool = False) -> list[DialogInfo]:
+        return list(self.reader.dialogs())
+
+    def cached_dialogs(self) -> Versioned:
+        return self._versioned(list(self.reader.dialogs()))
+
+    async def get_dialogs_versioned(self, refresh: bool = False) -> Versioned:
+        return self.cached_dialogs()
+
+    async def iter_dialogs(self, refresh: bool = False) -> AsyncIterator[DialogInfo]:
+        for dialog in self.reader.dialogs():
+            yield dialog
+
+    async def get_dialogs_page(self, *args, **kwargs) -> DialogPage:
+        """
+        Pages and folders are read from Telegram, so they are rejected.
+        分頁與資料夾需向 Telegram 讀取，因此予以拒絕。
+        """
+        raise ValueError(
+            "Paging and folders are not available in offline mode | 離線模式不支援分頁與資料夾"
+        )
+
+    async def search(
+        self,
+        query: str = "",
+        kind: Optional[str] = None,
+        types: Optional[set[DialogType]] = None,
+        is_bot: Optional[bool] = None,
+        min_members: Optional[int] = None,
+        max_members: Optional[int] = None,
+        limit: int = 20
+    ) -> list[SearchHit]:
+        """
+        Search the snapshot; the index is built on first use.
+        搜尋快照；索引於首次使用時建立。
+        """
+        if self._search_index is None:
+            index = SearchIndex()
+            index.set_dialogs(self.reader.dialogs())
+            for chat_id in self.reader.chat_ids():
+                for sender in self.reader.senders(chat_id):
+                    index.add_sender(sender, chat_id)
+            self._search_index = index
+
+        return self._search_index.search(
+            query,
+            kind=kind,
+            types=types,
+            is_bot=is_bot,
+            min_members=min_members,
+            max_members=max_members,
+            limit=limit
+        )
+
+    # ==================== Senders | 發送者 ====================
+
+    def _senders(self, chat_id: int, max_senders: Optional[int] = None) -> list[SenderInfo]:
+        """
+        A chat's saved senders; the snapshot keeps no message positions,
+        so message limits do not apply.
+        聊天已儲存的發送者；快照不保存訊息位置，因此訊息數上限不適用。
+        """
+        senders = self.reader.senders(chat_id) or []
+        return senders[:max_senders] if max_senders else list(senders)
+
+    async def get_messages_senders(
+        self,
+        chat_id: int,
+        limit: int = 100,
+        max_senders: Optional[int] = None,
+        idle_limit: Optional[int] = None,
+        backfill: int = 0
+    ) -> list[SenderInfo]:
+        return self._senders(chat_id, max_senders)
+
+    def get_cached_senders(
+        self,
+        chat_id: int,
+        limit: int = 100,
+        max_senders: Optional[int] = None,
+        idle_limit: Optional[int] = None
+    ) -> Versioned:
+        return self._versioned(self._senders(chat_id, max_senders))
+
+    async def get_messages_senders_versioned(
+        self,
+        chat_id: int,
+        limit: int = 100,
+        backfill: int = 0
+    ) -> Versioned:
+        return self.get_cached_senders(chat_id)
+
+    async def iter_messages_senders(
+        self,
+        chat_id: int,
+        limit: int = 100,
+        max_senders: Optional[int] = None,
+        idle_limit: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[SenderInfo]:
+        for sender in self._senders(chat_id, max_senders):
+            yield sender
+
+    async def get_chat_senders(
+        self,
+        chat_id: int,
+        mode: str = SENDER_MODE_AUTO,
+        limit: int = 100,
+        filter: Optional[str] = None,
+        search: str = ""
+    ) -> tuple[str, list[SenderInfo]]:
+        """
+        Filter a chat's saved senders as TelegramService.get_chat_senders does.
+        如 TelegramService.get_chat_senders 般篩選聊天已儲存的發送者。
+
+        Raises:
+            ValueError: Invalid mode/filter, or admins requested | 無效的模式/篩選，或要求管理員
+        """
+        if mode not in (SENDER_MODE_AUTO, SENDER_MODE_PARTICIPANTS, SENDER_MODE_MESSAGES):
+            raise ValueError(f"Unknown mode: {mode} | 未知的模式：{mode}")
+        if filter is not None and filter not in PARTICIPANT_FILTERS:
+            raise ValueError(f"Unknown filter: {filter} | 未知的篩選：{filter}")
+        if filter == "admins":
+            raise ValueError(
+                "Admin list is not available in offline mode | 離線模式無法取得管理員列表"
+            )
+
+        return SENDER_MODE_SNAPSHOT, [
+            sender for sender in self._senders(chat_id)
+            if (filter != "bots" or sender.is_bot) and matches_prefix(sender, search)
+        ][:limit]
+
+    async def scan_senders_batch(
+        self,
+        chat_ids: list[int],
+        limit: int = 100,
+        limits: Optional[dict[int, int]] = None,
+        concurrency: int = 4
+    ) -> AsyncIterator[ChatSendersResult]:
+        for chat_id in dict.fromkeys(chat_ids):
+            yield ChatSendersResult(chat_id=chat_id, senders=self._senders(chat_id))
+
+    def complete_names(self, chats: list[dict], senders: list[dict]) -> tuple[list[dict], list[dict]]:
+        """
+        Fill in missing chat and sender names from the snapshot.
+        由快照補上缺少的聊天與發送者名稱。
+
+        Args:
+            chats: List of {id[, name]} | {id[, name]} 列表
+            senders: List of {id, chat_id[, name]} | {id, chat_id[, name]} 列表
+
+        Returns:
+            (chats, senders) with names where the snapshot knows them
+            | 快照已知者補上名稱的（chats, senders）
+        """
+        dialog_names = {dialog.id: dialog.name for dialog in self.reader.dialogs()}
+        chats = [
+            chat if chat.get("name") or chat.get("id") not in dialog_names
+            else {**chat, "name": dialog_names[chat["id"]]}
+            for chat in chats
+        ]
+
+        sender_names: dict[int, dict[int, str]] = {}
+        completed = []
+        for sender in senders:
+            chat_id = sender.get("chat_id")
+            if not sender.get("name") and chat_id is not None:
+                names = sender_names.get(chat_id)
+                if names is None:
+                    names = sender_names[chat_id] = {
+                        info.id: info.name for info in self.reader.senders(chat_id) or ()
+                    }
+                if sender.get("id") in names:
+                    sender = {**sender, "name": names[sender["id"]]}
+            completed.append(sender)
+        return chats, completed
+
+    def get_stats(self) -> dict:
+        """
+        Get snapshot statistics.
+        取得快照統計。
+        """
+        return {"snapshot": self.reader.stats()}
+
+
+# ============================================================================
+# Offline Pool | 離線池
+# ============================================================================
+
+class OfflineSessionPool:
+    """
+    SessionPool stand-in serving one snapshot to every browser session.
+    將同一快照提供給每個瀏覽器 session 的 SessionPool 替代品。
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the offline pool; the snapshot is opened on start.
+        初始化離線池；快照於啟動時開啟。
+
+        Args:
+            path: Snapshot file path | 快照檔案路徑
+        """
+        self.path = path
+        self._service: Optional[OfflineTelegramService] = None
+
+    def _load(self) -> OfflineTelegramService:
+        """Open the snapshot once | 開啟快照一次"""
+        if self._service is None:
+            self._service = OfflineTelegramService(SnapshotReader(self.path))
+        return self._service
+
+    # ==================== SessionPool API | SessionPool 介面 ====================
+
+    def register(self, key: str, api_id: int, api_hash: str) -> None:
+        """Credentials are not used offline | 離線時不使用憑證"""
+
+    def is_registered(self, key: str) -> bool:
+        return True
+
+    def peek(self, key: str) -> Optional[OfflineTelegramService]:
+        return self._service
+
+    async def get(self, key: str) -> OfflineTelegramService:
+        return self._load()
+
+    async def acquire(self, key: str) -> OfflineTelegramService:
+        return self._load()
+
+    async def release(self, key: str) -> None:
+        """The snapshot is never evicted | 快照不會被淘汰"""
+
+    async def create(self, key: str, api_id: int, api_hash: str) -> OfflineTelegramService:
+        raise OfflineModeError("Login is not available in offline mode | 離線模式無法登入")
+
+    async def remove(self, key: str) -> None:
+        """Nothing to disconnect | 無需中斷連線"""
+
+    def live_services(self) -> list:
+        """No Telegram clients are connected | 沒有連線的 Telegram 客戶端"""
+        return []
+
+    def start(self) -> None:
+        """Open the snapshot so the first request does not wait | 開啟快照，使第一個請求無需等待"""
+        self._load()
+
+    async def close(self) -> None:
+        if self._service is not None:
+            self._service.reader.close()
+            self._service = None
+
+    def stats(self) -> dict:
+        """
+        Get pool statistics.
+        取得池統計。
+        """
+        return {
+            "live_clients": 0,
+            "max_clients": 0,
+            "registered": 0,
+            "evictions": 0,
+            "offline": True,
+        }
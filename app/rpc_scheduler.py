@@ -0,0 +1,220 @@
+"""
+RPC Scheduler | RPC 排程器
+Paces every Telegram request and retries FloodWait errors automatically.
+為每個 Telegram 請求控制速率，並自動重試 FloodWait 錯誤。
+"""
+
+import time
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator
+
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+
+from . import metrics
+
+
+# Set for background work such as warm-up | 背景工作（例如預熱）時設定
+_low_priority: ContextVar[bool] = ContextVar("rpc_low_priority", default=False)
+
+
+@contextmanager
+def low_priority() -> Iterator[None]:
+    """
+    Run RPCs made inside the block at low priority.
+    以低優先權執行區塊內發出的 RPC。
+
+    Low-priority calls wait while foreground calls are queued and leave half
+    of the token bucket to them.
+    低優先權呼叫會在前景呼叫排隊時等待，並保留一半的 token 給前景呼叫。
+    """
+    token = _low_priority.set(True)
+    try:
+        yield
+    finally:
+        _low_priority.reset(token)
+
+
+class RpcScheduler:
+    """
+    Token-bucket RPC scheduler shared by all calls on one client.
+    同一客戶端所有呼叫共用的 token bucket RPC 排程器。
+
+    Calls queue in FIFO order for a token. A FloodWait pauses the whole queue
+    for the server-specified time, then the call is retried, so concurrent
+    users slow down instead of tripping longer bans.
+    呼叫依 FIFO 順序排隊取得 token。FloodWait 會依伺服器指定時間暫停整個佇列後重試，
+    使並行使用者減速而非觸發更長的封鎖。
+    """
+
+    def __init__(
+        self,
+        rate: float = 15.0,
+        burst: int = 30,
+        max_flood_wait: float = 300.0,
+        max_retries: int = 3
+    ):
+        """
+        Initialize the scheduler.
+        初始化排程器。
+
+        Args:
+            rate: Sustained requests per second | 持續每秒請求數
+            burst: Bucket size (requests allowed at once) | 桶容量（可同時允許的請求數）
+            max_flood_wait: Longest FloodWait to sleep through; longer ones are raised
+                            | 可等待的最長 FloodWait，超過則拋出
+            max_retries: Retries per call after FloodWait | 每次呼叫在 FloodWait 後的重試次數
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_flood_wait = max_flood_wait
+        self.max_retries = max_retries
+
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+        # Statistics | 統計
+        self._queued = 0
+        self._foreground_waiting = 0
+        self.calls = 0
+        self.background_calls = 0
+        self.retries = 0
+        self.flood_waits = 0
+        self.flood_wait_seconds = 0.0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run an RPC once a token is available, retrying after FloodWait.
+        取得 token 後執行 RPC，並在 FloodWait 後重試。
+
+        Raises:
+            FloodWaitError: Wait exceeds max_flood_wait or retries are exhausted
+                            | 等待超過 max_flood_wait 或重試次數用盡
+        """
+        background = _low_priority.get()
+        self._queued += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                await self._acquire(background)
+                self.calls += 1
+                if background:
+                    self.background_calls += 1
+                try:
+                    return await func(*args, **kwargs)
+                except FloodWaitError as e:
+                    # Counted whether or not the call is retried | 無論是否重試皆計入
+                    self.flood_waits += 1
+                    self.flood_wait_seconds += e.seconds
+                    metrics.observe_flood_wait(e.seconds)
+                    if e.seconds > self.max_flood_wait or attempt == self.max_retries:
+                        raise
+                    self.retries += 1
+                    # Pause the whole queue | 暫停整個佇列
+                    self._paused_until = max(self._paused_until, time.monotonic() + e.seconds)
+        finally:
+            self._queued -= 1
+
+    async def _acquire(self, background: bool = False) -> None:
+        """
+        Wait for a token (and for any FloodWait pause to end).
+        等待 token（以及任何 FloodWait 暫停結束）。
+        """
+        started = time.monotonic()
+        if background:
+            # Yield to foreground calls | 讓位給前景呼叫
+            while self._foreground_waiting or self._available() < self.burst / 2:
+                await asyncio.sleep(1 / self.rate)
+        else:
+            self._foreground_waiting += 1
+
+        try:
+            await self._take_token()
+        finally:
+            if not background:
+                self._foreground_waiting -= 1
+
+        waited = time.monotonic() - started
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    async def _take_token(self) -> None:
+        """
+        Take a token in FIFO order.
+        依 FIFO 順序取得 token。
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if self._paused_until > now:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(
+                    float(self.burst),
+                    self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def _available(self) -> float:
+        """Tokens available now, without taking one | 目前可用的 token 數（不取用）"""
+        now = time.monotonic()
+        if self._paused_until > now:
+            return 0.0
+        return min(float(self.burst), self._tokens + (now - self._updated_at) * self.rate)
+
+    def stats(self) -> dict:
+        """
+        Get scheduler statistics.
+        取得排程器統計。
+        """
+        return {
+            "queue_depth": self._queued,
+            "calls": self.calls,
+            "background_calls": self.background_calls,
+            "retries": self.retries,
+            "flood_waits": self.flood_waits,
+            "flood_wait_seconds": self.flood_wait_seconds,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+        }
+
+
+class ScheduledTelegramClient(TelegramClient):
+    """
+    TelegramClient that sends every request through an RpcScheduler.
+    所有請求皆經由 RpcScheduler 送出的 TelegramClient。
+
+    High-level helpers such as iter_dialogs and iter_messages issue their
+    requests through __call__, so they are paced as well.
+    iter_dialogs、iter_messages 等高階方法皆透過 __call__ 發送請求，因此同樣受到控速。
+    """
+
+    def __init__(self, *args, scheduler: RpcScheduler, **kwargs):
+        # Let FloodWait reach the scheduler instead of sleeping inside Telethon
+        # 讓 FloodWait 交由排程器處理，而非在 Telethon 內部睡眠
+        kwargs.setdefault("flood_sleep_threshold", 0)
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler
+
+    async def __call__(self, request, ordered=False, flood_sleep_threshold=None):
+        started = time.perf_counter()
+        error = None
+        try:
+            return await self.scheduler.call(super().__call__, request, ordered)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            metrics.observe_rpc(type(request).__name__, time.perf_counter() - started, error)
@@ -0,0 +1,423 @@
+"""
+Search Index | 搜尋索引
+In-memory index over known dialogs and senders for type-ahead search.
+已知對話與發送者的記憶體內索引，用於即時輸入搜尋。
+
+Names and usernames are indexed by word prefix (1-2 characters) and by
+trigram (3+ characters). Dialog type, member count and the bot flag have
+secondary indexes. Every change updates only the entry it touches.
+名稱與用戶名以字首（1-2 個字元）與三字元組（3 個字元以上）建立索引；
+對話類型、成員數與機器人旗標另有次要索引。每次變更只更新受影響的項目。
+"""
+
+import re
+import heapq
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Union
+
+from .models import DialogInfo, DialogType, SenderInfo
+
+
+# Entry kinds | 項目種類
+KIND_DIALOG = "dialog"
+KIND_SENDER = "sender"
+
+# Queries shorter than this use the word prefix index | 短於此長度的查詢使用字首索引
+_GRAM = 3
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Fold case and width for matching | 為比對統一大小寫與全半形"""
+    return unicodedata.normalize("NFKC", text or "").casefold()
+
+
+def matches_prefix(sender: SenderInfo, prefix: str) -> bool:
+    """
+    Check whether any name word or the username starts with prefix.
+    檢查名稱中任一字詞或用戶名是否以前綴開頭。
+
+    Shared by the online and offline member filters so both match alike.
+    由線上與離線的成員篩選共用，使兩者比對一致。
+    """
+    if not prefix:
+        return True
+
+    prefix = prefix.casefold()
+    words = sender.name.casefold().split()
+    if sender.username:
+        words.append(sender.username.casefold())
+    return any(word.startswith(prefix) for word in words)
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """A matched dialog or sender | 符合的對話或發送者"""
+    kind: str
+    value: Union[DialogInfo, SenderInfo]
+    # Chats a sender was seen in | 發送者出現過的聊天
+    chat_ids: list[int] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class _Entry:
+    """Indexed document | 已索引的文件"""
+    kind: str
+    value: Union[DialogInfo, SenderInfo]
+    # Source fields, to detect changes to shared objects | 來源欄位，用於偵測共用物件的變更
+    source: tuple
+    name: str
+    username: str
+    dialog_type: Optional[DialogType]
+    members: Optional[int]
+    is_bot: bool
+    chat_ids: set[int] = field(default_factory=set)
+    # Text index keys | 文字索引鍵
+    keys: frozenset = frozenset()
+
+
+class SearchIndex:
+    """
+    Prefix/trigram index with secondary indexes.
+    具次要索引的字首/三字元組索引。
+
+    Text postings are keyed "e:" (whole name), "l:" (leading 1-2 characters),
+    "w:" (word prefix) and "g:" (trigram). Entries are addressed by small
+    integer slots so posting sets stay compact.
+    文字倒排的鍵為 "e:"（完整名稱）、"l:"（開頭 1-2 個字元）、"w:"（字首）與
+    "g:"（三字元組）。項目以小整數槽位定址，使倒排集合保持精簡。
+    """
+
+    def __init__(self):
+        self._entries: dict[int, _Entry] = {}
+        self._slots: dict[tuple[str, int], int] = {}
+        self._next_slot = 0
+        self._postings: dict[str, set[int]] = {}
+        # Postings sorted by member count and name, built on first query
+        # 依成員數與名稱排序的倒排，於首次查詢時建立
+        self._ordered: dict[str, list[int]] = {}
+        # Secondary indexes | 次要索引
+        self._by_kind: dict[str, set[int]] = {KIND_DIALOG: set(), KIND_SENDER: set()}
+        self._by_type: dict[DialogType, set[int]] = {}
+        self._bots: set[int] = set()
+        # Sorted (members_count, slot) pairs | 已排序的（成員數, 槽位）組
+        self._members: list[tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ==================== Updates | 更新 ====================
+
+    def set_dialogs(self, dialogs: Iterable[DialogInfo]) -> None:
+        """
+        Make the indexed dialogs match a full list.
+        使已索引的對話與完整列表一致。
+        """
+        keep = set()
+        for dialog in dialogs:
+            keep.add(dialog.id)
+            self.upsert_dialog(dialog)
+        for kind, key in [k for k in self._slots if k[0] == KIND_DIALOG and k[1] not in keep]:
+            self._remove(kind, key)
+
+    def upsert_dialog(self, dialog: DialogInfo) -> None:
+        """Index or re-index a dialog | 索引或重新索引對話"""
+        source = (dialog.name, dialog.username, dialog.dialog_type, dialog.members_count)
+        entry = self._get(KIND_DIALOG, dialog.id)
+        if entry is not None and entry.source == source:
+            entry.value = dialog
+            return
+        self._put(KIND_DIALOG, dialog.id, _Entry(
+            kind=KIND_DIALOG,
+            value=dialog,
+            source=source,
+            name=normalize(dialog.name),
+            username=normalize(dialog.username),
+            dialog_type=dialog.dialog_type,
+            members=dialog.members_count,
+            is_bot=dialog.dialog_type == DialogType.BOT
+        ))
+
+    def remove_dialog(self, dialog_id: int) -> None:
+        """Drop a dialog | 移除對話"""
+        self._remove(KIND_DIALOG, dialog_id)
+
+    def clear_dialogs(self) -> None:
+        """Drop all dialogs | 移除所有對話"""
+        self.set_dialogs(())
+
+    def add_sender(self, sender: SenderInfo, chat_id: Optional[int] = None) -> None:
+        """
+        Index a sender, recording the chat it was seen in.
+        索引發送者，並記錄其出現的聊天。
+        """
+        source = (sender.name, sender.username, sender.is_bot)
+        entry = self._get(KIND_SENDER, sender.id)
+        if entry is None or entry.source != source:
+            entry = _Entry(
+                kind=KIND_SENDER,
+                value=sender,
+                source=source,
+                name=normalize(sender.name),
+                username=normalize(sender.username),
+                dialog_type=None,
+                members=None,
+                is_bot=sender.is_bot,
+                chat_ids=entry.chat_ids if entry is not None else set()
+            )
+            self._put(KIND_SENDER, sender.id, entry)
+        if chat_id is not None:
+            entry.chat_ids.add(chat_id)
+
+    def clear(self) -> None:
+        """Drop everything | 清除全部"""
+        self.__init__()
+
+    # ==================== Queries | 查詢 ====================
+
+    def search(
+        self,
+        query: str = "",
+        kind: Optional[str] = None,
+        types: Optional[set[DialogType]] = None,
+        is_bot: Optional[bool] = None,
+        min_members: Optional[int] = None,
+        max_members: Optional[int] = None,
+        limit: int = 20
+    ) -> list[SearchHit]:
+        """
+        Find dialogs and senders by name or username.
+        依名稱或用戶名尋找對話與發送者。
+
+        Queries of one or two characters match the start of a word; longer
+        queries match anywhere. Exact and leading matches rank first, then
+        larger chats.
+        一至兩個字元的查詢比對字首；較長的查詢比對任意位置。
+        完全相符與開頭相符者優先，其次為較大的聊天。
+
+        Args:
+            query: Text to find (empty = filters only) | 要尋找的文字（空白則只套用篩選）
+            kind: "dialog" or "sender" | "dialog" 或 "sender"
+            types: Dialog types to keep | 保留的對話類型
+            is_bot: Keep only bots (True) or non-bots (False) | 只保留機器人（True）或非機器人（False）
+            min_members: Minimum member count | 最小成員數
+            max_members: Maximum member count | 最大成員數
+            limit: Maximum hits | 最大結果數
+        """
+        # "@name" searches usernames too | "@name" 同樣搜尋用戶名
+        query = normalize(query).strip().lstrip("@")
+
+        filters = []
+        if kind is not None:
+            filters.append(self._by_kind.get(kind, set()))
+        if types:
+            filters.append(set().union(*(self._by_type.get(t, ()) for t in types)))
+        if is_bot is True:
+            filters.append(self._bots)
+        if min_members is not None or max_members is not None:
+            filters.append(self._member_range(min_members, max_members))
+
+        if query and len(query) < _GRAM:
+            words = self._postings.get("w:" + query)
+            if not words:
+                return []
+            # Selective text: walk the ranked tiers and stop at limit
+            # 文字較具選擇性時：依排名層走訪並於達到上限時停止
+            if all(len(f) >= len(words) for f in filters):
+                return self._walk(query, filters, is_bot, limit)
+            postings = [words, *filters]
+        elif query:
+            postings = [self._postings.get("g:" + gram, set()) for gram in set(_trigrams(query))]
+            postings += filters
+        else:
+            postings = filters
+
+        # Intersect from the smallest set | 由最小的集合開始交集
+        if postings:
+            postings.sort(key=len)
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates = candidates & posting
+        else:
+            candidates = self._entries.keys()
+
+        ranked = []
+        for slot in candidates:
+            entry = self._entries[slot]
+            if is_bot is False and entry.is_bot:
+                continue
+            rank = _rank(entry, query) if query else 0
+            if rank is None:
+                continue
+            ranked.append((rank, -(entry.members or 0), entry.name, slot))
+
+        return [
+            self._hit(self._entries[slot])
+            for *_, slot in heapq.nsmallest(limit, ranked)
+        ]
+
+    def stats(self) -> dict:
+        """
+        Get index statistics.
+        取得索引統計。
+        """
+        return {
+            "dialogs": len(self._by_kind[KIND_DIALOG]),
+            "senders": len(self._by_kind[KIND_SENDER]),
+            "keys": len(self._postings),
+            "ordered_keys": len(self._ordered),
+        }
+
+    # ==================== Internals | 內部 ====================
+
+    def _walk(
+        self,
+        query: str,
+        filters: list[set[int]],
+        is_bot: Optional[bool],
+        limit: int
+    ) -> list[SearchHit]:
+        """
+        Collect hits tier by tier: exact, leading, then word start.
+        逐層收集結果：完全相符、開頭，接著字首。
+        """
+        hits = []
+        taken = set()
+        for tier in ("e:", "l:", "w:"):
+            for slot in self._order(tier + query):
+                if slot in taken:
+                    continue
+                entry = self._entries[slot]
+                if (is_bot is False and entry.is_bot) or any(slot not in f for f in filters):
+                    continue
+                taken.add(slot)
+                hits.append(self._hit(entry))
+                if len(hits) >= limit:
+                    return hits
+        return hits
+
+    def _order(self, key: str) -> list[int]:
+        """Slots of a posting, largest chats first | 倒排中的槽位，較大的聊天在前"""
+        order = self._ordered.get(key)
+        if order is None:
+            entries = self._entries
+            order = self._ordered[key] = sorted(
+                self._postings.get(key, ()),
+                key=lambda slot: (-(entries[slot].members or 0), entries[slot].name, slot)
+            )
+        return order
+
+    def _get(self, kind: str, key: int) -> Optional[_Entry]:
+        slot = self._slots.get((kind, key))
+        return None if slot is None else self._entries[slot]
+
+    def _put(self, kind: str, key: int, entry: _Entry) -> None:
+        """Insert or replace an entry and its postings | 插入或取代項目及其倒排"""
+        slot = self._slots.get((kind, key))
+        if slot is None:
+            slot = self._slots[(kind, key)] = self._next_slot
+            self._next_slot += 1
+        else:
+            self._unlink(slot, self._entries[slot])
+
+        keys = set()
+        for text in (entry.name, entry.username):
+            if not text:
+                continue
+            keys.add("e:" + text)
+            keys.update("l:" + text[:n] for n in range(1, _GRAM))
+            keys.update("w:" + word[:n] for word in _WORD.findall(text) for n in range(1, _GRAM))
+            keys.update("g:" + gram for gram in _trigrams(text))
+        entry.keys = frozenset(keys)
+
+        self._entries[slot] = entry
+        self._link(slot, entry)
+
+    def _remove(self, kind: str, key: int) -> None:
+        slot = self._slots.pop((kind, key), None)
+        if slot is not None:
+            self._unlink(slot, self._entries.pop(slot))
+
+    def _link(self, slot: int, entry: _Entry) -> None:
+        for key in entry.keys:
+            self._postings.setdefault(key, set()).add(slot)
+            self._ordered.pop(key, None)
+        self._by_kind[entry.kind].add(slot)
+        if entry.dialog_type is not None:
+            self._by_type.setdefault(entry.dialog_type, set()).add(slot)
+        if entry.is_bot:
+            self._bots.add(slot)
+        if entry.members is not None:
+            insort(self._members, (entry.members, slot))
+
+    def _unlink(self, slot: int, entry: _Entry) -> None:
+        for key in entry.keys:
+            posting = self._postings[key]
+            posting.discard(slot)
+            if not posting:
+                del self._postings[key]
+            self._ordered.pop(key, None)
+        self._by_kind[entry.kind].discard(slot)
+        if entry.dialog_type is not None:
+            self._by_type[entry.dialog_type].discard(slot)
+        self._bots.discard(slot)
+        if entry.members is not None:
+            del self._members[bisect_left(self._members, (entry.members, slot))]
+
+    def _member_range(self, low: Optional[int], high: Optional[int]) -> set[int]:
+        """Slots with a member count in [low, high] | 成員數介於 [low, high] 的槽位"""
+        start = 0 if low is None else bisect_left(self._members, (low, -1))
+        end = len(self._members) if high is None else bisect_right(self._members, (high, self._next_slot))
+        return {slot for _, slot in self._members[start:end]}
+
+    def _hit(self, entry: _Entry) -> SearchHit:
+        return SearchHit(entry.kind, entry.value, sorted(entry.chat_ids))
+
+
+def _trigrams(text: str) -> Iterable[str]:
+    """Every 3-character substring | 所有 3 字元子字串"""
+    return (text[i:i + _GRAM] for i in range(len(text) - _GRAM + 1))
+
+
+def _rank(entry: _Entry, query: str) -> Optional[int]:
+    """
+    Rank a candidate, or None if it does not match.
+    為候選項目排名，不符合時為 None。
+
+    0 exact, 1 leading, 2 word start, 3 anywhere (long queries only)
+    | 0 完全相符、1 開頭、2 字首、3 任意位置（僅限較長的查詢）
+    """
+    best = None
+    for text in (entry.name, entry.username):
+        pos = text.find(query)
+        if pos < 0:
+            continue
+        if len(text) == len(query):
+            return 0
+
+        rank = 3
+        while pos >= 0:
+            if pos == 0:
+                rank = 1
+                break
+            if not _is_word_char(text[pos - 1]):
+                rank = 2
+                break
+            pos = text.find(query, pos + 1)
+
+        if best is None or rank < best:
+            best = rank
+
+    if best == 3 and len(query) < _GRAM:
+        return None
+    return best
+
+
+def _is_word_char(char: str) -> bool:
+    """Same characters as \\w | 與 \\w 相同的字元"""
+    return char.isalnum() or char == "_"
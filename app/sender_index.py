@@ -0,0 +1,201 @@
+"""
+Sender Index | 發送者索引
+Persistent per-chat sender index stored in SQLite next to the session file.
+儲存於 session 檔案旁的 SQLite 持久化聊天發送者索引。
+
+For each chat the index records the contiguous range of message IDs already
+scanned and the senders found in it, so later scans only fetch new messages.
+Each chat's version and modification time are stored with its range, so
+validators survive restarts.
+每個聊天記錄已掃描的連續訊息 ID 範圍與其中找到的發送者，之後的掃描只需取得新訊息。
+每個聊天的版本與修改時間與範圍一同儲存，使驗證器在重啟後仍然有效。
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Optional
+from dataclasses import dataclass
+
+from .caches import Versioned
+from .models import SenderInfo
+
+
+@dataclass
+class ScanRange:
+    """Scanned message ID range for a chat | 聊天已掃描的訊息 ID 範圍"""
+    min_id: int
+    max_id: int
+
+
+class SenderIndex:
+    """
+    SQLite-backed sender index.
+    以 SQLite 為後端的發送者索引。
+
+    Database work runs in a worker thread to keep it off the event loop.
+    資料庫操作在工作執行緒中執行，避免佔用事件迴圈。
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the sender index.
+        初始化發送者索引。
+
+        Args:
+            path: SQLite database file path | SQLite 資料庫檔案路徑
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open the database and create tables on first use.
+        首次使用時開啟資料庫並建立資料表。
+        """
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS scans (
+                    chat_id INTEGER PRIMARY KEY,
+                    min_id INTEGER NOT NULL,
+                    max_id INTEGER NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    modified_at REAL NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS senders (
+                    chat_id INTEGER NOT NULL,
+                    sender_id INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    username TEXT,
+                    is_bot INTEGER NOT NULL DEFAULT 0,
+                    last_message_id INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (chat_id, sender_id)
+                );
+            """)
+            # Indexes written before versions were stored | 儲存版本之前寫入的索引
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(scans)")}
+            if "version" not in columns:
+                with conn:
+                    conn.execute("ALTER TABLE scans ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+                    conn.execute("ALTER TABLE scans ADD COLUMN modified_at REAL NOT NULL DEFAULT 0")
+            self._conn = conn
+        return self._conn
+
+    async def get_range(self, chat_id: int) -> Optional[ScanRange]:
+        """
+        Get the scanned message range for a chat.
+        取得聊天已掃描的訊息範圍。
+        """
+        def query():
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT min_id, max_id FROM scans WHERE chat_id = ?",
+                    (chat_id,)
+                ).fetchone()
+            return ScanRange(min_id=row[0], max_id=row[1]) if row else None
+
+        return await asyncio.to_thread(query)
+
+    async def get_senders(self, chat_id: int) -> Versioned:
+        """
+        Get indexed senders for a chat, most recently active first.
+        取得聊天已索引的發送者，最近活躍者在前。
+
+        Returns:
+            Versioned list of SenderInfo; version 0 when nothing is indexed
+            | 帶版本的 SenderInfo 列表；未索引任何資料時版本為 0
+        """
+        def query():
+            with self._lock:
+                conn = self._connect()
+                # Read together, so the version matches the senders | 一併讀取，使版本與發送者一致
+                version = conn.execute(
+                    "SELECT version, modified_at FROM scans WHERE chat_id = ?",
+                    (chat_id,)
+                ).fetchone()
+                rows = conn.execute(
+                    "SELECT sender_id, name, username, is_bot FROM senders "
+                    "WHERE chat_id = ? ORDER BY last_message_id DESC",
+                    (chat_id,)
+                ).fetchall()
+            senders = [
+                SenderInfo(id=row[0], name=row[1], username=row[2], is_bot=bool(row[3]))
+                for row in rows
+            ]
+            return Versioned(*(version or (0, 0.0)), senders)
+
+        return await asyncio.to_thread(query)
+
+    async def record_scan(
+        self,
+        chat_id: int,
+        scan_range: ScanRange,
+        senders: list[tuple[SenderInfo, int]]
+    ) -> None:
+        """
+        Store a scan's range and senders, bumping the version if any were found.
+        儲存一次掃描的範圍與發送者，若有找到發送者則遞增版本。
+
+        Args:
+            chat_id: Chat ID | 聊天 ID
+            scan_range: New contiguous scanned range | 新的連續已掃描範圍
+            senders: (SenderInfo, latest message ID) pairs | （SenderInfo, 最新訊息 ID）配對
+        """
+        # A range-only change leaves the sender list as it was | 只變更範圍時發送者列表不變
+        bump = 1 if senders else 0
+        modified_at = time.time() if senders else 0.0
+
+        def write():
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT INTO scans (chat_id, min_id, max_id, version, modified_at) "
+                        "VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT (chat_id) DO UPDATE SET "
+                        "min_id = excluded.min_id, max_id = excluded.max_id, "
+                        "version = version + excluded.version, "
+                        "modified_at = MAX(modified_at, excluded.modified_at)",
+                        (chat_id, scan_range.min_id, scan_range.max_id, bump, modified_at)
+                    )
+                    conn.executemany(
+                        "INSERT INTO senders "
+                        "(chat_id, sender_id, name, username, is_bot, last_message_id) "
+                        "VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (chat_id, sender_id) DO UPDATE SET "
+                        "name = excluded.name, username = excluded.username, "
+                        "is_bot = excluded.is_bot, "
+                        "last_message_id = MAX(last_message_id, excluded.last_message_id)",
+                        [
+                            (chat_id, s.id, s.name, s.username, int(s.is_bot), message_id)
+                            for s, message_id in senders
+                        ]
+                    )
+
+        await asyncio.to_thread(write)
+
+    async def clear(self) -> None:
+        """
+        Delete the index (e.g. on logout).
+        刪除索引（例如登出時）。
+        """
+        def remove():
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+
+        await asyncio.to_thread(remove)
+
+    def close(self) -> None:
+        """Close the database connection | 關閉資料庫連線"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
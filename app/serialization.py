@@ -0,0 +1,103 @@
+"""
+Serialization | 序列化
+Fast JSON encoding for result models.
+結果模型的快速 JSON 編碼。
+
+Models are converted with hand-written field access instead of
+dataclasses.asdict (which deep-copies recursively) and encoded straight
+to bytes, skipping FastAPI's generic jsonable_encoder pass.
+模型以手寫欄位存取轉換，而非遞迴深拷貝的 dataclasses.asdict，並直接編碼為 bytes，
+略過 FastAPI 通用的 jsonable_encoder。
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+from .models import DialogInfo, SenderInfo, ChatSendersResult, ResolvedPeer
+from .search_index import KIND_DIALOG, SearchHit
+
+try:
+    # Optional C accelerator | 選用的 C 加速器
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+
+def dialog_to_dict(dialog: DialogInfo) -> dict:
+    """Convert a DialogInfo to a JSON-ready dict | 將 DialogInfo 轉為可 JSON 化的字典"""
+    return {
+        "id": dialog.id,
+        "name": dialog.name,
+        "dialog_type": dialog.dialog_type.value,
+        "username": dialog.username,
+        "members_count": dialog.members_count,
+    }
+
+
+def sender_to_dict(sender: SenderInfo) -> dict:
+    """Convert a SenderInfo to a JSON-ready dict | 將 SenderInfo 轉為可 JSON 化的字典"""
+    data = {
+        "id": sender.id,
+        "name": sender.name,
+        "username": sender.username,
+        "is_bot": sender.is_bot,
+    }
+    # Activity fields only appear on activity scans | 活動欄位只出現在活動掃描中
+    if sender.message_count is not None:
+        data["message_count"] = sender.message_count
+        data["first_seen"] = sender.first_seen.isoformat()
+        data["last_seen"] = sender.last_seen.isoformat()
+    return data
+
+
+def chat_senders_to_dict(result: ChatSendersResult) -> dict:
+    """Convert a ChatSendersResult to a JSON-ready dict | 將 ChatSendersResult 轉為可 JSON 化的字典"""
+    return {
+        "chat_id": result.chat_id,
+        "senders": [sender_to_dict(s) for s in result.senders],
+        "error": result.error,
+    }
+
+
+def resolved_peer_to_dict(peer: ResolvedPeer) -> dict:
+    """Convert a ResolvedPeer to a JSON-ready dict | 將 ResolvedPeer 轉為可 JSON 化的字典"""
+    return {
+        "query": peer.query,
+        "id": peer.id,
+        "dialog_type": peer.dialog_type.value if peer.dialog_type else None,
+        "name": peer.name,
+        "username": peer.username,
+        "error": peer.error,
+    }
+
+
+def search_hit_to_dict(hit: SearchHit) -> dict:
+    """Convert a SearchHit to a JSON-ready dict | 將 SearchHit 轉為可 JSON 化的字典"""
+    if hit.kind == KIND_DIALOG:
+        return {"kind": hit.kind, **dialog_to_dict(hit.value)}
+    return {"kind": hit.kind, **sender_to_dict(hit.value), "chat_ids": hit.chat_ids}
+
+
+def json_bytes(content: Any) -> bytes:
+    """
+    Encode JSON-ready content to UTF-8 bytes.
+    將可 JSON 化的內容編碼為 UTF-8 bytes。
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response that encodes content directly to bytes.
+    直接將內容編碼為 bytes 的 JSON 回應。
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return json_bytes(content)
@@ -0,0 +1,102 @@
+"""
+Service Factory | 服務工廠
+Builds Telegram services and the session pool from environment settings.
+依環境設定建立 Telegram 服務與 session 池。
+
+Shared by the web application and the broker process.
+由網頁應用程式與 broker 程序共用。
+"""
+
+import os
+
+from .sender_index import SenderIndex
+from .rpc_scheduler import RpcScheduler
+from .caches import EntityCache, SenderCache
+from .session_storage import STORAGE_MEMORY, STORAGE_SQLITE, FileSessionStore
+from .session_pool import SessionPool, DEFAULT_KEY
+from .telegram_service import TelegramService
+
+
+def create_service(key: str, api_id: int, api_hash: str) -> TelegramService:
+    """
+    Create a Telegram service from environment settings.
+    依環境設定建立 Telegram 服務。
+
+    Each pool key gets its own session file; the default key keeps the
+    configured name.
+    每個 pool 鍵有自己的 session 檔案；預設鍵沿用設定的名稱。
+    """
+    session_name = os.getenv("TELEGRAM_SESSION_NAME", "telegram_id_finder")
+    if key != DEFAULT_KEY:
+        session_name = f"{session_name}_{key}"
+
+    # Sender index lives next to the session file | 發送者索引位於 session 檔案旁
+    sender_index = None
+    if os.getenv("TELEGRAM_SENDER_INDEX", "true").lower() in ("1", "true", "yes"):
+        sender_index = SenderIndex(f"{session_name}.senders.db")
+
+    # In-memory session snapshotted next to the session file | 記憶體內 session，快照位於 session 檔案旁
+    storage = os.getenv("TELEGRAM_SESSION_STORAGE", STORAGE_SQLITE).lower()
+    if storage not in (STORAGE_SQLITE, STORAGE_MEMORY):
+        raise ValueError(
+            "TELEGRAM_SESSION_STORAGE must be sqlite or memory | "
+            "TELEGRAM_SESSION_STORAGE 必須為 sqlite 或 memory"
+        )
+    session_store = None
+    if storage == STORAGE_MEMORY:
+        session_store = FileSessionStore(
+            f"{session_name}.session.json",
+            sqlite_session=session_name
+        )
+
+    return TelegramService(
+        api_id=api_id,
+        api_hash=api_hash,
+        session_name=session_name,
+        auth_cache_ttl=float(os.getenv("TELEGRAM_AUTH_CACHE_TTL", "300")),
+        dialog_cache_ttl=float(os.getenv("TELEGRAM_DIALOG_CACHE_TTL", "600")),
+        sender_index=sender_index,
+        rpc_scheduler=RpcScheduler(
+            rate=float(os.getenv("TELEGRAM_RPC_RATE", "15")),
+            burst=int(os.getenv("TELEGRAM_RPC_BURST", "30")),
+            max_flood_wait=float(os.getenv("TELEGRAM_MAX_FLOOD_WAIT", "300"))
+        ),
+        entity_cache=EntityCache(
+            max_size=int(os.getenv("TELEGRAM_ENTITY_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("TELEGRAM_ENTITY_CACHE_TTL", "0")) or None
+        ),
+        sender_cache=SenderCache(ttl=float(os.getenv("TELEGRAM_SENDER_CACHE_TTL", "300"))),
+        session_store=session_store,
+        snapshot_interval=float(os.getenv("TELEGRAM_SESSION_SNAPSHOT_INTERVAL", "60"))
+    )
+
+
+def start_warm_up(service: TelegramService) -> None:
+    """
+    Warm the service's caches in the background if enabled.
+    若已啟用，則在背景預熱服務的快取。
+    """
+    if os.getenv("TELEGRAM_WARMUP", "false").lower() not in ("1", "true", "yes"):
+        return
+
+    chat_ids = [
+        int(chat_id) for chat_id in os.getenv("TELEGRAM_WARMUP_CHATS", "").split(",")
+        if chat_id.strip()
+    ]
+    service.start_warm_up(
+        chat_ids=chat_ids or None,
+        top=int(os.getenv("TELEGRAM_WARMUP_TOP", "5")),
+        limit=min(int(os.getenv("TELEGRAM_WARMUP_LIMIT", "200")), 500)
+    )
+
+
+def create_session_pool() -> SessionPool:
+    """
+    Create the session pool from environment settings.
+    依環境設定建立 session 池。
+    """
+    return SessionPool(
+        factory=create_service,
+        max_clients=int(os.getenv("TELEGRAM_MAX_CLIENTS", "8")),
+        idle_timeout=float(os.getenv("TELEGRAM_CLIENT_IDLE_TIMEOUT", "1800"))
+    )
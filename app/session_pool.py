@@ -0,0 +1,333 @@
+"""
+Session Pool | Session 池
+Holds one TelegramService per account or browser session.
+為每個帳號或瀏覽器 session 保存一個 TelegramService。
+"""
+
+import re
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .telegram_service import TelegramService
+
+
+# Key used for the credentials configured in the environment
+# 環境變數中設定之憑證所使用的鍵
+DEFAULT_KEY = "default"
+
+# Keys become part of session file names, so only safe characters are allowed
+# 鍵會成為 session 檔名的一部分，因此只允許安全字元
+_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+ServiceFactory = Callable[[str, int, str], TelegramService]
+
+
+def is_valid_key(key: Optional[str]) -> bool:
+    """Check whether a pool key is safe to use | 檢查 pool 鍵是否可安全使用"""
+    return bool(key) and bool(_KEY_PATTERN.match(key))
+
+
+class SessionPool:
+    """
+    LRU pool of live TelegramService connections.
+    存活 TelegramService 連線的 LRU 池。
+
+    Credentials of logged-in keys are remembered, so evicted services are
+    restored lazily from their session files on the next request. Services
+    held by a request or waiting for a login code are never evicted; the
+    cap is enforced again once they are released.
+    已登入之鍵的憑證會被保留，被淘汰的服務會在下一次請求時從 session 檔案延遲還原。
+    被請求持有或等待登入驗證碼的服務不會被淘汰；釋放後會再次套用上限。
+    """
+
+    def __init__(
+        self,
+        factory: ServiceFactory,
+        max_clients: int = 8,
+        idle_timeout: float = 1800.0
+    ):
+        """
+        Initialize the session pool.
+        初始化 session 池。
+
+        Args:
+            factory: Builds a service from (key, api_id, api_hash)
+                     | 由（鍵, api_id, api_hash）建立服務
+            max_clients: Maximum live client connections | 最大存活客戶端連線數
+            idle_timeout: Seconds before an unused client is disconnected
+                          | 未使用的客戶端斷線前的秒數
+        """
+        self.factory = factory
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+
+        self._services: "OrderedDict[str, TelegramService]" = OrderedDict()
+        self._last_used: dict[str, float] = {}
+        self._credentials: dict[str, tuple[int, str]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        # Requests currently holding each key's service | 目前持有各鍵服務的請求數
+        self._leases: dict[str, int] = {}
+        self._reaper_task: Optional[asyncio.Task] = None
+        self.evictions = 0
+
+    def register(self, key: str, api_id: int, api_hash: str) -> None:
+        """
+        Remember credentials for a key without connecting.
+        記住鍵的憑證但不連線。
+        """
+        self._credentials[key] = (api_id, api_hash)
+
+    async def get(self, key: str) -> Optional[TelegramService]:
+        """
+        Get the live service for a key, restoring it if it was evicted.
+        取得鍵對應的存活服務，若已被淘汰則還原。
+
+        Returns:
+            TelegramService, or None if the key is unknown | TelegramService，未知鍵則為 None
+        """
+        service = self._services.get(key)
+        if service is not None:
+            self._touch(key)
+            return service
+
+        if key not in self._credentials:
+            return None
+
+        async with self._lock_for(key):
+            # Restored by a concurrent request | 已由並行請求還原
+            if key in self._services:
+                self._touch(key)
+                return self._services[key]
+
+            api_id, api_hash = self._credentials[key]
+            service = self.factory(key, api_id, api_hash)
+            await service.start()
+            await self._add(key, service)
+            return service
+
+    async def acquire(self, key: str) -> Optional[TelegramService]:
+        """
+        Get a key's service and hold it until release(); held services are not evicted.
+        取得鍵對應的服務並持有至 release()；被持有的服務不會被淘汰。
+
+        Returns:
+            TelegramService, or None if the key is unknown | TelegramService，未知鍵則為 None
+        """
+        service = await self.get(key)
+        if service is not None:
+            self._leases[key] = self._leases.get(key, 0) + 1
+        return service
+
+    async def release(self, key: str) -> None:
+        """
+        Release a service taken with acquire(), applying any deferred eviction.
+        釋放以 acquire() 取得的服務，並執行延後的淘汰。
+        """
+        count = self._leases.get(key, 0) - 1
+        if count > 0:
+            self._leases[key] = count
+        else:
+            self._leases.pop(key, None)
+        await self._shrink()
+
+    async def create(self, key: str, api_id: int, api_hash: str) -> TelegramService:
+        """
+        Create (or replace) the service for a key with new credentials.
+        以新憑證建立（或取代）鍵對應的服務。
+        """
+        async with self._lock_for(key):
+            # Replace rather than leak the previous connection | 取代而非洩漏前一個連線
+            old = self._services.pop(key, None)
+            self._last_used.pop(key, None)
+            if old is not None:
+                await old.stop()
+
+            self.register(key, api_id, api_hash)
+            service = self.factory(key, api_id, api_hash)
+            await service.start()
+            await self._add(key, service)
+            return service
+
+    async def remove(self, key: str) -> None:
+        """
+        Disconnect a key's service and forget its credentials.
+        中斷鍵對應服務的連線並忘記其憑證。
+        """
+        self._credentials.pop(key, None)
+        self._last_used.pop(key, None)
+        self._locks.pop(key, None)
+        service = self._services.pop(key, None)
+        if service is not None:
+            await service.stop()
+
+    def is_registered(self, key: str) -> bool:
+        """Whether credentials are known for a key | 鍵是否有已知憑證"""
+        return key in self._credentials
+
+    def peek(self, key: str) -> Optional[TelegramService]:
+        """
+        Get a key's connected service without restoring or touching it.
+        取得鍵對應的已連線服務，不還原也不更新其使用時間。
+        """
+        return self._services.get(key)
+
+    def live_services(self) -> list[TelegramService]:
+        """Get currently connected services | 取得目前已連線的服務"""
+        return list(self._services.values())
+
+    async def evict_idle(self) -> None:
+        """
+        Disconnect services unused for longer than idle_timeout.
+        中斷超過 idle_timeout 未使用的服務連線。
+        """
+        now = time.monotonic()
+        for key in list(self._services):
+            # Requests may stay open past the timeout (e.g. streams) | 請求可能持續超過逾時（如串流）
+            if now - self._last_used.get(key, now) > self.idle_timeout and not self._leases.get(key):
+                await self._evict(key)
+
+    def start(self) -> None:
+        """Start the background idle reaper | 啟動背景閒置回收"""
+        if self._reaper_task is None and self.idle_timeout > 0:
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+
+    async def close(self) -> None:
+        """
+        Stop the reaper and disconnect every service.
+        停止回收並中斷所有服務連線。
+        """
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            self._reaper_task = None
+
+        while self._services:
+            _, service = self._services.popitem()
+            await service.stop()
+        self._last_used.clear()
+
+    def stats(self) -> dict:
+        """
+        Get pool statistics.
+        取得池統計。
+        """
+        return {
+            "live_clients": len(self._services),
+            "max_clients": self.max_clients,
+            "registered": len(self._credentials),
+            "in_use": len(self._leases),
+            "evictions": self.evictions,
+        }
+
+    async def _add(self, key: str, service: TelegramService) -> None:
+        """
+        Add a started service, evicting least recently used ones over the cap.
+        加入已啟動的服務，超過上限時淘汰最久未使用者。
+        """
+        self._services[key] = service
+        self._touch(key)
+        await self._shrink(keep=key)
+
+    async def _shrink(self, keep: Optional[str] = None) -> None:
+        """
+        Evict least recently used services over the cap, skipping busy ones.
+        淘汰超過上限的最久未使用服務，並略過忙碌者。
+
+        Args:
+            keep: A key that must stay, e.g. the one just added | 必須保留的鍵，例如剛加入者
+        """
+        while len(self._services) > self.max_clients:
+            oldest = next(
+                (key for key in self._services if key != keep and not self._is_busy(key)),
+                None
+            )
+            if oldest is None:
+                # Retried when a lease is released | 於釋放持有時重試
+                return
+            await self._evict(oldest)
+
+    def _is_busy(self, key: str) -> bool:
+        """
+        Whether a service is held by a request or waiting for a login code.
+        服務是否被請求持有或正在等待登入驗證碼。
+        """
+        if self._leases.get(key):
+            return True
+        # Evicting would lose phone_code_hash, voiding the code sent
+        # 淘汰會遺失 phone_code_hash，使已送出的驗證碼失效
+        auth = self._services[key].auth_state
+        return auth.phone_code_hash is not None and not auth.is_logged_in
+
+    async def _evict(self, key: str) -> None:
+        """
+        Disconnect a service, keeping credentials only if it can be restored.
+        中斷服務連線，僅在可還原時保留憑證。
+
+        Logged-in services (and the default account) are restored lazily
+        from their session files; other keys are forgotten so per-browser
+        entries do not pile up.
+        已登入的服務（及預設帳號）會從 session 檔案延遲還原；其他鍵則被遺忘，
+        避免每個瀏覽器的項目持續累積。
+        """
+        service = self._services.pop(key, None)
+        self._last_used.pop(key, None)
+        self._locks.pop(key, None)
+        if service is not None:
+            self.evictions += 1
+            if key != DEFAULT_KEY and not service.auth_state.is_logged_in:
+                self._credentials.pop(key, None)
+            await service.stop()
+
+    async def _reap_loop(self) -> None:
+        """
+        Periodically evict idle services.
+        定期淘汰閒置服務。
+        """
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 60.0))
+            try:
+                await self.evict_idle()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error evicting idle sessions: {e}")
+
+    def _touch(self, key: str) -> None:
+        """Mark a key as most recently used | 將鍵標記為最近使用"""
+        self._services.move_to_end(key)
+        self._last_used[key] = time.monotonic()
+
+    def _lock_for(self, key: str) -> asyncio.Lock:
+        """Get the per-key lock | 取得每個鍵的鎖"""
+        return self._locks.setdefault(key, asyncio.Lock())
+
+
+class LeaseMiddleware:
+    """
+    Release the services a request acquired once its response is sent.
+    於回應送出後釋放請求所取得的服務。
+
+    Wraps the whole ASGI call, so streamed responses keep their service
+    until the last chunk. Handlers record acquired keys in
+    request.state.session_leases.
+    包覆整個 ASGI 呼叫，因此串流回應會持有服務直到最後一個片段。
+    處理器將已取得的鍵記錄於 request.state.session_leases。
+    """
+
+    def __init__(self, app, pool):
+        self.app = app
+        self.pool = pool
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        leases: list[str] = []
+        scope.setdefault("state", {})["session_leases"] = leases
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for key in leases:
+                await self.pool.release(key)
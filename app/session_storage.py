@@ -0,0 +1,244 @@
+"""
+Session Storage | Session 儲存
+In-memory Telethon sessions with snapshots kept by a pluggable store.
+記憶體內 Telethon session，快照由可替換的儲存後端保存。
+
+Telethon's default SQLite session writes entity rows on the event loop while
+messages are processed. SnapshotSession keeps everything in memory; the
+service writes a snapshot from a worker thread periodically and on shutdown.
+Telethon 預設的 SQLite session 會在處理訊息時於事件迴圈上寫入實體資料。
+SnapshotSession 將所有資料保存在記憶體中；服務定期及關閉時於工作執行緒寫入快照。
+"""
+
+import os
+import json
+import sqlite3
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from telethon.sessions import SQLiteSession, StringSession
+
+
+# Snapshot format version | 快照格式版本
+SNAPSHOT_VERSION = 1
+
+# Session storage modes | Session 儲存模式
+STORAGE_SQLITE = "sqlite"
+STORAGE_MEMORY = "memory"
+
+
+# ============================================================================
+# Session | Session
+# ============================================================================
+
+class SnapshotSession(StringSession):
+    """
+    Memory session that can be saved as a snapshot.
+    可儲存為快照的記憶體 session。
+
+    Entities are keyed by peer ID and username, so lookups do not scan every
+    row as MemorySession does.
+    實體以 peer ID 與用戶名為鍵，查詢時不需如 MemorySession 般掃描所有資料列。
+    """
+
+    def __init__(self, snapshot: Optional[dict] = None):
+        """
+        Initialize the session.
+        初始化 session。
+
+        Args:
+            snapshot: Data from to_snapshot() | 來自 to_snapshot() 的資料
+        """
+        snapshot = snapshot or {}
+        super().__init__(snapshot.get("auth") or None)
+        # (id, hash, username, phone, name) rows | （id, hash, username, phone, name）資料列
+        self._rows: dict[int, tuple] = {}
+        self._usernames: dict[str, int] = {}
+        for row in snapshot.get("entities", ()):
+            self._store(tuple(row))
+        # Changed since the last snapshot | 自上次快照後已變更
+        self.dirty = False
+
+    # ==================== Snapshots | 快照 ====================
+
+    def to_snapshot(self) -> dict:
+        """
+        Capture the session and mark it clean.
+        擷取 session 並標記為未變更。
+
+        Only references are copied, so this is cheap on the event loop; the
+        result is serialized elsewhere.
+        只複製參照，因此在事件迴圈上成本低；結果於他處序列化。
+        """
+        self.dirty = False
+        return {
+            "version": SNAPSHOT_VERSION,
+            "auth": StringSession.save(self),
+            "entities": list(self._rows.values()),
+        }
+
+    # ==================== Session API | Session 介面 ====================
+
+    def set_dc(self, dc_id, server_address, port):
+        super().set_dc(dc_id, server_address, port)
+        self.dirty = True
+
+    @StringSession.auth_key.setter
+    def auth_key(self, value):
+        self._auth_key = value
+        self.dirty = True
+
+    def save(self):
+        # Snapshots are written by the owner | 快照由擁有者寫入
+        pass
+
+    def delete(self):
+        """Forget the login and all entities | 忘記登入與所有實體"""
+        self._auth_key = None
+        self._rows.clear()
+        self._usernames.clear()
+        self.dirty = True
+
+    def process_entities(self, tlo):
+        for row in self._entities_to_rows(tlo):
+            if self._rows.get(row[0]) != row:
+                self._store(row)
+                self.dirty = True
+
+    def get_entity_rows_by_id(self, id, exact=True):
+        if exact:
+            row = self._rows.get(id)
+            return (row[0], row[1]) if row else None
+        return super().get_entity_rows_by_id(id, exact=False)
+
+    def get_entity_rows_by_username(self, username):
+        peer_id = self._usernames.get(username)
+        if peer_id is None:
+            return None
+        row = self._rows[peer_id]
+        return row[0], row[1]
+
+    def get_entity_rows_by_phone(self, phone):
+        return next(((row[0], row[1]) for row in self._rows.values() if row[3] == phone), None)
+
+    def get_entity_rows_by_name(self, name):
+        return next(((row[0], row[1]) for row in self._rows.values() if row[4] == name), None)
+
+    @property
+    def _entities(self):
+        # Rows for inherited lookups | 供繼承的查詢使用的資料列
+        return self._rows.values()
+
+    @_entities.setter
+    def _entities(self, value):
+        # MemorySession.__init__ assigns an empty set | MemorySession.__init__ 會指派空集合
+        pass
+
+    def _store(self, row: tuple) -> None:
+        """Add or replace an entity row | 新增或取代實體資料列"""
+        previous = self._rows.get(row[0])
+        if previous is not None and previous[2]:
+            self._usernames.pop(previous[2], None)
+        self._rows[row[0]] = row
+        if row[2]:
+            self._usernames[row[2]] = row[0]
+
+
+# ============================================================================
+# Stores | 儲存後端
+# ============================================================================
+
+class SessionStore(ABC):
+    """
+    Where session snapshots are kept.
+    保存 session 快照的位置。
+
+    Methods are blocking and are called from a worker thread, so a store may
+    talk to a database or remote service. A store missing any method cannot
+    be instantiated.
+    方法為阻塞式且於工作執行緒中呼叫，因此儲存後端可連線至資料庫或遠端服務。
+    缺少任一方法的儲存後端無法建立實例。
+    """
+
+    @abstractmethod
+    def load(self) -> Optional[dict]:
+        """Read the latest snapshot, or None | 讀取最新快照，無則為 None"""
+
+    @abstractmethod
+    def save(self, snapshot: dict) -> None:
+        """Replace the stored snapshot | 取代已儲存的快照"""
+
+    @abstractmethod
+    def delete(self) -> None:
+        """Remove the stored snapshot | 移除已儲存的快照"""
+
+
+class FileSessionStore(SessionStore):
+    """
+    JSON snapshot file replaced atomically.
+    以原子方式取代的 JSON 快照檔案。
+    """
+
+    def __init__(self, path: str, sqlite_session: Optional[str] = None):
+        """
+        Initialize the file store.
+        初始化檔案儲存後端。
+
+        Args:
+            path: Snapshot file path | 快照檔案路徑
+            sqlite_session: Telethon SQLite session name imported when no
+                            snapshot exists yet | 尚無快照時匯入的 Telethon SQLite session 名稱
+        """
+        self.path = path
+        self.sqlite_session = sqlite_session
+
+    def load(self) -> Optional[dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self._import_sqlite()
+
+    def save(self, snapshot: dict) -> None:
+        # Write a private temp file next to the target, then rename over it
+        # 於目標旁寫入私有暫存檔，再以重新命名取代
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".session-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def delete(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _import_sqlite(self) -> Optional[dict]:
+        """
+        Build a snapshot from an existing SQLite session, keeping the login.
+        由既有的 SQLite session 建立快照，保留登入狀態。
+        """
+        if not self.sqlite_session or not os.path.exists(f"{self.sqlite_session}.session"):
+            return None
+
+        session = SQLiteSession(self.sqlite_session)
+        try:
+            auth = StringSession.save(session)
+        finally:
+            session.close()
+
+        conn = sqlite3.connect(f"{self.sqlite_session}.session")
+        try:
+            entities = conn.execute("SELECT id, hash, username, phone, name FROM entities").fetchall()
+        finally:
+            conn.close()
+
+        return {"version": SNAPSHOT_VERSION, "auth": auth, "entities": entities}
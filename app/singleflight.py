@@ -0,0 +1,74 @@
+"""
+Single Flight | 單一請求合併
+Coalesces concurrent identical calls into one underlying fetch.
+將並行的相同呼叫合併為一次底層取得。
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Share one in-flight call among all callers with the same key.
+    讓相同鍵的所有呼叫者共用一次進行中的呼叫。
+
+    Callers receive the same result object and must not mutate it.
+    呼叫者取得相同的結果物件，不得修改。
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight | 初始化，無進行中的呼叫"""
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run func once per key at a time, sharing its result.
+        每個鍵同一時間只執行一次 func，並共用其結果。
+
+        Args:
+            key: Identifies identical calls | 識別相同呼叫的鍵
+            func: Starts the underlying call | 啟動底層呼叫
+
+        Returns:
+            The shared result | 共用的結果
+        """
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._in_flight[key] = future
+            self.started += 1
+            future.add_done_callback(lambda f: self._finish(key, f))
+        else:
+            self.shared += 1
+
+        # One caller disconnecting must not cancel the others' fetch
+        # 單一呼叫者中斷不得取消其他人的取得
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future) -> None:
+        """
+        Forget a finished call.
+        移除已完成的呼叫。
+        """
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        # Mark the error retrieved even if every caller went away
+        # 即使所有呼叫者都已離開，也標記錯誤為已取得
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> dict:
+        """
+        Get coalescing statistics.
+        取得合併統計。
+        """
+        return {
+            "in_flight": len(self._in_flight),
+            "started": self.started,
+            "shared": self.shared,
+        }
@@ -0,0 +1,247 @@
+"""
+Snapshots | 快照
+Dialogs and per-chat senders saved to a JSONL file for offline lookups.
+對話與各聊天發送者儲存為 JSONL 檔案，供離線查詢。
+
+The first line is a header; each following line holds one dialog or the
+senders of one chat. The reader maps the file into memory and indexes line
+offsets, so opening a snapshot parses nothing and a chat's senders are only
+decoded when asked for.
+第一行為標頭；其後每行為一個對話或一個聊天的發送者。讀取器將檔案映射至記憶體並索引各行位移，
+因此開啟快照時不解析任何內容，聊天的發送者只在被要求時才解碼。
+
+Format | 格式:
+    {"format": "telegram-id-finder-snapshot", "version": 1, "created_at": ..., ...}
+    {"dialog": {"id": ..., "name": ..., ...}}
+    {"chat_id": ..., "senders": [{"id": ..., "name": ..., ...}, ...]}
+"""
+
+import os
+import json
+import mmap
+import time
+import tempfile
+from typing import Iterable, Optional
+
+from .models import DialogInfo, DialogType, SenderInfo
+from .serialization import dialog_to_dict, json_bytes, sender_to_dict
+
+try:
+    # Optional C accelerator | 選用的 C 加速器
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+
+# Header marker and format version | 標頭標記與格式版本
+SNAPSHOT_FORMAT = "telegram-id-finder-snapshot"
+SNAPSHOT_VERSION = 1
+
+# Line prefixes, fixed by the writer's key order | 行前綴，由寫入器的鍵順序決定
+_DIALOG_PREFIX = b'{"dialog":'
+_SENDERS_PREFIX = b'{"chat_id":'
+_PREFIX_SIZE = max(len(_DIALOG_PREFIX), len(_SENDERS_PREFIX))
+
+
+def _loads(data: bytes):
+    """Decode one JSON line | 解碼一行 JSON"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+# ============================================================================
+# Writer | 寫入器
+# ============================================================================
+
+def write_snapshot(
+    path: str,
+    dialogs: Iterable[DialogInfo],
+    senders: dict[int, list[SenderInfo]],
+    account: Optional[dict] = None
+) -> dict:
+    """
+    Write a snapshot, replacing any previous file atomically.
+    寫入快照，以原子方式取代先前的檔案。
+
+    Blocking; call from a worker thread.
+    阻塞式；請於工作執行緒中呼叫。
+
+    Args:
+        path: Snapshot file path | 快照檔案路徑
+        dialogs: Dialogs to save | 要儲存的對話
+        senders: Senders per chat ID | 各聊天 ID 的發送者
+        account: {id, name, username} of the account | 帳號的 {id, name, username}
+
+    Returns:
+        The header written, with the file size | 寫入的標頭及檔案大小
+    """
+    dialogs = list(dialogs)
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "account": account,
+        "dialogs": len(dialogs),
+        "chats": len(senders),
+        "senders": sum(len(chat_senders) for chat_senders in senders.values()),
+    }
+
+    # Write a private temp file next to the target, then rename over it
+    # 於目標旁寫入私有暫存檔，再以重新命名取代
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(json_bytes(header) + b"\n")
+            for dialog in dialogs:
+                f.write(json_bytes({"dialog": dialog_to_dict(dialog)}) + b"\n")
+            for chat_id, chat_senders in senders.items():
+                f.write(json_bytes({
+                    "chat_id": chat_id,
+                    "senders": [sender_to_dict(sender) for sender in chat_senders],
+                }) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return {**header, "bytes": os.path.getsize(path)}
+
+
+# ============================================================================
+# Reader | 讀取器
+# ============================================================================
+
+class SnapshotReader:
+    """
+    Memory-mapped snapshot with lazily decoded lines.
+    記憶體映射的快照，各行延遲解碼。
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a snapshot and index its lines.
+        開啟快照並索引其各行。
+
+        Args:
+            path: Snapshot file path | 快照檔案路徑
+
+        Raises:
+            ValueError: Not a snapshot, or an unsupported version | 不是快照或版本不支援
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            end = self._line_end(0)
+            self.header = _loads(self._map[:end])
+            if not isinstance(self.header, dict) or self.header.get("format") != SNAPSHOT_FORMAT:
+                raise ValueError(f"Not a snapshot: {path} | 不是快照：{path}")
+            if self.header.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(
+                    f"Unsupported snapshot version: {self.header.get('version')} "
+                    f"| 不支援的快照版本：{self.header.get('version')}"
+                )
+            self._index(end + 1)
+        except BaseException:
+            self._map.close()
+            raise
+
+        self._dialogs: Optional[list[DialogInfo]] = None
+        self._senders: dict[int, list[SenderInfo]] = {}
+
+    @property
+    def created_at(self) -> float:
+        """Wall-clock time the snapshot was written | 快照寫入的實際時間"""
+        return self.header["created_at"]
+
+    def _line_end(self, start: int) -> int:
+        """Offset of the newline ending the line at start | 結束 start 所在行的換行位移"""
+        end = self._map.find(b"\n", start)
+        return len(self._map) if end < 0 else end
+
+    def _index(self, start: int) -> None:
+        """
+        Record the byte ranges of dialog and sender lines.
+        記錄對話行與發送者行的位元組範圍。
+        """
+        self._dialog_lines: list[tuple[int, int]] = []
+        self._sender_lines: dict[int, tuple[int, int]] = {}
+        size = len(self._map)
+        while start < size:
+            end = self._line_end(start)
+            # Only the line prefix is copied out | 只複製行前綴
+            prefix = self._map[start:start + _PREFIX_SIZE]
+            if prefix.startswith(_DIALOG_PREFIX):
+                self._dialog_lines.append((start, end))
+            elif prefix.startswith(_SENDERS_PREFIX):
+                # Only the chat ID is read now | 此時只讀取聊天 ID
+                id_start = start + len(_SENDERS_PREFIX)
+                chat_id = int(self._map[id_start:self._map.find(b",", id_start, end)])
+                self._sender_lines[chat_id] = (start, end)
+            start = end + 1
+
+    def dialogs(self) -> list[DialogInfo]:
+        """All saved dialogs, decoded once | 所有已儲存的對話，只解碼一次"""
+        if self._dialogs is None:
+            self._dialogs = []
+            for start, end in self._dialog_lines:
+                data = _loads(self._map[start:end])["dialog"]
+                self._dialogs.append(DialogInfo(
+                    id=data["id"],
+                    name=data["name"],
+                    dialog_type=DialogType(data["dialog_type"]),
+                    username=data["username"],
+                    members_count=data["members_count"]
+                ))
+        return self._dialogs
+
+    def chat_ids(self) -> list[int]:
+        """Chats with saved senders | 已儲存發送者的聊天"""
+        return list(self._sender_lines)
+
+    def senders(self, chat_id: int) -> Optional[list[SenderInfo]]:
+        """
+        A chat's saved senders, decoded on first use.
+        聊天已儲存的發送者，首次使用時解碼。
+
+        Returns:
+            List of SenderInfo, or None if the chat was not saved | SenderInfo 列表，聊天未儲存時為 None
+        """
+        senders = self._senders.get(chat_id)
+        if senders is None:
+            line = self._sender_lines.get(chat_id)
+            if line is None:
+                return None
+            senders = self._senders[chat_id] = [
+                SenderInfo(
+                    id=data["id"],
+                    name=data["name"],
+                    username=data["username"],
+                    is_bot=data["is_bot"]
+                )
+                for data in _loads(self._map[line[0]:line[1]])["senders"]
+            ]
+        return senders
+
+    def stats(self) -> dict:
+        """
+        Get snapshot statistics.
+        取得快照統計。
+        """
+        return {
+            "path": self.path,
+            "created_at": self.created_at,
+            "bytes": len(self._map),
+            "dialogs": len(self._dialog_lines),
+            "chats": len(self._sender_lines),
+            "decoded_chats": len(self._senders),
+        }
+
+    def close(self) -> None:
+        """Unmap the file | 解除檔案映射"""
+        self._dialogs = None
+        self._senders.clear()
+        self._map.close()
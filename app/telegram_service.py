@@ -5,21 +5,49 @@ Encapsulates all Telethon operations for Telegram API interactions.
 """
 
 import os
+import json
+import time
+import re
+import base64
 import asyncio
-from typing import Optional
-from dataclasses import dataclass
-from enum import Enum
+import secrets
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator, Optional
 
-from telethon import TelegramClient
+from telethon import TelegramClient, events, utils
 from telethon.sessions import StringSession
+from telethon.tl.functions.channels import GetChannelsRequest
+from telethon.tl.functions.contacts import ResolveUsernameRequest
+from telethon.tl.functions.messages import GetChatsRequest
+from telethon.tl.functions.users import GetUsersRequest
 from telethon.tl.types import (
     User,
+    UserEmpty,
     Chat,
     Channel,
     Message,
     PeerUser,
     PeerChat,
     PeerChannel,
+    InputPeerEmpty,
+    InputPeerSelf,
+    InputPeerUser,
+    InputPeerChat,
+    InputPeerChannel,
+    InputUser,
+    InputChannel,
+    ChannelForbidden,
+    UpdateChannel,
+    UpdateNewMessage,
+    MessageService,
+    MessageActionChatMigrateTo,
+    ChannelParticipantsAdmins,
+    ChannelParticipantsBots,
+    ChannelParticipantAdmin,
+    ChannelParticipantCreator,
+    ChatParticipantAdmin,
+    ChatParticipantCreator,
 )
 from telethon.errors import (
     SessionPasswordNeededError,
@@ -27,46 +55,50 @@ from telethon.errors import (
     PhoneCodeExpiredError,
     FloodWaitError,
     AuthKeyUnregisteredError,
+    ChatAdminRequiredError,
+    UsernameInvalidError,
+    UsernameNotOccupiedError,
 )
 
-
-class DialogType(str, Enum):
-    """Dialog type enumeration | 對話類型枚舉"""
-    GROUP = "group"
-    CHANNEL = "channel"
-    USER = "user"
-    BOT = "bot"
-    UNKNOWN = "unknown"
+from .models import (
+    DialogType,
+    DialogInfo,
+    DialogPage,
+    SenderInfo,
+    SenderActivity,
+    ChatSendersResult,
+    ScanProgress,
+    ResolvedPeer,
+    AuthState,
+)
+from .caches import DialogCache, EntityCache, SenderCache, SenderScan, Versioned
+from .sender_index import SenderIndex, ScanRange
+from .search_index import SearchIndex, SearchHit, KIND_SENDER, matches_prefix
+from .session_storage import SessionStore, SnapshotSession
+from .rpc_scheduler import RpcScheduler, ScheduledTelegramClient, low_priority
+from .singleflight import SingleFlight
+from . import metrics
 
 
-@dataclass
-class DialogInfo:
-    """Dialog information structure | 對話資訊結構"""
-    id: int
-    name: str
-    dialog_type: DialogType
-    username: Optional[str] = None
-    members_count: Optional[int] = None
+# Sender discovery modes | 發送者探索模式
+SENDER_MODE_AUTO = "auto"
+SENDER_MODE_PARTICIPANTS = "participants"
+SENDER_MODE_MESSAGES = "messages"
 
+# Dialogs per Telegram request | 每次 Telegram 請求的對話數
+DIALOG_PAGE_SIZE = 100
 
-@dataclass
-class SenderInfo:
-    """Message sender information | 訊息發送者資訊"""
-    id: int
-    name: str
-    username: Optional[str] = None
-    is_bot: bool = False
+# Dialog folders: main list and archive | 對話資料夾：主列表與封存
+DIALOG_FOLDERS = (0, 1)
 
+# IDs per users.getUsers / channels.getChannels request | 每次 users.getUsers / channels.getChannels 請求的 ID 數
+RESOLVE_BATCH_SIZE = 100
 
-@dataclass
-class AuthState:
-    """Authentication state | 認證狀態"""
-    is_logged_in: bool = False
-    phone_code_hash: Optional[str] = None
-    phone_number: Optional[str] = None
-    needs_2fa: bool = False
-    user_id: Optional[int] = None
-    user_name: Optional[str] = None
+# Participant filters | 成員篩選條件
+PARTICIPANT_FILTERS = {
+    "admins": ChannelParticipantsAdmins,
+    "bots": ChannelParticipantsBots,
+}
 
 
 class TelegramService:
@@ -75,7 +107,21 @@ class TelegramService:
     Telegram 服務類別，處理所有 Telegram 操作。
     """
 
-    def __init__(self, api_id: int, api_hash: str, session_name: str = "session"):
+    def __init__(
+        self,
+        api_id: int,
+        api_hash: str,
+        session_name: str = "session",
+        auth_cache_ttl: float = 300.0,
+        dialog_cache_ttl: float = 600.0,
+        sender_index: Optional[SenderIndex] = None,
+        rpc_scheduler: Optional[RpcScheduler] = None,
+        entity_cache: Optional[EntityCache] = None,
+        sender_cache: Optional[SenderCache] = None,
+        search_index: Optional[SearchIndex] = None,
+        session_store: Optional[SessionStore] = None,
+        snapshot_interval: float = 60.0
+    ):
         """
         Initialize the Telegram service.
         初始化 Telegram 服務。
@@ -84,54 +130,198 @@ class TelegramService:
             api_id: Telegram API ID
             api_hash: Telegram API Hash
             session_name: Name for the session file | Session 檔案名稱
+            auth_cache_ttl: Seconds before the cached auth state is re-checked
+                            | 快取認證狀態重新檢查前的秒數
+            dialog_cache_ttl: Seconds before the dialog list is re-fetched
+                              | 對話列表重新取得前的秒數
+            sender_index: Persistent sender index for incremental scans
+                          | 用於增量掃描的持久化發送者索引
+            rpc_scheduler: Scheduler all Telegram requests go through
+                           | 所有 Telegram 請求經過的排程器
+            entity_cache: LRU cache of resolved senders and chats
+                          | 已解析發送者與聊天的 LRU 快取
+            sender_cache: Recent per-chat sender scans | 各聊天最近的發送者掃描
+            search_index: Index of known dialogs and senders | 已知對話與發送者的索引
+            session_store: Keep the session in memory and snapshot it here
+                           instead of using a SQLite session file
+                           | 將 session 保存在記憶體並快照至此，而非使用 SQLite session 檔案
+            snapshot_interval: Seconds between snapshots of a changed session
+                               | 已變更 session 的快照間隔秒數
         """
         self.api_id = api_id
         self.api_hash = api_hash
         self.session_name = session_name
+        self.auth_cache_ttl = auth_cache_ttl
         self._client: Optional[TelegramClient] = None
         self._auth_state = AuthState()
+        # Monotonic time of the last authoritative auth check (0 = stale)
+        # 最後一次權威認證檢查的單調時間（0 表示已過期）
+        self._auth_checked_at: float = 0.0
+        self._auth_lock = asyncio.Lock()
+        self._auth_refresh_task: Optional[asyncio.Task] = None
+        self._search_index = search_index if search_index is not None else SearchIndex()
+        self._dialog_cache = DialogCache(ttl=dialog_cache_ttl, search_index=self._search_index)
+        self._sender_index = sender_index
+        self._scheduler = rpc_scheduler or RpcScheduler()
+        self._flights = SingleFlight()
+        # Serializes sender index scans per chat | 依聊天序列化發送者索引掃描
+        self._index_locks: dict[int, asyncio.Lock] = {}
+        self._entity_cache = entity_cache or EntityCache()
+        self._sender_cache = sender_cache or SenderCache()
+        self._warm_up_task: Optional[asyncio.Task] = None
+        # Last message time per dialog from the latest walk | 最近一次走訪中各對話的最後訊息時間
+        self._dialog_activity: dict[int, float] = {}
+        # Distinguishes cache versions across services, restarts and logins
+        # 區分不同服務、重啟與登入之間的快取版本
+        self.instance_id = secrets.token_hex(4)
+        self._handlers_registered = False
+        self._session_store = session_store
+        self.snapshot_interval = snapshot_interval
+        self._session: Optional[SnapshotSession] = None
+        self._snapshot_lock = asyncio.Lock()
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._snapshots = 0
 
     @property
     def client(self) -> Optional[TelegramClient]:
         """Get the Telegram client | 取得 Telegram 客戶端"""
         return self._client
 
+    def is_connected(self) -> bool:
+        """Whether the client is connected to Telegram | 客戶端是否已連線至 Telegram"""
+        return self._client is not None and self._client.is_connected()
+
     @property
     def auth_state(self) -> AuthState:
         """Get current authentication state | 取得當前認證狀態"""
         return self._auth_state
 
+    @property
+    def dialog_cache(self) -> DialogCache:
+        """Get the dialog cache | 取得對話快取"""
+        return self._dialog_cache
+
     async def start(self) -> None:
         """
         Start the Telegram client connection.
         啟動 Telegram 客戶端連線。
         """
         if self._client is None:
-            self._client = TelegramClient(
-                self.session_name,
-                self.api_id,
-                self.api_hash
-            )
+            if self._session_store is not None and self._session is None:
+                self._session = await self._load_session()
+            self._client = self._create_client()
 
         await self._client.connect()
 
-        # Check if already authorized | 檢查是否已授權
-        if await self._client.is_user_authorized():
-            me = await self._client.get_me()
-            self._auth_state = AuthState(
-                is_logged_in=True,
-                user_id=me.id,
-                user_name=self._get_display_name(me)
+        # Keep the dialog cache updated from Telegram updates
+        # 由 Telegram 更新事件維護對話快取
+        if not self._handlers_registered:
+            self._client.add_event_handler(self._on_chat_action, events.ChatAction())
+            self._client.add_event_handler(
+                self._on_raw_update,
+                events.Raw(types=[UpdateChannel, UpdateNewMessage])
             )
+            self._handlers_registered = True
+
+        # Check if already authorized | 檢查是否已授權
+        await self._refresh_auth_state()
+
+        # Keep the auth cache fresh in the background | 在背景保持認證快取新鮮
+        if self._auth_refresh_task is None and self.auth_cache_ttl > 0:
+            self._auth_refresh_task = asyncio.create_task(self._auth_refresh_loop())
+
+        if self._session is not None and self._snapshot_task is None and self.snapshot_interval > 0:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    def _create_client(self) -> TelegramClient:
+        """
+        Create the Telethon client, paced by the RPC scheduler.
+        建立由 RPC 排程器控速的 Telethon 客戶端。
+        """
+        return ScheduledTelegramClient(
+            self._session if self._session is not None else self.session_name,
+            self.api_id,
+            self.api_hash,
+            scheduler=self._scheduler
+        )
 
     async def stop(self) -> None:
         """
         Stop the Telegram client connection.
         停止 Telegram 客戶端連線。
         """
+        if self._auth_refresh_task:
+            self._auth_refresh_task.cancel()
+            self._auth_refresh_task = None
+
+        if self._warm_up_task:
+            self._warm_up_task.cancel()
+            self._warm_up_task = None
+
+        if self._snapshot_task:
+            self._snapshot_task.cancel()
+            self._snapshot_task = None
+
         if self._client:
             await self._client.disconnect()
 
+        # Final snapshot after the last updates were processed | 處理完最後的更新後寫入最終快照
+        try:
+            await self.save_session()
+        except Exception as e:
+            print(f"Error saving session snapshot: {e}")
+
+        if self._sender_index:
+            self._sender_index.close()
+
+    async def save_session(self) -> None:
+        """
+        Write a snapshot of the in-memory session if it changed.
+        若記憶體內 session 已變更，則寫入快照。
+
+        Serialization and I/O run in a worker thread.
+        序列化與 I/O 於工作執行緒中執行。
+        """
+        async with self._snapshot_lock:
+            session = self._session
+            if session is None or not session.dirty:
+                return
+            snapshot = session.to_snapshot()
+            try:
+                await asyncio.to_thread(self._session_store.save, snapshot)
+                self._snapshots += 1
+            except Exception:
+                # Retry with the next snapshot | 於下次快照時重試
+                session.dirty = True
+                raise
+
+    async def _load_session(self) -> SnapshotSession:
+        """
+        Load the in-memory session from the store.
+        由儲存後端載入記憶體內 session。
+        """
+        try:
+            snapshot = await asyncio.to_thread(self._session_store.load)
+            return SnapshotSession(snapshot)
+        except Exception as e:
+            print(f"Error loading session snapshot, starting logged out: {e}")
+            return SnapshotSession()
+
+    async def _snapshot_loop(self) -> None:
+        """
+        Periodically snapshot the session in the background.
+        在背景定期快照 session。
+        """
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.save_session()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error saving session snapshot: {e}")
+
+    @metrics.instrumented
     async def send_code(self, phone: str) -> dict:
         """
         Send verification code to phone number.
@@ -165,6 +355,7 @@ class TelegramService:
                 "message": f"Failed to send code: {str(e)} | 發送驗證碼失敗：{str(e)}"
             }
 
+    @metrics.instrumented
     async def verify_code(self, code: str, password: Optional[str] = None) -> dict:
         """
         Verify the login code (and 2FA password if needed).
@@ -191,11 +382,7 @@ class TelegramService:
             )
 
             me = await self._client.get_me()
-            self._auth_state = AuthState(
-                is_logged_in=True,
-                user_id=me.id,
-                user_name=self._get_display_name(me)
-            )
+            self._set_logged_in(me)
 
             return {
                 "success": True,
@@ -212,11 +399,7 @@ class TelegramService:
                 try:
                     await self._client.sign_in(password=password)
                     me = await self._client.get_me()
-                    self._auth_state = AuthState(
-                        is_logged_in=True,
-                        user_id=me.id,
-                        user_name=self._get_display_name(me)
-                    )
+                    self._set_logged_in(me)
                     return {
                         "success": True,
                         "message": "Login successful | 登入成功",
@@ -254,6 +437,7 @@ class TelegramService:
                 "message": f"Login failed: {str(e)} | 登入失敗：{str(e)}"
             }
 
+    @metrics.instrumented
     async def logout(self) -> dict:
         """
         Log out from Telegram.
@@ -270,13 +454,23 @@ class TelegramService:
 
         try:
             await self._client.log_out()
-            self._auth_state = AuthState()
+            self._invalidate_auth()
+
+            # Indexed senders belong to the logged-out account | 已索引的發送者屬於登出的帳號
+            if self._sender_index:
+                await self._sender_index.clear()
 
             # Remove session file | 移除 session 檔案
             session_file = f"{self.session_name}.session"
             if os.path.exists(session_file):
                 os.remove(session_file)
 
+            # Drop the snapshot, waiting out a write in progress | 移除快照，並等待進行中的寫入
+            if self._session_store is not None:
+                async with self._snapshot_lock:
+                    self._session = None
+                    await asyncio.to_thread(self._session_store.delete)
+
             return {
                 "success": True,
                 "message": "Logged out successfully | 登出成功"
@@ -287,11 +481,18 @@ class TelegramService:
                 "message": f"Logout failed: {str(e)} | 登出失敗：{str(e)}"
             }
 
-    async def get_status(self) -> dict:
+    async def get_status(self, force_refresh: bool = False) -> dict:
         """
         Get current authentication status.
         取得當前認證狀態。
 
+        Answered from the cached auth state while it is fresh; only goes to
+        Telegram when the cache is stale or force_refresh is set.
+        快取新鮮時直接從認證狀態回應；僅在過期或強制刷新時查詢 Telegram。
+
+        Args:
+            force_refresh: Bypass the auth cache | 略過認證快取
+
         Returns:
             dict with authentication status | 包含認證狀態的字典
         """
@@ -302,24 +503,10 @@ class TelegramService:
             }
 
         try:
-            is_authorized = await self._client.is_user_authorized()
-            if is_authorized:
-                me = await self._client.get_me()
-                return {
-                    "is_logged_in": True,
-                    "user": {
-                        "id": me.id,
-                        "name": self._get_display_name(me),
-                        "username": me.username
-                    }
-                }
-            else:
-                return {
-                    "is_logged_in": False,
-                    "message": "Not logged in | 未登入"
-                }
+            if force_refresh or not self._auth_is_fresh():
+                await self._refresh_auth_state()
         except AuthKeyUnregisteredError:
-            self._auth_state = AuthState()
+            self._invalidate_auth()
             return {
                 "is_logged_in": False,
                 "message": "Session expired | Session 已過期"
@@ -330,83 +517,1381 @@ class TelegramService:
                 "message": f"Error checking status: {str(e)} | 檢查狀態錯誤：{str(e)}"
             }
 
-    async def get_dialogs(self) -> list[DialogInfo]:
+        if self._auth_state.is_logged_in:
+            return {
+                "is_logged_in": True,
+                "user": {
+                    "id": self._auth_state.user_id,
+                    "name": self._auth_state.user_name,
+                    "username": self._auth_state.username
+                }
+            }
+        return {
+            "is_logged_in": False,
+            "message": "Not logged in | 未登入"
+        }
+
+    async def is_authorized(self) -> bool:
+        """
+        Check authorization using the cached auth state.
+        使用快取的認證狀態檢查授權。
+
+        Returns:
+            True if logged in | 已登入則為 True
+        """
+        if not self._client:
+            return False
+
+        if not self._auth_is_fresh():
+            try:
+                await self._refresh_auth_state()
+            except AuthKeyUnregisteredError:
+                self._invalidate_auth()
+            except Exception:
+                # Keep the last known state on transient errors
+                # 暫時性錯誤時保留最後已知狀態
+                pass
+
+        return self._auth_state.is_logged_in
+
+    async def get_dialogs(self, refresh: bool = False) -> list[DialogInfo]:
         """
         Get all dialogs (chats, groups, channels).
         取得所有對話（聊天、群組、頻道）。
 
+        Served from the dialog cache while fresh; the cache is kept current
+        by update handlers instead of full re-fetches.
+        快取新鮮時由對話快取回應；快取由更新事件維護，而非完整重新取得。
+
+        Args:
+            refresh: Bypass the cache and re-fetch | 略過快取並重新取得
+
         Returns:
             List of DialogInfo objects | DialogInfo 物件列表
         """
-        if not self._client or not await self._client.is_user_authorized():
-            return []
+        async def fetch() -> list[DialogInfo]:
+            return [dialog async for dialog in self.iter_dialogs(refresh=refresh)]
+
+        # Concurrent callers share one walk | 並行呼叫者共用一次走訪
+        return await self._flights.do(("get_dialogs", refresh), fetch)
+
+    def cached_dialogs(self) -> Optional[Versioned]:
+        """
+        Get the fresh cached dialog list with its version, without any RPC.
+        取得新鮮的快取對話列表及其版本，不發出任何 RPC。
+        """
+        return self._dialog_cache.snapshot()
+
+    async def get_dialogs_versioned(self, refresh: bool = False) -> Optional[Versioned]:
+        """
+        Get all dialogs together with the dialog cache version.
+        取得所有對話及對話快取版本。
+
+        Returns:
+            Versioned list of DialogInfo, or None if the walk did not complete
+            | 帶版本的 DialogInfo 列表，走訪未完成時為 None
+        """
+        if not refresh:
+            snapshot = self._dialog_cache.snapshot()
+            if snapshot is not None:
+                return snapshot
+
+        await self.get_dialogs(refresh)
+        # Read after the fetch so version and list match | 於取得後讀取，使版本與列表一致
+        return self._dialog_cache.snapshot(require_fresh=False)
+
+    async def iter_dialogs(self, refresh: bool = False) -> AsyncIterator[DialogInfo]:
+        """
+        Yield dialogs as soon as Telegram returns them.
+        在 Telegram 回傳時立即逐一產出對話。
+
+        A complete walk also refreshes the dialog cache.
+        完整走訪後同時刷新對話快取。
+
+        Args:
+            refresh: Bypass the cache and re-fetch | 略過快取並重新取得
+
+        Yields:
+            DialogInfo objects | DialogInfo 物件
+        """
+        if not await self.is_authorized():
+            return
+
+        if not refresh:
+            cached = self._dialog_cache.get()
+            if cached is not None:
+                for dialog in cached:
+                    yield dialog
+                return
+
+        dialogs = []
+        activity = {}
+        iterated = 0
+        with metrics.operation("iter_dialogs"):
+            try:
+                async for dialog in self._client.iter_dialogs():
+                    iterated += 1
+                    info = self._build_dialog_info(dialog.id, dialog.name, dialog.entity)
+                    self._remember_entity(dialog.id, dialog.entity)
+
+                    # Skip private chats (users) for this tool's purpose
+                    # 跳過私人聊天（用戶），因為此工具主要用於群組/頻道
+                    if info is None:
+                        continue
+
+                    dialogs.append(info)
+                    activity[info.id] = dialog.date.timestamp() if dialog.date else 0.0
+                    yield info
+            except AuthKeyUnregisteredError:
+                self._invalidate_auth()
+                return
+            finally:
+                metrics.count_items("dialogs", iterated)
+
+        self._dialog_cache.set(dialogs)
+        self._dialog_activity = activity
+
+    async def get_dialogs_page(
+        self,
+        limit: int = DIALOG_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        folder: Optional[int] = None,
+        types: Optional[set[DialogType]] = None
+    ) -> DialogPage:
+        """
+        Get one page of dialogs with a single bounded request.
+        以單次有界請求取得一頁對話。
+
+        Offsets and the folder are sent to Telegram. Private chats and type
+        filters are applied to the returned page, so a page may hold fewer
+        than `limit` dialogs while more remain.
+        偏移與資料夾由 Telegram 處理。私人聊天與類型篩選套用於回傳的頁面，
+        因此在仍有更多對話時，一頁也可能少於 `limit` 筆。
+
+        Args:
+            limit: Dialogs requested from Telegram (1-100) | 向 Telegram 請求的對話數（1-100）
+            cursor: next_cursor of the previous page | 上一頁的 next_cursor
+            folder: 0 main list, 1 archive, None all folders | 0 主列表、1 封存、None 所有資料夾
+            types: Dialog types to keep, None for all | 保留的對話類型，None 為全部
+
+        Returns:
+            DialogPage with the next cursor | 含下一頁游標的 DialogPage
+
+        Raises:
+            ValueError: Invalid limit, folder or cursor | 無效的 limit、folder 或游標
+        """
+        if not 1 <= limit <= DIALOG_PAGE_SIZE:
+            raise ValueError(
+                f"limit must be 1-{DIALOG_PAGE_SIZE} | limit 必須為 1-{DIALOG_PAGE_SIZE}"
+            )
+        if folder is not None and folder not in DIALOG_FOLDERS:
+            raise ValueError(f"Unknown folder: {folder} | 未知的資料夾：{folder}")
+        offset_date, offset_id, offset_peer = (
+            _decode_dialog_cursor(cursor) if cursor else (None, 0, InputPeerEmpty())
+        )
+
+        if not await self.is_authorized():
+            return DialogPage([])
 
         dialogs = []
-        async for dialog in self._client.iter_dialogs():
-            entity = dialog.entity
-            dialog_type = self._get_dialog_type(entity)
+        fetched = 0
+        last_dialog = None
+        last_message = None
+        with metrics.operation("get_dialogs_page"):
+            try:
+                async for dialog in self._client.iter_dialogs(
+                    limit=limit,
+                    offset_date=offset_date,
+                    offset_id=offset_id,
+                    offset_peer=offset_peer,
+                    # Pinned dialogs come with the first page | 置頂對話隨第一頁回傳
+                    ignore_pinned=cursor is not None,
+                    folder=folder
+                ):
+                    fetched += 1
+                    last_dialog = dialog
+                    if dialog.message is not None:
+                        last_message = dialog.message
+                    self._remember_entity(dialog.id, dialog.entity)
+
+                    info = self._build_dialog_info(dialog.id, dialog.name, dialog.entity)
+                    if info is None:
+                        continue
+                    self._search_index.upsert_dialog(info)
+                    if types and info.dialog_type not in types:
+                        continue
+                    dialogs.append(info)
+            except AuthKeyUnregisteredError:
+                self._invalidate_auth()
+                return DialogPage([])
+            finally:
+                metrics.count_items("dialogs", fetched)
+
+        # A short page is the last one | 不足一頁即為最後一頁
+        next_cursor = None
+        if fetched == limit and last_message is not None:
+            # Same offsets Telethon uses between its own requests | 與 Telethon 內部分頁使用相同的偏移
+            next_cursor = _encode_dialog_cursor(
+                last_message.date,
+                last_message.id,
+                last_dialog.input_entity
+            )
+        return DialogPage(dialogs, next_cursor)
+
+    async def search(
+        self,
+        query: str = "",
+        kind: Optional[str] = None,
+        types: Optional[set[DialogType]] = None,
+        is_bot: Optional[bool] = None,
+        min_members: Optional[int] = None,
+        max_members: Optional[int] = None,
+        limit: int = 20
+    ) -> list[SearchHit]:
+        """
+        Search known dialogs and senders by name or username.
+        依名稱或用戶名搜尋已知的對話與發送者。
+
+        Dialogs are loaded once if needed; senders are those seen by earlier
+        scans and member listings. See SearchIndex.search for the arguments.
+        必要時會載入一次對話；發送者為先前掃描與成員列表中出現者。參數見 SearchIndex.search。
+
+        Returns:
+            List of SearchHit, best first | SearchHit 列表，最佳者在前
+        """
+        if kind != KIND_SENDER and not self._dialog_cache.is_loaded:
+            await self.get_dialogs()
+
+        return self._search_index.search(
+            query,
+            kind=kind,
+            types=types,
+            is_bot=is_bot,
+            min_members=min_members,
+            max_members=max_members,
+            limit=limit
+        )
+
+    @metrics.instrumented
+    async def resolve(self, queries: list[str], concurrency: int = 4) -> list[ResolvedPeer]:
+        """
+        Resolve usernames, t.me links and numeric IDs to peers.
+        將用戶名、t.me 連結與數字 ID 解析為對象。
+
+        Identical peers are looked up once. Known dialogs, cached users and
+        access hashes stored in the session answer first; the rest are
+        fetched with multi-ID users.getUsers / channels.getChannels /
+        messages.getChats requests, and only usernames never seen before
+        cost one contacts.resolveUsername each.
+        相同的對象只查詢一次。已知對話、快取的用戶與 session 中儲存的 access hash
+        優先回應；其餘以多 ID 的 users.getUsers / channels.getChannels /
+        messages.getChats 請求取得，只有從未見過的用戶名各需一次 contacts.resolveUsername。
 
-            # Skip private chats (users) for this tool's purpose
-            # 跳過私人聊天（用戶），因為此工具主要用於群組/頻道
-            if dialog_type == DialogType.USER:
+        Args:
+            queries: "@username", "username", t.me links or marked peer IDs
+                     | "@用戶名"、"用戶名"、t.me 連結或標記的 peer ID
+            concurrency: Maximum requests in flight | 同時進行的最大請求數
+
+        Returns:
+            One ResolvedPeer per distinct query, in request order; failures
+            carry an error | 每個不同查詢一個 ResolvedPeer，依請求順序；失敗者帶有錯誤
+        """
+        queries = list(dict.fromkeys(queries))
+        if not await self.is_authorized():
+            return []
+
+        # Results keyed by ("id", peer ID), ("username", name) or ("invalid", query)
+        # 結果以（"id", peer ID）、（"username", 名稱）或（"invalid", 查詢）為鍵
+        resolved: dict[tuple, ResolvedPeer] = {}
+        keys: dict[str, tuple] = {}
+        for query in queries:
+            try:
+                keys[query] = _parse_peer_reference(query)
+            except ValueError as e:
+                keys[query] = ("invalid", query)
+                resolved[keys[query]] = ResolvedPeer(query=query, error=str(e))
+
+        dialogs = self._dialog_cache.snapshot(require_fresh=False)
+        by_id = {dialog.id: dialog for dialog in dialogs.value} if dialogs else {}
+        by_username = {dialog.username.lower(): dialog for dialog in by_id.values() if dialog.username}
+        session = self._client.session
+
+        # Usernames known locally become IDs | 本機已知的用戶名轉為 ID
+        aliases: dict[tuple, tuple] = {}
+        usernames: list[str] = []
+        for key in dict.fromkeys(keys.values()):
+            if key[0] != "username":
                 continue
+            dialog = by_username.get(key[1])
+            row = None if dialog else session.get_entity_rows_by_username(key[1])
+            if dialog is not None:
+                aliases[key] = ("id", dialog.id)
+            elif row is not None:
+                aliases[key] = ("id", row[0])
+            else:
+                usernames.append(key[1])
 
-            members_count = None
-            if hasattr(entity, 'participants_count'):
-                members_count = entity.participants_count
+        users: list = []
+        channels: list = []
+        chats: list[int] = []
+        for key in dict.fromkeys(aliases.get(key, key) for key in keys.values()):
+            if key[0] != "id":
+                continue
+            peer_id = key[1]
+            real_id, peer_type = utils.resolve_id(peer_id)
+            dialog = by_id.get(peer_id)
+            info = self._entity_cache.get(peer_id) if dialog is None and peer_type is PeerUser else None
+            if dialog is not None:
+                resolved[key] = ResolvedPeer(
+                    query="",
+                    id=dialog.id,
+                    dialog_type=dialog.dialog_type,
+                    name=dialog.name,
+                    username=dialog.username
+                )
+            elif info is not None:
+                resolved[key] = ResolvedPeer(
+                    query="",
+                    id=peer_id,
+                    dialog_type=DialogType.BOT if info.is_bot else DialogType.USER,
+                    name=info.name,
+                    username=info.username
+                )
+            elif peer_type is PeerChat:
+                # Basic groups need no access hash | 基本群組不需要 access hash
+                chats.append(real_id)
+            else:
+                row = session.get_entity_rows_by_id(peer_id)
+                if row is None:
+                    resolved[key] = ResolvedPeer(
+                        query="",
+                        error="Unknown ID, not seen by this account | 未知的 ID，此帳號尚未見過"
+                    )
+                elif peer_type is PeerUser:
+                    users.append(InputUser(real_id, row[1]))
+                else:
+                    channels.append(InputChannel(real_id, row[1]))
 
-            dialogs.append(DialogInfo(
-                id=dialog.id,
-                name=dialog.name or "Unknown",
-                dialog_type=dialog_type,
-                username=getattr(entity, 'username', None),
-                members_count=members_count
-            ))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
 
-        return dialogs
+        async def fetch(request, wanted: list[tuple], username: Optional[str] = None) -> None:
+            async with semaphore:
+                error = "Not found | 找不到"
+                try:
+                    result = await self._client(request)
+                except FloodWaitError as e:
+                    error = f"Too many requests. Wait {e.seconds} seconds | 請求過多，請等待 {e.seconds} 秒"
+                except (UsernameNotOccupiedError, UsernameInvalidError):
+                    pass
+                except AuthKeyUnregisteredError:
+                    self._invalidate_auth()
+                    error = "Not logged in | 未登入"
+                except Exception as e:
+                    error = str(e)
+                else:
+                    entities = result if isinstance(result, list) else [*result.chats, *getattr(result, "users", ())]
+                    for entity in entities:
+                        if isinstance(entity, UserEmpty):
+                            continue
+                        peer_id = utils.get_peer_id(entity)
+                        if isinstance(entity, User):
+                            self._remember_entity(peer_id, entity)
+                        resolved[("id", peer_id)] = ResolvedPeer(
+                            query="",
+                            id=peer_id,
+                            dialog_type=self._get_dialog_type(entity),
+                            name=self._get_display_name(entity),
+                            username=getattr(entity, "username", None)
+                        )
+                    if username is not None:
+                        aliases[("username", username)] = ("id", utils.get_peer_id(result.peer))
+                for key in wanted:
+                    key = aliases.get(key, key)
+                    if key not in resolved:
+                        resolved[key] = ResolvedPeer(query="", error=error)
+
+        requests = []
+        for start in range(0, len(users), RESOLVE_BATCH_SIZE):
+            batch = users[start:start + RESOLVE_BATCH_SIZE]
+            requests.append(fetch(GetUsersRequest(batch), [("id", utils.get_peer_id(u)) for u in batch]))
+        for start in range(0, len(channels), RESOLVE_BATCH_SIZE):
+            batch = channels[start:start + RESOLVE_BATCH_SIZE]
+            requests.append(fetch(GetChannelsRequest(batch), [("id", utils.get_peer_id(c)) for c in batch]))
+        for start in range(0, len(chats), RESOLVE_BATCH_SIZE):
+            batch = chats[start:start + RESOLVE_BATCH_SIZE]
+            requests.append(fetch(GetChatsRequest(batch), [("id", utils.get_peer_id(PeerChat(c))) for c in batch]))
+        for username in usernames:
+            requests.append(fetch(ResolveUsernameRequest(username), [("username", username)], username))
+        await asyncio.gather(*requests)
+
+        return [
+            replace(resolved[aliases.get(keys[query], keys[query])], query=query)
+            for query in queries
+        ]
 
     async def get_messages_senders(
         self,
         chat_id: int,
-        limit: int = 100
+        limit: int = 100,
+        max_senders: Optional[int] = None,
+        idle_limit: Optional[int] = None,
+        backfill: int = 0
     ) -> list[SenderInfo]:
         """
         Get unique senders from recent messages in a chat.
         從聊天的最近訊息中取得唯一的發送者。
 
+        With a sender index, only messages newer than the last scan are
+        fetched and all senders found so far are returned. Scans with stop
+        conditions bypass the index.
+        有發送者索引時，只取得上次掃描後的新訊息並回傳至今找到的所有發送者。
+        具停止條件的掃描會略過索引。
+
         Args:
             chat_id: Chat/Group/Channel ID
             limit: Maximum number of messages to fetch | 要取得的最大訊息數
+            max_senders: Stop after this many senders | 找到此數量發送者後停止
+            idle_limit: Stop after this many messages without a new sender
+                        | 連續此數量訊息無新發送者時停止
+            backfill: Older messages to scan past the indexed range
+                      | 在已索引範圍之前額外掃描的較舊訊息數
 
         Returns:
             List of unique SenderInfo objects | 唯一的 SenderInfo 物件列表
         """
-        if not self._client or not await self._client.is_user_authorized():
-            return []
+        result = await self._get_messages_senders(chat_id, limit, max_senders, idle_limit, backfill)
+        return result.senders
+
+    async def get_messages_senders_versioned(
+        self,
+        chat_id: int,
+        limit: int = 100,
+        backfill: int = 0
+    ) -> Versioned:
+        """
+        Get message senders together with the version of the data they came from.
+        取得訊息發送者及其來源資料的版本。
+
+        The version is read before the data, so it is never newer than the
+        senders returned. Scans that could not be cached (failed, or with
+        the sender cache disabled) are returned with version 0.
+        版本於資料之前讀取，因此不會比回傳的發送者更新。無法快取的掃描
+        （失敗或停用發送者快取時）以版本 0 回傳。
+
+        Returns:
+            Versioned list of SenderInfo; version 0 means unversioned
+            | 帶版本的 SenderInfo 列表；版本 0 表示無版本
+        """
+        if self._sender_index:
+            result, _ = await self._get_indexed_senders(chat_id, limit, backfill)
+            return result
+
+        cached = self.get_cached_senders(chat_id, limit)
+        if cached is not None:
+            return cached
+
+        senders = await self.get_messages_senders(chat_id, limit)
+        # A complete scan is stored in the sender cache | 完整掃描會存入發送者快取
+        cached = self.get_cached_senders(chat_id, limit)
+        # Anything else is served as scanned, never scanned again
+        # 其餘情況照掃描結果回應，不再重新掃描
+        return cached if cached is not None else Versioned(0, 0.0, senders)
+
+    async def _get_messages_senders(
+        self,
+        chat_id: int,
+        limit: int,
+        max_senders: Optional[int] = None,
+        idle_limit: Optional[int] = None,
+        backfill: int = 0
+    ) -> ChatSendersResult:
+        """
+        Scan senders, sharing the scan with concurrent identical calls.
+        掃描發送者，並與並行的相同呼叫共用掃描。
+        """
+        # Concurrent identical scans share one fetch | 並行的相同掃描共用一次取得
+        key = ("get_messages_senders", chat_id, limit, max_senders, idle_limit, backfill)
+        return await self._flights.do(
+            key,
+            lambda: self._scan_messages_senders(chat_id, limit, max_senders, idle_limit, backfill)
+        )
+
+    async def _scan_messages_senders(
+        self,
+        chat_id: int,
+        limit: int,
+        max_senders: Optional[int],
+        idle_limit: Optional[int],
+        backfill: int
+    ) -> ChatSendersResult:
+        """
+        Scan senders (uncoalesced implementation of get_messages_senders).
+        掃描發送者（get_messages_senders 的未合併實作）。
+
+        Errors other than FloodWait are logged and reported in the result
+        together with the senders found before them.
+        FloodWait 以外的錯誤會被記錄，並連同之前找到的發送者記錄於結果中。
+        """
+        if self._sender_index and not (max_senders or idle_limit):
+            result, error = await self._get_indexed_senders(chat_id, limit, backfill)
+            return ChatSendersResult(chat_id=chat_id, senders=result.value, error=error)
 
-        seen_ids = set()
         senders = []
 
         try:
-            async for message in self._client.iter_messages(chat_id, limit=limit):
-                if message.sender_id and message.sender_id not in seen_ids:
-                    seen_ids.add(message.sender_id)
-
-                    sender = message.sender
-                    if sender:
-                        is_bot = getattr(sender, 'bot', False)
-                        senders.append(SenderInfo(
-                            id=sender.id,
-                            name=self._get_display_name(sender),
-                            username=getattr(sender, 'username', None),
-                            is_bot=is_bot
-                        ))
+            async for sender in self.iter_messages_senders(
+                chat_id, limit, max_senders=max_senders, idle_limit=idle_limit
+            ):
+                senders.append(sender)
+        except FloodWaitError:
+            # Waits too long for the scheduler are surfaced to the caller
+            # 超過排程器可等待時間的 FloodWait 交由呼叫端處理
+            raise
         except Exception as e:
             # Log error but return what we have
             # 記錄錯誤但返回已有的資料
             print(f"Error fetching messages: {e}")
+            return ChatSendersResult(chat_id=chat_id, senders=senders, error=str(e))
+
+        return ChatSendersResult(chat_id=chat_id, senders=senders)
+
+    async def iter_messages_senders(
+        self,
+        chat_id: int,
+        limit: int = 100,
+        max_senders: Optional[int] = None,
+        idle_limit: Optional[int] = None,
+        *,
+        min_id: int = 0,
+        offset_id: int = 0,
+        progress: Optional[ScanProgress] = None
+    ) -> AsyncIterator[SenderInfo]:
+        """
+        Yield each new unique sender the moment it is seen.
+        在看到每個新的唯一發送者時立即產出。
 
-        return senders
+        The scan stops early once a stop condition is met, so no further
+        message pages are requested. Complete scans of the latest messages
+        are cached and replayed (stop conditions included) while fresh.
+        一旦符合停止條件即提前結束掃描，不再請求更多訊息頁。
+        最新訊息的完整掃描會被快取，新鮮時直接重播（含停止條件）。
+
+        Args:
+            chat_id: Chat/Group/Channel ID
+            limit: Maximum number of messages to fetch | 要取得的最大訊息數
+            max_senders: Stop after this many senders | 找到此數量發送者後停止
+            idle_limit: Stop after this many messages without a new sender
+                        | 連續此數量訊息無新發送者時停止
+            min_id: Only scan messages newer than this ID | 只掃描比此 ID 新的訊息
+            offset_id: Only scan messages older than this ID | 只掃描比此 ID 舊的訊息
+            progress: Filled with the scanned message range | 填入已掃描的訊息範圍
+
+        Yields:
+            SenderInfo objects | SenderInfo 物件
+        """
+        if not await self.is_authorized():
+            return
+
+        # Only plain scans of the latest messages are cached | 只快取最新訊息的一般掃描
+        cacheable = progress is None and not min_id and not offset_id
+        if cacheable:
+            cached = self._sender_cache.get(chat_id, limit)
+            if cached is not None:
+                for sender in self._replay_scan(cached, limit, max_senders, idle_limit):
+                    yield sender
+                return
+            scan = SenderScan(senders=[], positions=[], messages=0, exhausted=False)
+
+        if progress is None:
+            progress = ScanProgress()
+
+        seen_ids = set()
+        found = 0
+        # Messages since the last new sender | 自上次新發送者以來的訊息數
+        idle = 0
+        scanned = progress.messages
+
+        with metrics.operation("iter_messages_senders"):
+            try:
+                async for message in self._client.iter_messages(
+                    chat_id, limit=limit, min_id=min_id, offset_id=offset_id
+                ):
+                    # Messages arrive newest first | 訊息由新到舊抵達
+                    progress.messages += 1
+                    if progress.max_id is None:
+                        progress.max_id = message.id
+                    progress.min_id = message.id
+
+                    if message.sender_id and message.sender_id not in seen_ids:
+                        seen_ids.add(message.sender_id)
+
+                        # Known senders skip the entity lookup | 已知發送者略過實體查詢
+                        info = self._entity_cache.get(message.sender_id)
+                        if info is None and message.sender:
+                            info = self._remember_entity(message.sender_id, message.sender)
+
+                        if info:
+                            self._search_index.add_sender(info, chat_id)
+                            idle = 0
+                            found += 1
+                            progress.sender_message_ids[info.id] = message.id
+                            if cacheable:
+                                scan.senders.append(info)
+                                scan.positions.append(progress.messages)
+                            yield info
+
+                            if max_senders and found >= max_senders:
+                                return
+                            continue
+
+                    idle += 1
+                    if idle_limit and idle >= idle_limit:
+                        return
+
+                if cacheable:
+                    scan.messages = progress.messages
+                    scan.exhausted = progress.messages < limit
+                    self._sender_cache.put(chat_id, scan)
+            except AuthKeyUnregisteredError:
+                self._invalidate_auth()
+            finally:
+                metrics.count_items("messages", progress.messages - scanned)
+
+    def get_cached_senders(
+        self,
+        chat_id: int,
+        limit: int = 100,
+        max_senders: Optional[int] = None,
+        idle_limit: Optional[int] = None
+    ) -> Optional[Versioned]:
+        """
+        Replay a fresh cached scan with its version, without any RPC.
+        重播新鮮的快取掃描及其版本，不發出任何 RPC。
+
+        Returns:
+            Versioned list of SenderInfo, or None if no fresh scan covers limit
+            | 帶版本的 SenderInfo 列表，無涵蓋 limit 的新鮮掃描時為 None
+        """
+        # A miss is counted by the scan that follows | 未命中由隨後的掃描計算
+        scan = self._sender_cache.get(chat_id, limit, count_miss=False)
+        if scan is None:
+            return None
+        senders = list(self._replay_scan(scan, limit, max_senders, idle_limit))
+        return Versioned(scan.version, scan.modified_at, senders)
+
+    def _replay_scan(
+        self,
+        scan: SenderScan,
+        limit: int,
+        max_senders: Optional[int],
+        idle_limit: Optional[int]
+    ) -> Iterator[SenderInfo]:
+        """
+        Yield what a fresh scan with these limits would yield.
+        產出以這些限制重新掃描時會產出的結果。
+        """
+        previous = 0
+        for found, (sender, position) in enumerate(zip(scan.senders, scan.positions), 1):
+            # Messages between two new senders count towards idle_limit
+            # 兩個新發送者之間的訊息計入 idle_limit
+            if position > limit or (idle_limit and position - previous - 1 >= idle_limit):
+                return
+            yield sender
+            if max_senders and found >= max_senders:
+                return
+            previous = position
+
+    async def get_sender_activity(
+        self,
+        chat_id: int,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> SenderActivity:
+        """
+        Count messages per sender within a date window.
+        統計日期區間內每個發送者的訊息數。
+
+        Only the window is read: the scan starts at `until` via offset_date
+        and stops at the first message older than `since`. Counts are kept
+        per sender while messages stream by, so memory grows with the number
+        of senders, not messages.
+        只讀取區間內的訊息：掃描透過 offset_date 由 `until` 開始，並在第一則早於
+        `since` 的訊息停止。計數於訊息串流時依發送者累計，因此記憶體隨發送者數而非訊息數增長。
+
+        Args:
+            chat_id: Chat/Group/Channel ID
+            since: Oldest message date, inclusive (naive means UTC)
+                   | 最舊訊息日期，包含（無時區視為 UTC）
+            until: Newest message date, exclusive (naive means UTC)
+                   | 最新訊息日期，不包含（無時區視為 UTC）
+            limit: Maximum messages to read | 最大讀取訊息數
+
+        Returns:
+            SenderActivity with senders most recently active first
+            | SenderActivity，發送者依最近活動排序
+
+        Raises:
+            ValueError: since is not before until | since 不早於 until
+        """
+        since = _as_utc(since)
+        until = _as_utc(until)
+        if since and until and since >= until:
+            raise ValueError("since must be before until | since 必須早於 until")
+
+        # Concurrent identical scans share one fetch | 並行的相同掃描共用一次取得
+        key = ("get_sender_activity", chat_id, since, until, limit)
+        return await self._flights.do(
+            key,
+            lambda: self._get_sender_activity(chat_id, since, until, limit)
+        )
+
+    async def _get_sender_activity(
+        self,
+        chat_id: int,
+        since: Optional[datetime],
+        until: Optional[datetime],
+        limit: Optional[int]
+    ) -> SenderActivity:
+        """
+        Scan a date window (uncoalesced implementation of get_sender_activity).
+        掃描日期區間（get_sender_activity 的未合併實作）。
+        """
+        if not await self.is_authorized():
+            return SenderActivity(senders=[], messages=0, complete=True)
+
+        # sender ID -> [info, count, first seen, last seen], in first-seen order
+        # 發送者 ID -> [資訊, 計數, 首次出現, 最後出現]，依首次看到的順序
+        activity: dict[int, list] = {}
+        # Senders without a usable entity | 無可用實體的發送者
+        skipped = set()
+        messages = 0
+        complete = True
+
+        with metrics.operation("get_sender_activity"):
+            try:
+                async for message in self._client.iter_messages(
+                    chat_id, limit=limit, offset_date=until
+                ):
+                    # Messages arrive newest first | 訊息由新到舊抵達
+                    if since and message.date < since:
+                        break
+                    messages += 1
+
+                    sender_id = message.sender_id
+                    if not sender_id or sender_id in skipped:
+                        continue
+                    entry = activity.get(sender_id)
+                    if entry is not None:
+                        entry[1] += 1
+                        entry[2] = message.date
+                        continue
+
+                    # Known senders skip the entity lookup | 已知發送者略過實體查詢
+                    info = self._entity_cache.get(sender_id)
+                    if info is None and message.sender:
+                        info = self._remember_entity(sender_id, message.sender)
+                    if info is None:
+                        skipped.add(sender_id)
+                        continue
+                    self._search_index.add_sender(info, chat_id)
+                    activity[sender_id] = [info, 1, message.date, message.date]
+                else:
+                    # Ran out of messages or hit the limit | 訊息耗盡或達到上限
+                    complete = limit is None or messages < limit
+            except FloodWaitError:
+                # Waits too long for the scheduler are surfaced to the caller
+                # 超過排程器可等待時間的 FloodWait 交由呼叫端處理
+                raise
+            except AuthKeyUnregisteredError:
+                self._invalidate_auth()
+                complete = False
+            except Exception as e:
+                # Log error but return what we have | 記錄錯誤但返回已有的資料
+                print(f"Error fetching messages: {e}")
+                complete = False
+            finally:
+                metrics.count_items("messages", messages)
+
+        # Cached entities are shared, so activity goes on copies | 快取實體為共用，活動寫在副本上
+        senders = [
+            replace(info, message_count=count, first_seen=first_seen, last_seen=last_seen)
+            for info, count, first_seen, last_seen in activity.values()
+        ]
+        return SenderActivity(senders=senders, messages=messages, complete=complete)
+
+    @metrics.instrumented
+    async def get_chat_senders(
+        self,
+        chat_id: int,
+        mode: str = SENDER_MODE_AUTO,
+        limit: int = 100,
+        filter: Optional[str] = None,
+        search: str = ""
+    ) -> tuple[str, list[SenderInfo]]:
+        """
+        Get a chat's senders by member list or message scan.
+        透過成員列表或訊息掃描取得聊天的發送者。
+
+        In auto mode, groups and channels we administer are enumerated through
+        the participant list; other chats fall back to a message scan.
+        自動模式下，群組與我們管理的頻道以成員列表列舉；其他聊天退回訊息掃描。
+
+        Args:
+            chat_id: Chat/Group/Channel ID
+            mode: "auto", "participants" or "messages" | "auto"、"participants" 或 "messages"
+            limit: Maximum members or messages | 最大成員數或訊息數
+            filter: "admins" or "bots" | "admins" 或 "bots"
+            search: Name/username prefix | 名稱/用戶名前綴
+
+        Returns:
+            (mode used, list of SenderInfo) | （使用的模式, SenderInfo 列表）
+
+        Raises:
+            ValueError: Invalid mode/filter, or admins requested without member access
+                        | 無效的模式/篩選，或無成員權限時要求管理員
+        """
+        if mode not in (SENDER_MODE_AUTO, SENDER_MODE_PARTICIPANTS, SENDER_MODE_MESSAGES):
+            raise ValueError(f"Unknown mode: {mode} | 未知的模式：{mode}")
+        if filter is not None and filter not in PARTICIPANT_FILTERS:
+            raise ValueError(f"Unknown filter: {filter} | 未知的篩選：{filter}")
+
+        if not await self.is_authorized():
+            return mode, []
+
+        if mode == SENDER_MODE_AUTO:
+            mode = await self._choose_sender_mode(chat_id)
+
+        if mode == SENDER_MODE_PARTICIPANTS:
+            async def fetch() -> list[SenderInfo]:
+                return [
+                    sender async for sender in self.iter_participants(
+                        chat_id, limit, filter=filter, search=search
+                    )
+                ]
+
+            try:
+                key = ("iter_participants", chat_id, limit, filter, search)
+                senders = await self._flights.do(key, fetch)
+                return SENDER_MODE_PARTICIPANTS, senders
+            except ChatAdminRequiredError:
+                # Member list is hidden from us | 成員列表對我們隱藏
+                pass
+
+        if filter == "admins":
+            raise ValueError(
+                "Admin list requires member access | 管理員列表需要成員存取權限"
+            )
+
+        senders = await self.get_messages_senders(chat_id, limit)
+        return SENDER_MODE_MESSAGES, [
+            sender for sender in senders
+            if (filter != "bots" or sender.is_bot) and matches_prefix(sender, search)
+        ]
+
+    async def iter_participants(
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        filter: Optional[str] = None,
+        search: str = ""
+    ) -> AsyncIterator[SenderInfo]:
+        """
+        Yield chat members from the participant list.
+        從成員列表逐一產出聊天成員。
+
+        Args:
+            chat_id: Chat/Group/Channel ID
+            limit: Maximum members | 最大成員數
+            filter: "admins" or "bots" | "admins" 或 "bots"
+            search: Name/username prefix | 名稱/用戶名前綴
+
+        Yields:
+            SenderInfo objects | SenderInfo 物件
+        """
+        if not await self.is_authorized():
+            return
+
+        iterated = 0
+        with metrics.operation("iter_participants"):
+            try:
+                # Telegram searches by substring, so prefixes are re-checked here
+                # Telegram 以子字串搜尋，因此在此重新檢查前綴
+                async for user in self._client.iter_participants(
+                    chat_id,
+                    limit=limit,
+                    search=search,
+                    filter=PARTICIPANT_FILTERS.get(filter)
+                ):
+                    iterated += 1
+                    # Basic groups ignore server-side filters | 一般群組會忽略伺服器端篩選
+                    if filter == "bots" and not getattr(user, 'bot', False):
+                        continue
+                    if filter == "admins" and not isinstance(
+                        getattr(user, 'participant', None),
+                        (ChatParticipantAdmin, ChatParticipantCreator,
+                         ChannelParticipantAdmin, ChannelParticipantCreator)
+                    ):
+                        continue
+
+                    sender = self._remember_entity(user.id, user)
+                    self._search_index.add_sender(sender, chat_id)
+                    if matches_prefix(sender, search):
+                        yield sender
+            except AuthKeyUnregisteredError:
+                self._invalidate_auth()
+            finally:
+                metrics.count_items("participants", iterated)
+
+    async def scan_senders_batch(
+        self,
+        chat_ids: list[int],
+        limit: int = 100,
+        limits: Optional[dict[int, int]] = None,
+        concurrency: int = 4
+    ) -> AsyncIterator[ChatSendersResult]:
+        """
+        Scan several chats concurrently, yielding each as it finishes.
+        並行掃描多個聊天，每個完成時即產出。
+
+        Each chat goes through get_messages_senders, so cached or indexed
+        chats are served like single-chat requests and identical concurrent
+        scans are shared. A failure or FloodWait in one chat is reported in
+        its result and does not block the others.
+        每個聊天皆經由 get_messages_senders，因此已快取或已索引的聊天與單一聊天請求
+        回應相同，並行的相同掃描也會共用。單一聊天的失敗或 FloodWait 會記錄於其結果，
+        不會阻擋其他聊天。
+
+        Args:
+            chat_ids: Chat IDs to scan | 要掃描的聊天 ID
+            limit: Default messages per chat | 每個聊天的預設訊息數
+            limits: Per-chat message limits | 各聊天的訊息數上限
+            concurrency: Maximum chats scanned at once | 同時掃描的最大聊天數
+
+        Yields:
+            ChatSendersResult objects in completion order | 依完成順序的 ChatSendersResult
+        """
+        limits = limits or {}
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def scan(chat_id: int) -> ChatSendersResult:
+            async with semaphore:
+                try:
+                    return await self._get_messages_senders(chat_id, limits.get(chat_id, limit))
+                except FloodWaitError as e:
+                    return ChatSendersResult(
+                        chat_id=chat_id,
+                        error=f"Too many requests. Wait {e.seconds} seconds | 請求過多，請等待 {e.seconds} 秒"
+                    )
+                except Exception as e:
+                    return ChatSendersResult(chat_id=chat_id, error=str(e))
+
+        # Deduplicate while keeping order | 去除重複並保留順序
+        tasks = [asyncio.create_task(scan(chat_id)) for chat_id in dict.fromkeys(chat_ids)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop remaining scans if the consumer goes away | 呼叫端離開時停止剩餘掃描
+            for task in tasks:
+                task.cancel()
+
+    async def _get_indexed_senders(
+        self,
+        chat_id: int,
+        limit: int,
+        backfill: int
+    ) -> tuple[Versioned, Optional[str]]:
+        """
+        Scan unindexed messages, sharing the scan with every concurrent caller.
+        掃描未索引的訊息，並與所有並行呼叫者共用掃描。
+
+        Plain, versioned and batch scans all land here. Identical scans are
+        shared, and scans of one chat with a different limit or backfill wait
+        for each other, so each reads the range the previous one recorded.
+        一般、帶版本與批次掃描皆經由此處。相同的掃描會共用，同一聊天但 limit 或 backfill
+        不同的掃描則依序等待，使每次都讀取前一次記錄的範圍。
+        """
+        async def locked_scan() -> tuple[Versioned, Optional[str]]:
+            async with self._index_locks.setdefault(chat_id, asyncio.Lock()):
+                return await self._scan_indexed_senders(chat_id, limit, backfill)
+
+        return await self._flights.do(("indexed_senders", chat_id, limit, backfill), locked_scan)
+
+    async def _scan_indexed_senders(
+        self,
+        chat_id: int,
+        limit: int,
+        backfill: int
+    ) -> tuple[Versioned, Optional[str]]:
+        """
+        Scan only unindexed messages and return all indexed senders.
+        只掃描未索引的訊息並回傳所有已索引的發送者。
+
+        Returns:
+            (Versioned list of SenderInfo, error of a failed scan or None)
+            | （帶版本的 SenderInfo 列表, 失敗掃描的錯誤或 None）
+        """
+        if not await self.is_authorized():
+            return Versioned(0, 0.0, []), None
+
+        found: list[tuple[SenderInfo, int]] = []
+        known = None
+        newer = ScanProgress()
+        older = ScanProgress()
+        newer_done = False
+        error = None
+
+        async def scan(n: int, progress: ScanProgress, **kwargs) -> None:
+            async for sender in self.iter_messages_senders(chat_id, n, progress=progress, **kwargs):
+                found.append((sender, progress.sender_message_ids[sender.id]))
+
+        def scanned_range() -> Optional[ScanRange]:
+            """Contiguous range covered so far | 至今涵蓋的連續範圍"""
+            if newer.max_id is None:
+                scan_range = known
+            elif known is None:
+                # Scans run newest first, so even a cut-short first scan is contiguous
+                # 掃描由新到舊進行，因此即使首次掃描中斷，範圍仍是連續的
+                scan_range = ScanRange(min_id=newer.min_id, max_id=newer.max_id)
+            elif not newer_done:
+                # A cut-short top-up would leave a gap | 中斷的補掃會留下缺口
+                scan_range = known
+            else:
+                # Hitting the limit leaves a gap, so the range restarts
+                # 達到上限會留下缺口，因此範圍重新起算
+                min_id = newer.min_id if newer.messages >= limit else known.min_id
+                scan_range = ScanRange(min_id=min_id, max_id=newer.max_id)
+            if scan_range is not None and older.min_id is not None:
+                scan_range = ScanRange(min_id=older.min_id, max_id=scan_range.max_id)
+            return scan_range
+
+        try:
+            known = await self._sender_index.get_range(chat_id)
+            await scan(limit, newer, min_id=known.max_id if known else 0)
+            newer_done = True
+
+            scan_range = scanned_range()
+            if backfill > 0 and scan_range is not None:
+                await scan(backfill, older, offset_id=scan_range.min_id)
+        except Exception as e:
+            error = e
+
+        try:
+            # Failed scans still record what they covered | 失敗的掃描仍記錄其已涵蓋的部分
+            scan_range = scanned_range()
+            # Unchanged scans skip the database write | 未變更的掃描略過資料庫寫入
+            if scan_range is not None and (found or scan_range != known):
+                await self._sender_index.record_scan(chat_id, scan_range, found)
+        except Exception as e:
+            error = error or e
+
+        if isinstance(error, FloodWaitError):
+            raise error
+        if error is not None:
+            # Log error and fall back to what is indexed
+            # 記錄錯誤並退回已索引的資料
+            print(f"Error fetching messages: {error}")
+
+        result = await self._sender_index.get_senders(chat_id)
+        # Senders indexed by earlier runs | 先前執行所索引的發送者
+        for sender in result.value:
+            self._search_index.add_sender(sender, chat_id)
+        return result, None if error is None else str(error)
+
+    def start_warm_up(
+        self,
+        chat_ids: Optional[list[int]] = None,
+        top: int = 5,
+        limit: int = 200
+    ) -> None:
+        """
+        Start warming caches in the background unless already running.
+        在背景開始預熱快取（若尚未執行）。
+        """
+        if self._warm_up_task is None or self._warm_up_task.done():
+            self._warm_up_task = asyncio.create_task(self.warm_up(chat_ids, top, limit))
+
+    async def warm_up(
+        self,
+        chat_ids: Optional[list[int]] = None,
+        top: int = 5,
+        limit: int = 200
+    ) -> int:
+        """
+        Prefetch the dialog list and sender scans at low RPC priority.
+        以低 RPC 優先權預先取得對話列表與發送者掃描。
+
+        Interactive requests made meanwhile go ahead of warm-up RPCs. Warm-up
+        fetches bypass request coalescing, so no interactive request ever
+        waits on a low-priority fetch.
+        期間的互動請求會優先於預熱 RPC。預熱的取得不經請求合併，
+        因此互動請求不會等待低優先權的取得。
+
+        Args:
+            chat_ids: Chats to scan; defaults to those with the latest messages,
+                      pinned or not | 要掃描的聊天；預設為最新訊息所在者，不論是否置頂
+            top: Number of recent chats when chat_ids is not given
+                 | 未指定 chat_ids 時的最近聊天數
+            limit: Messages scanned per chat | 每個聊天掃描的訊息數
+
+        Returns:
+            Number of chats warmed | 已預熱的聊天數
+        """
+        warmed = 0
+        with low_priority():
+            try:
+                # Walked directly rather than through the shared flight
+                # 直接走訪，而非經由共用的合併請求
+                dialogs = [dialog async for dialog in self.iter_dialogs()]
+                # Pinned dialogs lead Telegram's order, so rank by last message
+                # 置頂對話排在 Telegram 順序最前，因此依最後訊息排序
+                recent = sorted(
+                    dialogs,
+                    key=lambda dialog: self._dialog_activity.get(dialog.id, 0.0),
+                    reverse=True
+                )
+                targets = chat_ids or [dialog.id for dialog in recent[:top]]
+                for chat_id in targets:
+                    try:
+                        async for _ in self.iter_messages_senders(chat_id, limit):
+                            pass
+                        warmed += 1
+                    except FloodWaitError:
+                        raise
+                    except Exception as e:
+                        print(f"Error warming chat {chat_id}: {e}")
+            except FloodWaitError as e:
+                # Leave the remaining budget to users | 將剩餘額度留給使用者
+                print(f"Warm-up stopped by FloodWait ({e.seconds}s)")
+            except Exception as e:
+                print(f"Error warming up: {e}")
+        return warmed
+
+    def get_stats(self) -> dict:
+        """
+        Get cache and RPC scheduler statistics.
+        取得快取與 RPC 排程器統計。
+
+        Returns:
+            dict of statistics | 統計字典
+        """
+        return {
+            "dialog_cache": self._dialog_cache.stats(),
+            "entity_cache": self._entity_cache.stats(),
+            "sender_cache": self._sender_cache.stats(),
+            "search_index": self._search_index.stats(),
+            "session": {
+                "storage": "sqlite" if self._session_store is None else "memory",
+                "snapshots": self._snapshots,
+                "dirty": bool(self._session and self._session.dirty),
+            },
+            "rpc": self._scheduler.stats(),
+            "coalescing": self._flights.stats(),
+        }
+
+    async def _on_chat_action(self, event) -> None:
+        """
+        Apply chat actions (join, leave, title change) to the dialog cache.
+        將聊天動作（加入、離開、標題變更）套用至對話快取。
+        """
+        try:
+            me_id = self._auth_state.user_id
+            involves_me = me_id is not None and me_id in event.user_ids
+
+            if (event.user_left or event.user_kicked) and involves_me:
+                self._dialog_cache.remove(event.chat_id)
+            elif event.created or ((event.user_joined or event.user_added) and involves_me):
+                chat = await event.get_chat()
+                info = self._build_dialog_info(event.chat_id, None, chat)
+                if info:
+                    self._dialog_cache.upsert(info)
+            elif event.new_title:
+                self._dialog_cache.rename(event.chat_id, event.new_title)
+        except Exception as e:
+            print(f"Error handling chat action: {e}")
+
+    async def _on_raw_update(self, update) -> None:
+        """
+        Apply group migrations and channel changes to the dialog cache.
+        將群組遷移與頻道變更套用至對話快取。
+        """
+        if not self._dialog_cache.is_loaded:
+            return
+
+        try:
+            if isinstance(update, UpdateNewMessage):
+                message = update.message
+                if (isinstance(message, MessageService)
+                        and isinstance(message.action, MessageActionChatMigrateTo)):
+                    # Group upgraded to supergroup | 群組升級為超級群組
+                    self._dialog_cache.remove(utils.get_peer_id(message.peer_id))
+                    channel = await self._client.get_entity(
+                        PeerChannel(message.action.channel_id)
+                    )
+                    info = self._build_dialog_info(None, None, channel)
+                    if info:
+                        self._dialog_cache.upsert(info)
+
+            elif isinstance(update, UpdateChannel):
+                # Sent on joins, leaves and edits; fetch the channel to tell which
+                # 加入、離開與編輯時皆會送出；取得頻道以判斷
+                dialog_id = utils.get_peer_id(PeerChannel(update.channel_id))
+                channel = await self._client.get_entity(PeerChannel(update.channel_id))
+                if isinstance(channel, ChannelForbidden) or getattr(channel, 'left', False):
+                    self._dialog_cache.remove(dialog_id)
+                else:
+                    info = self._build_dialog_info(dialog_id, None, channel)
+                    if info:
+                        self._dialog_cache.upsert(info)
+        except Exception as e:
+            print(f"Error handling update: {e}")
+
+    async def _choose_sender_mode(self, chat_id: int) -> str:
+        """
+        Pick participant or message-scan mode from the chat type and rights.
+        依聊天類型與權限選擇成員或訊息掃描模式。
+        """
+        try:
+            entity = await self._client.get_entity(chat_id)
+        except Exception:
+            return SENDER_MODE_MESSAGES
+
+        if self._get_dialog_type(entity) == DialogType.GROUP:
+            return SENDER_MODE_PARTICIPANTS
+
+        # Broadcast channels only list members to admins | 廣播頻道僅對管理員列出成員
+        if isinstance(entity, Channel) and (entity.creator or entity.admin_rights):
+            return SENDER_MODE_PARTICIPANTS
+
+        return SENDER_MODE_MESSAGES
+
+    def _remember_entity(self, peer_id: int, entity) -> SenderInfo:
+        """
+        Convert an entity to SenderInfo and store it in the entity cache.
+        將實體轉換為 SenderInfo 並存入實體快取。
+        """
+        info = SenderInfo(
+            id=entity.id,
+            name=self._get_display_name(entity),
+            username=getattr(entity, 'username', None),
+            is_bot=bool(getattr(entity, 'bot', False))
+        )
+        self._entity_cache.put(peer_id, info)
+        return info
+
+    def _build_dialog_info(
+        self,
+        dialog_id: Optional[int],
+        name: Optional[str],
+        entity
+    ) -> Optional[DialogInfo]:
+        """
+        Build a DialogInfo from an entity, skipping private users.
+        從實體建立 DialogInfo，略過私人用戶。
+        """
+        dialog_type = self._get_dialog_type(entity)
+        if dialog_type == DialogType.USER:
+            return None
+
+        members_count = None
+        if hasattr(entity, 'participants_count'):
+            members_count = entity.participants_count
+
+        return DialogInfo(
+            id=dialog_id if dialog_id is not None else utils.get_peer_id(entity),
+            name=name or self._get_display_name(entity) or "Unknown",
+            dialog_type=dialog_type,
+            username=getattr(entity, 'username', None),
+            members_count=members_count
+        )
+
+    def _auth_is_fresh(self) -> bool:
+        """
+        Check whether the cached auth state is still fresh.
+        檢查快取的認證狀態是否仍新鮮。
+        """
+        if not self._auth_checked_at:
+            return False
+        return time.monotonic() - self._auth_checked_at < self.auth_cache_ttl
+
+    @metrics.instrumented
+    async def _refresh_auth_state(self) -> None:
+        """
+        Rebuild the auth state from Telegram.
+        從 Telegram 重建認證狀態。
+
+        Concurrent callers share one check instead of each issuing RPCs.
+        並行呼叫者共用一次檢查，而非各自發出 RPC。
+        """
+        checked_at = self._auth_checked_at
+        async with self._auth_lock:
+            # Another caller refreshed while we waited | 等待期間已被其他呼叫者刷新
+            if self._auth_checked_at != checked_at and self._auth_is_fresh():
+                return
+
+            if await self._client.is_user_authorized():
+                me = await self._client.get_me()
+                self._set_logged_in(me)
+            else:
+                # Keep a pending login (phone code hash) intact
+                # 保留進行中的登入（驗證碼 hash）
+                self._auth_state.is_logged_in = False
+                self._auth_state.user_id = None
+                self._auth_state.user_name = None
+                self._auth_state.username = None
+                self._auth_checked_at = time.monotonic()
+
+    async def _auth_refresh_loop(self) -> None:
+        """
+        Periodically refresh the auth cache in the background.
+        在背景定期刷新認證快取。
+        """
+        while True:
+            await asyncio.sleep(self.auth_cache_ttl)
+            try:
+                await self._refresh_auth_state()
+            except asyncio.CancelledError:
+                raise
+            except AuthKeyUnregisteredError:
+                self._invalidate_auth()
+            except Exception as e:
+                print(f"Error refreshing auth state: {e}")
+
+    def _set_logged_in(self, me) -> None:
+        """
+        Record a logged-in identity in the auth cache.
+        在認證快取中記錄已登入的身分。
+        """
+        # A different account must not see the previous account's dialogs
+        # 不同帳號不得看到前一個帳號的對話
+        if self._auth_state.user_id != me.id:
+            self._dialog_cache.invalidate()
+        self._remember_entity(me.id, me)
+
+        self._auth_state = AuthState(
+            is_logged_in=True,
+            user_id=me.id,
+            user_name=self._get_display_name(me),
+            username=getattr(me, 'username', None)
+        )
+        self._auth_checked_at = time.monotonic()
+
+    def _invalidate_auth(self) -> None:
+        """
+        Reset the auth cache to logged out.
+        將認證快取重設為登出狀態。
+
+        The logged-out state is authoritative, so it is marked fresh.
+        登出狀態為權威狀態，因此標記為新鮮。
+        """
+        self._auth_state = AuthState()
+        self._auth_checked_at = time.monotonic()
+        self._dialog_cache.invalidate()
+        self._entity_cache.clear()
+        self._sender_cache.invalidate()
+        self._search_index.clear()
+        self.instance_id = secrets.token_hex(4)
 
     def _get_dialog_type(self, entity) -> DialogType:
         """
@@ -448,16 +1933,108 @@ class TelegramService:
         return "Unknown"
 
 
-# Singleton instance management | 單例實例管理
-_service_instance: Optional[TelegramService] = None
+# ============================================================================
+# Dialog Cursors | 對話游標
+# ============================================================================
+
+def _encode_dialog_cursor(offset_date, offset_id: int, offset_peer) -> str:
+    """
+    Encode dialog offsets as an opaque URL-safe cursor.
+    將對話偏移編碼為不透明且 URL 安全的游標。
+    """
+    if isinstance(offset_peer, InputPeerChannel):
+        peer = ["c", offset_peer.channel_id, offset_peer.access_hash]
+    elif isinstance(offset_peer, InputPeerUser):
+        peer = ["u", offset_peer.user_id, offset_peer.access_hash]
+    elif isinstance(offset_peer, InputPeerChat):
+        peer = ["g", offset_peer.chat_id, 0]
+    elif isinstance(offset_peer, InputPeerSelf):
+        peer = ["s", 0, 0]
+    else:
+        peer = ["e", 0, 0]
+
+    date = int(offset_date.timestamp()) if offset_date else 0
+    raw = json.dumps([date, offset_id, *peer], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_dialog_cursor(cursor: str) -> tuple:
+    """
+    Decode a cursor into (offset_date, offset_id, offset_peer).
+    將游標解碼為（offset_date, offset_id, offset_peer）。
+
+    Raises:
+        ValueError: Malformed cursor | 格式錯誤的游標
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, offset_id, kind, peer_id, access_hash = json.loads(raw)
+        if not all(isinstance(n, int) for n in (date, offset_id, peer_id, access_hash)):
+            raise ValueError
+        peer = {
+            "c": lambda: InputPeerChannel(peer_id, access_hash),
+            "u": lambda: InputPeerUser(peer_id, access_hash),
+            "g": lambda: InputPeerChat(peer_id),
+            "s": InputPeerSelf,
+            "e": InputPeerEmpty,
+        }[kind]()
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor | 無效的游標") from None
+
+    return date or None, offset_id, peer
+
 
+# ============================================================================
+# Peer References | 對象參照
+# ============================================================================
 
-def get_telegram_service() -> Optional[TelegramService]:
-    """Get the global Telegram service instance | 取得全域 Telegram 服務實例"""
-    return _service_instance
+# t.me links, with or without scheme | t.me 連結，可含或不含協定
+_LINK_RE = re.compile(r"^(?:https?://)?(?:www\.)?(?:t|telegram)\.(?:me|dog)/(.*)$", re.IGNORECASE)
 
+# Public usernames | 公開用戶名
+_USERNAME_RE = re.compile(r"^[a-z][a-z0-9_]{2,31}$", re.IGNORECASE)
 
-def set_telegram_service(service: TelegramService) -> None:
-    """Set the global Telegram service instance | 設定全域 Telegram 服務實例"""
-    global _service_instance
-    _service_instance = service
+
+def _parse_peer_reference(text: str) -> tuple:
+    """
+    Parse a username, t.me link or marked peer ID.
+    解析用戶名、t.me 連結或標記的 peer ID。
+
+    Returns:
+        ("id", marked peer ID) or ("username", lowercase username)
+        | （"id", 標記的 peer ID）或（"username", 小寫用戶名）
+
+    Raises:
+        ValueError: Invite link or unrecognised text | 邀請連結或無法辨識的文字
+    """
+    text = text.strip()
+    if re.fullmatch(r"-?\d+", text):
+        return "id", int(text)
+
+    match = _LINK_RE.match(text)
+    if match:
+        path = match.group(1).split("?")[0].strip("/").split("/")
+        if path[0].startswith("+") or path[0] == "joinchat":
+            raise ValueError(
+                "Invite links cannot be resolved without joining | 邀請連結需加入後才能解析"
+            )
+        if path[0] == "c" and len(path) > 1 and path[1].isdigit():
+            # Private message links carry the bare channel ID | 私人訊息連結帶有未標記的頻道 ID
+            return "id", utils.get_peer_id(PeerChannel(int(path[1])))
+        text = path[1] if path[0] == "s" and len(path) > 1 else path[0]
+
+    username = text[1:] if text.startswith("@") else text
+    if not _USERNAME_RE.match(username):
+        raise ValueError(f"Not a username, link or ID: {text} | 不是用戶名、連結或 ID：{text}")
+    return "username", username.lower()
+
+
+# ============================================================================
+# Dates | 日期
+# ============================================================================
+
+def _as_utc(date: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive datetimes as UTC | 將無時區的 datetime 視為 UTC"""
+    if date is not None and date.tzinfo is None:
+        return date.replace(tzinfo=timezone.utc)
+    return date
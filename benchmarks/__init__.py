@@ -0,0 +1,3 @@
+# Offline benchmarks | 離線效能測試
+# Run with: python -m benchmarks.<module>
+# 執行方式：python -m benchmarks.<module>
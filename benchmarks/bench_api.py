@@ -0,0 +1,268 @@
+"""
+API Benchmark | API 效能測試
+Measures latency and throughput of the main routes under concurrency,
+against the fake Telegram backend in benchmarks.fake_telegram.
+在並行負載下，以 benchmarks.fake_telegram 模擬後端測量主要路由的延遲與吞吐量。
+
+Results can be saved as a baseline and later runs compared against it.
+結果可儲存為基準，之後的執行可與其比較。
+
+Usage | 用法:
+    python -m benchmarks.bench_api [--concurrency 16] [--requests 200]
+    python -m benchmarks.bench_api --save benchmarks/baseline.json
+    python -m benchmarks.bench_api --compare benchmarks/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Optional
+
+import httpx
+
+from app import main as app_main
+from app.rpc_scheduler import RpcScheduler
+from app.sender_index import SenderIndex
+from app.session_pool import DEFAULT_KEY
+from app.telegram_service import TelegramService
+
+from .fake_telegram import FakeTelegramClient, FakeTelegramOptions, chat_id
+
+
+class FakeTelegramService(TelegramService):
+    """TelegramService backed by FakeTelegramClient | 以 FakeTelegramClient 為後端的 TelegramService"""
+
+    def __init__(self, options: FakeTelegramOptions, **kwargs):
+        super().__init__(**kwargs)
+        self.options = options
+
+    def _create_client(self) -> FakeTelegramClient:
+        return FakeTelegramClient(self.options, scheduler=self._scheduler)
+
+
+def install_service(options: FakeTelegramOptions, rpc_rate: float, workdir: str) -> None:
+    """
+    Make the app's session pool build fake services.
+    讓應用程式的 session 池建立模擬服務。
+    """
+    def factory(key: str, api_id: int, api_hash: str) -> TelegramService:
+        scheduler = (
+            RpcScheduler(rate=rpc_rate, burst=max(1, int(rpc_rate * 2)))
+            if rpc_rate > 0 else
+            # Unpaced, so route code rather than pacing is measured | 不控速，以測量路由程式碼而非控速
+            RpcScheduler(rate=1e9, burst=10**9)
+        )
+        return FakeTelegramService(
+            options,
+            api_id=api_id,
+            api_hash=api_hash,
+            session_name=os.path.join(workdir, key),
+            sender_index=SenderIndex(os.path.join(workdir, f"{key}.senders.db")),
+            rpc_scheduler=scheduler
+        )
+
+    app_main.session_pool.factory = factory
+    app_main.session_pool.register(DEFAULT_KEY, 1, "benchmark")
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    requests: list[tuple[str, str, Optional[dict]]],
+    concurrency: int
+) -> dict:
+    """
+    Send requests with a fixed number of workers and summarize latencies.
+    以固定數量的工作者送出請求並彙整延遲。
+
+    Args:
+        client: ASGI client | ASGI 客戶端
+        requests: (method, url, json body) tuples | （方法, URL, JSON 內容）組
+        concurrency: Concurrent workers | 並行工作者數
+
+    Returns:
+        Latency percentiles (ms), throughput and RPC count | 延遲百分位（毫秒）、吞吐量與 RPC 次數
+    """
+    service = await app_main.session_pool.get(DEFAULT_KEY)
+    rpc_before = service._scheduler.calls
+    pending = iter(requests)
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for method, url, body in pending:
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "rpc_calls": service._scheduler.calls - rpc_before,
+    }
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values | 已排序值的最近秩百分位"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_benchmarks(args: argparse.Namespace) -> dict:
+    """
+    Run every scenario in order.
+    依序執行所有情境。
+    """
+    options = FakeTelegramOptions(
+        dialogs=args.dialogs,
+        messages_per_chat=args.messages,
+        senders_per_chat=args.senders,
+        latency=args.latency,
+        flood_every=args.flood_every,
+        flood_seconds=args.flood_seconds
+    )
+
+    with tempfile.TemporaryDirectory() as workdir:
+        install_service(options, args.rpc_rate, workdir)
+        transport = httpx.ASGITransport(app=app_main.app)
+        results = {}
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            n, c = args.requests, args.concurrency
+            chats = [chat_id(i) for i in range(min(n, args.dialogs))]
+            messages = [("GET", f"/api/dialogs/{chat}/messages?limit={args.limit}", None) for chat in chats]
+
+            scenarios = [
+                # Concurrent refreshes share one fetch | 並行刷新共用一次取得
+                ("dialogs_refresh", [("GET", "/api/dialogs?refresh=true", None)] * n),
+                ("dialogs_cached", [("GET", "/api/dialogs", None)] * n),
+                # First scan of each chat, then the indexed path | 每個聊天的首次掃描，之後走索引路徑
+                ("messages_cold", messages),
+                ("messages_indexed", messages),
+                ("generate_config", [("POST", "/api/generate-config", _config_body(args))] * n),
+            ]
+
+            for name, requests in scenarios:
+                results[name] = await run_scenario(client, requests, c)
+                _print_row(name, results[name])
+
+        await app_main.session_pool.close()
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(terse=True),
+        },
+        "options": {
+            **asdict(options),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "limit": args.limit,
+            "rpc_rate": args.rpc_rate,
+            "config_senders": args.config_senders,
+        },
+        "results": results,
+    }
+
+
+def _config_body(args: argparse.Namespace) -> dict:
+    """Build a generate-config request | 建立 generate-config 請求"""
+    chats = [{"id": chat_id(i), "name": f"Benchmark Group {i}"} for i in range(args.dialogs)]
+    senders = [
+        {"id": 1_000_000 + i, "name": f"User {i}", "chat_id": chats[i % len(chats)]["id"]}
+        for i in range(args.config_senders)
+    ]
+    return {"chats": chats, "senders": senders}
+
+
+def _print_row(name: str, result: dict) -> None:
+    """Print one scenario result | 輸出單一情境結果"""
+    print(
+        f"{name:18s} p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+        f"p99 {result['p99_ms']:8.2f} ms  {result['throughput_rps']:8.1f} req/s  "
+        f"rpc {result['rpc_calls']:5d}  errors {result['errors']}"
+    )
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Compare a run with a baseline, printing relative changes.
+    將執行結果與基準比較並輸出相對變化。
+
+    Returns:
+        False if any scenario regressed beyond tolerance | 任一情境退步超過容許值時為 False
+    """
+    if report["options"] != baseline["options"]:
+        print("warning: options differ from the baseline | 警告：選項與基準不同")
+
+    ok = True
+    print(f"\n{'scenario':18s} {'p50':>9s} {'p95':>9s} {'req/s':>9s}")
+    for name, result in report["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        p50 = result["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        p95 = result["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rps = result["throughput_rps"] / base["throughput_rps"] - 1 if base["throughput_rps"] else 0.0
+        # Tail latency is too noisy to gate on | 尾端延遲雜訊過大，不作為判定依據
+        regressed = p50 > tolerance or rps < -tolerance
+        ok = ok and not regressed
+        print(f"{name:18s} {p50:+9.1%} {p95:+9.1%} {rps:+9.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dialogs", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=2000, help="Messages per chat")
+    parser.add_argument("--senders", type=int, default=200, help="Distinct senders per chat")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per simulated RPC")
+    parser.add_argument("--flood-every", type=int, default=0, help="Inject FloodWait every N RPCs")
+    parser.add_argument("--flood-seconds", type=int, default=1)
+    parser.add_argument("--rpc-rate", type=float, default=0, help="Scheduler rate (0 = unpaced)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--limit", type=int, default=500, help="Messages per /messages request")
+    parser.add_argument("--config-senders", type=int, default=5000)
+    parser.add_argument("--save", metavar="PATH", help="Write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Compare with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed p50/throughput regression ratio")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmarks(args))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
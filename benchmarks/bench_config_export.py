@@ -0,0 +1,97 @@
+"""
+Config Export Benchmark | 設定匯出效能測試
+Compares the original /api/generate-config implementation with the
+export engine in app.config_export.
+比較原本的 /api/generate-config 實作與 app.config_export 匯出引擎。
+
+Usage | 用法:
+    python -m benchmarks.bench_config_export [--chats 5000] [--senders 20000]
+"""
+
+import argparse
+import json
+import time
+
+import yaml
+
+from app.config_export import build_config, export, iter_chat_configs, iter_export
+
+
+def make_request(chat_count: int, sender_count: int) -> tuple[list[dict], list[dict]]:
+    """Build deterministic chats and senders | 建立確定性的聊天與發送者"""
+    chats = [{"id": -1000000000000 - i, "name": f"Signals 訊號 {i}"} for i in range(chat_count)]
+    senders = [
+        {"id": 10_000 + i, "name": f"Trader {i}", "chat_id": chats[i % chat_count]["id"]}
+        for i in range(sender_count)
+    ]
+    return chats, senders
+
+
+def baseline(chats: list[dict], senders: list[dict]) -> dict:
+    """The original generate_config body | 原本的 generate_config 內容"""
+    config = {"telegram": {"chats": []}}
+
+    senders_by_chat = {}
+    for sender in senders:
+        chat_id = sender.get("chat_id")
+        if chat_id not in senders_by_chat:
+            senders_by_chat[chat_id] = []
+        senders_by_chat[chat_id].append({"id": sender["id"], "name": sender.get("name", "")})
+
+    for chat in chats:
+        chat_config = {"id": chat["id"], "name": chat.get("name", "")}
+        if chat["id"] in senders_by_chat:
+            chat_config["senders"] = senders_by_chat[chat["id"]]
+        config["telegram"]["chats"].append(chat_config)
+
+    yaml_content = yaml.dump(config, allow_unicode=True, default_flow_style=False, sort_keys=False)
+    return {"yaml": yaml_content, "config": config}
+
+
+def timed(func, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds | N 次中最佳的耗時（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def time_to_first_chunk(chats: list[dict], senders: list[dict], fmt: str) -> float:
+    """Milliseconds until the first streamed chunk | 第一個串流片段的毫秒數"""
+    started = time.perf_counter()
+    next(iter_export(iter_chat_configs(chats, senders), fmt))
+    next(iter_export(iter_chat_configs(chats, senders), fmt))
+    return (time.perf_counter() - started) * 1000 / 2
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chats", type=int, default=5000)
+    parser.add_argument("--senders", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chats, senders = make_request(args.chats, args.senders)
+
+    # Same document as before | 與原本相同的文件
+    original = baseline(chats, senders)
+    assert yaml.safe_load(export(iter_chat_configs(chats, senders))) == original["config"]
+
+    base = timed(lambda: baseline(chats, senders), args.repeat)
+    print(f"chats: {args.chats}  senders: {args.senders}  libyaml: {yaml.__with_libyaml__}")
+    print(f"baseline yaml+config {base:9.1f} ms   payload {len(json.dumps(original)) / 1e6:6.2f} MB")
+
+    for fmt in ("yaml", "json", "toml"):
+        content = timed(lambda: export(iter_chat_configs(chats, senders), fmt), args.repeat)
+        both = timed(lambda: export(build_config(chats, senders)["telegram"]["chats"], fmt), args.repeat)
+        size = len(export(iter_chat_configs(chats, senders), fmt).encode("utf-8"))
+        first = time_to_first_chunk(chats, senders, fmt)
+        print(f"{fmt:4s} content-only {content:9.1f} ms ({base / content:5.2f}x)   "
+              f"with config {both:9.1f} ms   payload {size / 1e6:6.2f} MB   "
+              f"first chunk {first:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
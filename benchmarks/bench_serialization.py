@@ -0,0 +1,132 @@
+"""
+Serialization Benchmark | 序列化效能測試
+Compares the former asdict + jsonable_encoder response path with the
+fast serialization path, and slotted vs plain dataclass memory.
+比較原本的 asdict + jsonable_encoder 回應路徑與快速序列化路徑，以及 slots 與一般 dataclass 的記憶體用量。
+
+Usage | 用法:
+    python -m benchmarks.bench_serialization [--count 50000]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models import DialogInfo, DialogType, SenderInfo
+from app.serialization import dialog_to_dict, sender_to_dict, json_bytes
+
+
+@dataclass
+class PlainDialogInfo:
+    """DialogInfo without __slots__, as before | 不含 __slots__ 的 DialogInfo（原本的版本）"""
+    id: int
+    name: str
+    dialog_type: DialogType
+    username: Optional[str] = None
+    members_count: Optional[int] = None
+
+
+def make_dialogs(cls, count: int) -> list:
+    """Build deterministic dialogs | 建立確定性的對話資料"""
+    return [
+        cls(
+            id=-1000000000000 - i,
+            name=f"Group 群組 {i}",
+            dialog_type=DialogType.GROUP if i % 3 else DialogType.CHANNEL,
+            username=f"group_{i}" if i % 2 else None,
+            members_count=i * 7
+        )
+        for i in range(count)
+    ]
+
+
+def make_senders(count: int) -> list[SenderInfo]:
+    """Build deterministic senders | 建立確定性的發送者資料"""
+    return [
+        SenderInfo(id=10_000 + i, name=f"User 用戶 {i}", username=f"user_{i}", is_bot=i % 50 == 0)
+        for i in range(count)
+    ]
+
+
+# Only set by activity scans and omitted otherwise, as sender_to_dict does
+# 僅由活動掃描設定，否則省略，與 sender_to_dict 相同
+ACTIVITY_FIELDS = ("message_count", "first_seen", "last_seen")
+
+
+def as_response_dict(item) -> dict:
+    """asdict without unset activity fields | 不含未設定活動欄位的 asdict"""
+    data = asdict(item)
+    if data.get("message_count", 0) is None:
+        for field in ACTIVITY_FIELDS:
+            del data[field]
+    return data
+
+
+def baseline_path(key: str, items: list) -> bytes:
+    """asdict -> dict -> jsonable_encoder -> json (FastAPI JSONResponse) | 原本路徑"""
+    content = jsonable_encoder({key: [as_response_dict(item) for item in items]})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(key: str, items: list, to_dict) -> bytes:
+    """Hand-written dicts straight to bytes | 手寫字典直接轉為 bytes"""
+    return json_bytes({key: [to_dict(item) for item in items]})
+
+
+def timed(func, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds | N 次中最佳的耗時（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def measure_memory(factory) -> int:
+    """Bytes allocated while building objects | 建立物件時配置的位元組數"""
+    tracemalloc.start()
+    objects = factory()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    dialogs = make_dialogs(DialogInfo, args.count)
+    senders = make_senders(args.count)
+
+    # Both paths must produce the same JSON | 兩種路徑必須產生相同 JSON
+    assert json.loads(baseline_path("dialogs", dialogs)) == \
+        json.loads(fast_path("dialogs", dialogs, dialog_to_dict))
+    assert json.loads(baseline_path("senders", senders)) == \
+        json.loads(fast_path("senders", senders, sender_to_dict))
+
+    print(f"items: {args.count}")
+    for key, items, to_dict in (
+        ("dialogs", dialogs, dialog_to_dict),
+        ("senders", senders, sender_to_dict),
+    ):
+        base = timed(lambda: baseline_path(key, items), args.repeat)
+        fast = timed(lambda: fast_path(key, items, to_dict), args.repeat)
+        print(f"{key:8s} baseline {base:8.1f} ms   fast {fast:8.1f} ms   speedup {base / fast:5.2f}x")
+
+    plain = measure_memory(lambda: make_dialogs(PlainDialogInfo, args.count))
+    slotted = measure_memory(lambda: make_dialogs(DialogInfo, args.count))
+    print(f"memory   plain {plain / 1e6:8.2f} MB   slots {slotted / 1e6:8.2f} MB   "
+          f"saved {(1 - slotted / plain) * 100:4.1f}%")
+
+
+if __name__ == "__main__":
+    main()
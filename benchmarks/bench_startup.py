@@ -0,0 +1,115 @@
+"""
+Startup Benchmark | 啟動效能測試
+Measures cold-start time: importing the application in a fresh interpreter,
+and the time until the server accepts requests and until /readyz succeeds,
+with a blocking and a background connect against the fake Telegram backend.
+測量冷啟動時間：於新的直譯器中匯入應用程式，以及在模擬 Telegram 後端下，
+阻塞式與背景連線各自至伺服器接受請求、至 /readyz 成功所需的時間。
+
+Usage | 用法:
+    python -m benchmarks.bench_startup [--runs 5] [--latency 0.2]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from app import main as app_main
+
+from .bench_api import install_service
+from .fake_telegram import FakeTelegramOptions
+
+
+# Run in a fresh interpreter; prints import seconds and lazily loaded modules
+# 於新的直譯器中執行；輸出匯入秒數與延遲載入的模組
+_IMPORT_PROBE = (
+    "import sys, time; started = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - started, "
+    "*(name for name in ('yaml', 'jinja2') if name in sys.modules))"
+)
+
+
+def measure_import(runs: int) -> tuple[float, list[str]]:
+    """
+    Median seconds to import app.main in a new process.
+    於新程序中匯入 app.main 的中位數秒數。
+
+    Returns:
+        Seconds and optional modules that were loaded eagerly | 秒數與被提前載入的選用模組
+    """
+    samples = []
+    eager: list[str] = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE],
+            check=True,
+            capture_output=True,
+            text=True
+        ).stdout.split()
+        samples.append(float(output[0]))
+        eager = output[1:]
+    return statistics.median(samples), eager
+
+
+async def measure_lifespan(background: bool, options: FakeTelegramOptions, workdir: str) -> tuple[float, float]:
+    """
+    Run the app lifespan and time serving and readiness.
+    執行應用程式生命週期並計時開始服務與就緒。
+
+    Returns:
+        Seconds until serving and until /readyz returned 200 | 至開始服務與至 /readyz 回傳 200 的秒數
+    """
+    os.environ["TELEGRAM_BACKGROUND_CONNECT"] = "true" if background else "false"
+    app_main.startup = app_main.StartupState()
+    install_service(options, rpc_rate=0, workdir=workdir)
+
+    transport = httpx.ASGITransport(app=app_main.app)
+    started = time.perf_counter()
+    async with app_main.lifespan(app_main.app):
+        serving = time.perf_counter() - started
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            while (await client.get("/readyz")).status_code != 200:
+                await asyncio.sleep(0.001)
+        ready = time.perf_counter() - started
+    return serving, ready
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Run every measurement and print a table | 執行所有測量並輸出表格"""
+    seconds, eager = measure_import(args.runs)
+    print(f"import app.main        {seconds * 1000:8.1f} ms  (median of {args.runs} processes)")
+    print(f"eager optional modules {', '.join(eager) or 'none'}")
+
+    # Three RPCs: connect, auth check, get_me | 三次 RPC：連線、認證檢查、get_me
+    options = FakeTelegramOptions(latency=args.latency)
+    os.environ.setdefault("TELEGRAM_API_ID", "1")
+    os.environ.setdefault("TELEGRAM_API_HASH", "benchmark")
+    os.environ["TELEGRAM_WARMUP"] = "false"
+
+    print(f"\nconnect latency {args.latency * 3 * 1000:.0f} ms (3 RPCs)")
+    print(f"{'mode':<12}{'serving ms':>12}{'ready ms':>12}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for background in (False, True):
+            serving, ready = zip(*[
+                await measure_lifespan(background, options, workdir) for _ in range(args.runs)
+            ])
+            mode = "background" if background else "blocking"
+            print(f"{mode:<12}{statistics.median(serving) * 1000:12.1f}{statistics.median(ready) * 1000:12.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Startup benchmark | 啟動效能測試")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions per measurement | 每項測量的重複次數")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated RPC latency in seconds | 模擬 RPC 延遲（秒）")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
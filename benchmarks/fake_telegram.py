@@ -0,0 +1,304 @@
+"""
+Fake Telegram Backend | 模擬 Telegram 後端
+Deterministic local stand-in for TelegramClient used by the benchmarks.
+效能測試使用的確定性本機 TelegramClient 替代品。
+
+Dialogs, messages and senders are generated from their indexes, so every
+run sees the same data. High-level helpers page through results the way
+Telethon does (100 items per request); each page is one simulated RPC that
+goes through the RpcScheduler, sleeps for the configured latency and may
+raise an injected FloodWaitError.
+對話、訊息與發送者皆由索引產生，每次執行資料相同。高階方法如 Telethon 般分頁
+（每次請求 100 筆）；每頁為一次經過 RpcScheduler 的模擬 RPC，會依設定延遲並可能拋出注入的 FloodWaitError。
+"""
+
+import math
+import time
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Optional
+
+from telethon import utils
+from telethon.errors import FloodWaitError, UsernameNotOccupiedError
+from telethon.sessions import MemorySession
+from telethon.tl.functions.channels import GetChannelsRequest
+from telethon.tl.functions.contacts import ResolveUsernameRequest
+from telethon.tl.functions.messages import GetChatsRequest
+from telethon.tl.functions.users import GetUsersRequest
+from telethon.tl.types import Channel, InputPeerChannel, User
+from telethon.tl.types.contacts import ResolvedPeer
+from telethon.tl.types.messages import Chats
+
+from app import metrics
+from app.rpc_scheduler import RpcScheduler
+
+
+# Items returned per simulated request, as in Telethon | 每次模擬請求回傳的項目數（同 Telethon）
+PAGE_SIZE = 100
+
+# First generated user ID | 產生的第一個用戶 ID
+_USER_ID_BASE = 1_000_000
+
+# Channel ID of dialog index 0 | 對話索引 0 的頻道 ID
+_CHANNEL_ID_BASE = 1_000
+
+# Last activity of dialog index 0; later indexes are older | 對話索引 0 的最後活動，之後的索引較舊
+_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class FakeTelegramOptions:
+    """Shape of the simulated account | 模擬帳號的規模"""
+    dialogs: int = 500
+    messages_per_chat: int = 2000
+    senders_per_chat: int = 200
+    latency: float = 0.02
+    # Raise FloodWait on every Nth RPC (0 = never) | 每第 N 次 RPC 拋出 FloodWait（0 為不拋出）
+    flood_every: int = 0
+    flood_seconds: int = 1
+
+
+class FakeTelegramClient:
+    """
+    TelegramClient stand-in implementing the calls TelegramService makes.
+    實作 TelegramService 所用呼叫的 TelegramClient 替代品。
+    """
+
+    def __init__(self, options: FakeTelegramOptions, scheduler: Optional[RpcScheduler] = None):
+        """
+        Initialize the fake client.
+        初始化模擬客戶端。
+
+        Args:
+            options: Simulated account shape | 模擬帳號規模
+            scheduler: Scheduler RPCs go through, as in ScheduledTelegramClient
+                       | RPC 經過的排程器（同 ScheduledTelegramClient）
+        """
+        self.options = options
+        self.scheduler = scheduler
+        self.rpc_calls: dict[str, int] = {}
+        self._rpc_count = 0
+        self._connected = False
+        # Entities from raw requests, as Telethon stores them | 原始請求的實體，如 Telethon 般儲存
+        self.session = MemorySession()
+
+    # ==================== Connection | 連線 ====================
+
+    async def connect(self) -> None:
+        await self._rpc("connect")
+        self._connected = True
+
+    async def disconnect(self) -> None:
+        self._connected = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def add_event_handler(self, callback, event=None) -> None:
+        # No updates are simulated | 不模擬更新事件
+        pass
+
+    async def is_user_authorized(self) -> bool:
+        await self._rpc("updates.getState")
+        return True
+
+    async def get_me(self) -> User:
+        await self._rpc("users.getUsers")
+        return User(id=1, first_name="Benchmark", username="benchmark")
+
+    # ==================== Data | 資料 ====================
+
+    async def iter_dialogs(self, limit: Optional[int] = None, offset_peer=None, **kwargs):
+        """
+        Yield dialogs after offset_peer, one page per RPC.
+        逐一產出 offset_peer 之後的對話，每頁一次 RPC。
+        """
+        first = 0
+        if isinstance(offset_peer, InputPeerChannel):
+            first = offset_peer.channel_id - _CHANNEL_ID_BASE + 1
+        last = self.options.dialogs if limit is None else min(first + limit, self.options.dialogs)
+        for start in range(first, last, PAGE_SIZE):
+            await self._rpc("messages.getDialogs")
+            for index in range(start, min(start + PAGE_SIZE, last)):
+                entity = self._channel(index)
+                date = _EPOCH - timedelta(minutes=index)
+                yield SimpleNamespace(
+                    id=chat_id(index),
+                    name=entity.title,
+                    entity=entity,
+                    input_entity=InputPeerChannel(entity.id, entity.access_hash),
+                    date=date,
+                    message=SimpleNamespace(id=self.options.messages_per_chat, date=date)
+                )
+
+    async def iter_messages(
+        self,
+        entity,
+        limit: Optional[int] = None,
+        min_id: int = 0,
+        offset_id: int = 0,
+        offset_date: Optional[datetime] = None,
+        **kwargs
+    ):
+        """
+        Yield messages newest first, honouring min_id, offset_id and offset_date.
+        由新到舊產出訊息，並遵循 min_id、offset_id 與 offset_date。
+
+        Messages are one minute apart, the newest at the dialog's last activity.
+        訊息間隔一分鐘，最新一則位於對話的最後活動時間。
+        """
+        index = chat_index(entity)
+        newest = self.options.messages_per_chat
+        top = offset_id - 1 if offset_id else newest
+        if offset_date is not None:
+            # Only messages strictly older than offset_date | 只取嚴格早於 offset_date 的訊息
+            minutes = (_EPOCH - timedelta(minutes=index) - offset_date) / timedelta(minutes=1)
+            top = min(top, math.ceil(newest - minutes) - 1)
+        ids = range(top, min_id, -1)
+        if limit is not None:
+            ids = ids[:limit]
+
+        for start in range(0, len(ids), PAGE_SIZE):
+            await self._rpc("messages.getHistory")
+            for message_id in ids[start:start + PAGE_SIZE]:
+                sender = self._user(index, message_id)
+                date = _EPOCH - timedelta(minutes=index + newest - message_id)
+                yield SimpleNamespace(id=message_id, sender_id=sender.id, sender=sender, date=date)
+
+    async def iter_participants(self, entity, limit: Optional[int] = None, search: str = "", filter=None):
+        """Yield the chat's senders as members | 將聊天的發送者作為成員產出"""
+        index = chat_index(entity)
+        total = self.options.senders_per_chat if limit is None else min(limit, self.options.senders_per_chat)
+        for start in range(0, total, PAGE_SIZE):
+            await self._rpc("channels.getParticipants")
+            for slot in range(start, min(start + PAGE_SIZE, total)):
+                user = self._user_at(index, slot)
+                user.participant = None
+                if search and search.lower() not in user.first_name.lower():
+                    continue
+                yield user
+
+    async def get_entity(self, entity):
+        await self._rpc("channels.getChannels")
+        return self._channel(chat_index(entity))
+
+    async def __call__(self, request):
+        """
+        Answer the raw requests used to resolve peers.
+        回應解析對象所用的原始請求。
+        """
+        if isinstance(request, ResolveUsernameRequest):
+            await self._rpc("contacts.resolveUsername")
+            entity = self._find_username(request.username)
+            if entity is None:
+                raise UsernameNotOccupiedError(request=request)
+            is_user = isinstance(entity, User)
+            result = ResolvedPeer(
+                peer=utils.get_peer(entity),
+                chats=[] if is_user else [entity],
+                users=[entity] if is_user else []
+            )
+        elif isinstance(request, GetUsersRequest):
+            await self._rpc("users.getUsers")
+            result = [self._user_by_id(peer.user_id) for peer in request.id]
+        elif isinstance(request, GetChannelsRequest):
+            await self._rpc("channels.getChannels")
+            result = Chats(chats=[self._channel(peer.channel_id - _CHANNEL_ID_BASE) for peer in request.id])
+        elif isinstance(request, GetChatsRequest):
+            # No basic groups are simulated | 不模擬基本群組
+            await self._rpc("messages.getChats")
+            result = Chats(chats=[])
+        else:
+            raise NotImplementedError(type(request).__name__)
+
+        self.session.process_entities(result)
+        return result
+
+    # ==================== Helpers | 輔助方法 ====================
+
+    def _channel(self, index: int) -> Channel:
+        """Build the supergroup for a dialog index | 建立對話索引對應的超級群組"""
+        return Channel(
+            id=_CHANNEL_ID_BASE + index,
+            title=f"Benchmark Group {index}",
+            access_hash=index,
+            photo=None,
+            date=None,
+            megagroup=True,
+            username=f"bench_{index}" if index % 2 else None,
+            participants_count=self.options.senders_per_chat
+        )
+
+    def _user(self, index: int, message_id: int) -> User:
+        """Build the sender of a message | 建立訊息的發送者"""
+        # Spread messages over the chat's senders | 將訊息分散至聊天的發送者
+        return self._user_at(index, (message_id * 7919) % self.options.senders_per_chat)
+
+    def _user_at(self, index: int, slot: int) -> User:
+        """Build the Nth sender of a chat | 建立聊天的第 N 個發送者"""
+        user_id = _USER_ID_BASE + index * self.options.senders_per_chat + slot
+        return User(
+            id=user_id,
+            access_hash=user_id,
+            first_name=f"User {user_id}",
+            username=f"user_{user_id}",
+            bot=slot % 50 == 0
+        )
+
+    def _user_by_id(self, user_id: int) -> User:
+        """Build a sender from its user ID | 由用戶 ID 建立發送者"""
+        return self._user_at(*divmod(user_id - _USER_ID_BASE, self.options.senders_per_chat))
+
+    def _find_username(self, username: str):
+        """Entity owning a generated username, or None | 擁有產生之用戶名的實體，無則為 None"""
+        kind, _, number = username.lower().rpartition("_")
+        if not number.isdigit():
+            return None
+        if kind == "bench" and int(number) % 2 and int(number) < self.options.dialogs:
+            return self._channel(int(number))
+        users = self.options.dialogs * self.options.senders_per_chat
+        if kind == "user" and 0 <= int(number) - _USER_ID_BASE < users:
+            return self._user_by_id(int(number))
+        return None
+
+    async def _rpc(self, method: str) -> None:
+        """
+        Run one simulated request, recorded like ScheduledTelegramClient does.
+        執行一次模擬請求，並如 ScheduledTelegramClient 般記錄。
+        """
+        started = time.perf_counter()
+        error = None
+        try:
+            if self.scheduler is not None:
+                await self.scheduler.call(self._invoke, method)
+            else:
+                await self._invoke(method)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            metrics.observe_rpc(method, time.perf_counter() - started, error)
+
+    async def _invoke(self, method: str) -> None:
+        """Count, inject FloodWait and sleep | 計數、注入 FloodWait 並延遲"""
+        self._rpc_count += 1
+        self.rpc_calls[method] = self.rpc_calls.get(method, 0) + 1
+
+        every = self.options.flood_every
+        if every and self._rpc_count % every == 0:
+            raise FloodWaitError(request=None, capture=self.options.flood_seconds)
+
+        if self.options.latency > 0:
+            await asyncio.sleep(self.options.latency)
+
+
+def chat_id(index: int) -> int:
+    """Marked peer ID of a dialog index | 對話索引的標記 peer ID"""
+    return -1_000_000_001_000 - index
+
+
+def chat_index(peer) -> int:
+    """Dialog index of a marked peer ID | 標記 peer ID 的對話索引"""
+    return -1_000_000_001_000 - int(peer)
@@ -0,0 +1,148 @@
+"""
+Test Fixtures | 測試夾具
+Shared fixtures for the test suite, built on the fake Telegram backend.
+測試套件共用的夾具，以模擬 Telegram 後端為基礎。
+
+Run from the repository root | 於專案根目錄執行:
+    pytest
+"""
+
+import os
+import sys
+import contextlib
+from typing import AsyncIterator
+
+import httpx
+import pytest
+
+# Make app and benchmarks importable when pytest is run from anywhere
+# 使 pytest 不論從何處執行皆可匯入 app 與 benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import main as app_main
+from app.rpc_scheduler import RpcScheduler
+from app.sender_index import SenderIndex
+from benchmarks.bench_api import FakeTelegramService, install_service
+from benchmarks.fake_telegram import FakeTelegramOptions
+
+
+# ============================================================================
+# Services | 服務
+# ============================================================================
+
+@pytest.fixture
+def make_service(tmp_path):
+    """
+    Build unstarted fake services in a temporary directory.
+    於暫存目錄中建立尚未啟動的模擬服務。
+
+    Scans are unpaced and have no latency unless asked for, so tests
+    exercise scan logic rather than timing.
+    除非另行指定，掃描不控速且無延遲，使測試著重於掃描邏輯而非時間。
+    """
+    def make(index: bool = True, name: str = "test", **options) -> FakeTelegramService:
+        options.setdefault("latency", 0.0)
+        options.setdefault("dialogs", 5)
+        options.setdefault("messages_per_chat", 300)
+        options.setdefault("senders_per_chat", 30)
+        return FakeTelegramService(
+            FakeTelegramOptions(**options),
+            api_id=1,
+            api_hash="test",
+            session_name=str(tmp_path / name),
+            sender_index=SenderIndex(str(tmp_path / f"{name}.senders.db")) if index else None,
+            rpc_scheduler=RpcScheduler(rate=1e9, burst=10**9)
+        )
+
+    return make
+
+
+@pytest.fixture
+def count_scans():
+    """
+    Count message history walks of a started fake service.
+    計算已啟動模擬服務的訊息歷史走訪次數。
+
+    Returns a function that patches a service and returns a one-item list
+    holding the running count.
+    回傳一個函式，修補服務並回傳保存目前次數的單一項目列表。
+    """
+    def patch(service: FakeTelegramService) -> list[int]:
+        calls = [0]
+        original = service._client.iter_messages
+
+        def counting(*args, **kwargs):
+            calls[0] += 1
+            return original(*args, **kwargs)
+
+        service._client.iter_messages = counting
+        return calls
+
+    return patch
+
+
+@pytest.fixture
+def fail_scans():
+    """
+    Make message history walks of a started fake service fail part way.
+    使已啟動模擬服務的訊息歷史走訪中途失敗。
+
+    Returns a function that patches a service so each walk raises after
+    `after` messages, and returns a dict whose "on" key switches it off.
+    回傳一個函式，修補服務使每次走訪在 after 則訊息後拋出錯誤，並回傳以 "on" 鍵關閉的字典。
+    """
+    def patch(service: FakeTelegramService, after: int = 40) -> dict:
+        state = {"on": True}
+        original = service._client.iter_messages
+
+        async def failing(*args, **kwargs):
+            seen = 0
+            async for message in original(*args, **kwargs):
+                seen += 1
+                if seen > after and state["on"]:
+                    raise RuntimeError("connection lost")
+                yield message
+
+        service._client.iter_messages = failing
+        return state
+
+    return patch
+
+
+# ============================================================================
+# API | API
+# ============================================================================
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """
+    Serve the app from fake services through an in-process client.
+    經由程序內客戶端以模擬服務提供應用程式。
+
+    Returns an async context manager; use it inside asyncio.run(). The pool
+    is closed on exit, so every test starts from fresh services.
+    回傳非同步情境管理器，請於 asyncio.run() 中使用。離開時關閉池，使每個測試皆從新服務開始。
+    """
+    monkeypatch.setattr(app_main, "SNAPSHOT_PATH", str(tmp_path / "snapshot.jsonl"))
+    pool = app_main.session_pool
+
+    @contextlib.asynccontextmanager
+    async def connect(**options) -> AsyncIterator[httpx.AsyncClient]:
+        options.setdefault("latency", 0.0)
+        options.setdefault("dialogs", 20)
+        options.setdefault("messages_per_chat", 300)
+        options.setdefault("senders_per_chat", 30)
+        install_service(FakeTelegramOptions(**options), 0, str(tmp_path))
+        transport = httpx.ASGITransport(app=app_main.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                yield client
+        finally:
+            await pool.close()
+
+    yield connect
+
+    # Loop-bound state from this test's event loop | 本測試事件迴圈所綁定的狀態
+    pool._locks.clear()
+    pool._leases.clear()
+    pool._credentials.clear()
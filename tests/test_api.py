@@ -0,0 +1,153 @@
+"""
+HTTP API tests on the fake backend | 以模擬後端進行的 HTTP API 測試
+"""
+
+import asyncio
+import tomllib
+
+import yaml
+
+from app import main as app_main
+from app.session_pool import DEFAULT_KEY
+from app.snapshot import SnapshotReader
+from benchmarks.fake_telegram import chat_id
+
+
+CHAT = chat_id(1)
+MESSAGES = f"/api/dialogs/{CHAT}/messages"
+
+
+def _history_rpcs(service) -> int:
+    return service._client.rpc_calls.get("messages.getHistory", 0)
+
+
+# ==================== Validators | 驗證器 ====================
+
+def test_dialogs_answer_conditional_requests(api):
+    """An unchanged dialog list is answered with 304 | 未變更的對話列表回應 304"""
+    async def run():
+        async with api() as client:
+            first = await client.get("/api/dialogs")
+            etag = first.headers["etag"]
+            again = await client.get("/api/dialogs", headers={"If-None-Match": etag})
+            stream = await client.get("/api/dialogs/stream", headers={"If-None-Match": etag})
+            return first, again, stream
+
+    first, again, stream = asyncio.run(run())
+    assert first.status_code == 200 and len(first.json()["dialogs"]) == 20
+    assert again.status_code == 304
+    assert stream.status_code == 304
+
+
+def test_messages_answer_conditional_requests(api):
+    """Indexed scans carry validators | 已索引的掃描帶有驗證器"""
+    async def run():
+        async with api() as client:
+            first = await client.get(MESSAGES, params={"limit": 200})
+            etag = first.headers["etag"]
+            again = await client.get(MESSAGES, params={"limit": 200}, headers={"If-None-Match": etag})
+            since = await client.get(
+                MESSAGES,
+                params={"limit": 200},
+                headers={"If-Modified-Since": first.headers["last-modified"]}
+            )
+            stopped = await client.get(MESSAGES, params={"limit": 200, "max_senders": 3})
+            return first, again, since, stopped
+
+    first, again, since, stopped = asyncio.run(run())
+    assert first.status_code == 200 and len(first.json()["senders"]) == 30
+    assert again.status_code == 304 and since.status_code == 304
+    # Early-stopping scans are not versioned | 提前停止的掃描沒有版本
+    assert stopped.status_code == 200 and "etag" not in stopped.headers
+    assert len(stopped.json()["senders"]) == 3
+
+
+def test_failed_scan_is_sent_without_validators(api, fail_scans):
+    """Without the index, a failed scan runs once and carries no ETag | 無索引時，失敗的掃描只執行一次且不帶 ETag"""
+    async def run():
+        async with api() as client:
+            service = await app_main.session_pool.get(DEFAULT_KEY)
+            service._sender_index = None
+            fail_scans(service)
+            before = _history_rpcs(service)
+            response = await client.get(MESSAGES, params={"limit": 200})
+            return response, _history_rpcs(service) - before
+
+    response, history_rpcs = asyncio.run(run())
+    assert response.status_code == 200
+    assert len(response.json()["senders"]) == 30
+    assert "etag" not in response.headers and "last-modified" not in response.headers
+    # One page read before the failure, not two scans | 失敗前讀取一頁，而非兩次掃描
+    assert history_rpcs == 1
+
+
+# ==================== Batch and snapshot | 批次與快照 ====================
+
+def test_batch_matches_single_chat_scans(api):
+    """Batch results equal /messages for each chat | 批次結果與各聊天的 /messages 相同"""
+    async def run():
+        async with api() as client:
+            chats = [chat_id(i) for i in range(4)]
+            batch = await client.post("/api/senders/batch", json={"chat_ids": chats, "limit": 150})
+            singles = [
+                (await client.get(f"/api/dialogs/{chat}/messages", params={"limit": 150})).json()
+                for chat in chats
+            ]
+            return chats, batch.json()["results"], singles
+
+    chats, results, singles = asyncio.run(run())
+    assert [result["chat_id"] for result in results] == chats
+    for result, single in zip(results, singles):
+        assert result["error"] is None
+        assert result["senders"] == single["senders"]
+
+
+def test_snapshot_only_fetches_new_messages(api):
+    """Indexed chats cost no history RPCs until new messages arrive | 已索引的聊天在有新訊息前不需歷史 RPC"""
+    async def run():
+        async with api() as client:
+            served = (await client.get(MESSAGES, params={"limit": 100})).json()
+            service = await app_main.session_pool.get(DEFAULT_KEY)
+
+            before = _history_rpcs(service)
+            first = await client.post("/api/snapshot", json={"chat_ids": [CHAT], "limit": 100})
+            unchanged = _history_rpcs(service) - before
+
+            service.options.messages_per_chat += 50
+            before = _history_rpcs(service)
+            second = await client.post("/api/snapshot", json={"chat_ids": [CHAT], "limit": 100})
+            top_up = _history_rpcs(service) - before
+            return served, first, unchanged, second, top_up
+
+    served, first, unchanged, second, top_up = asyncio.run(run())
+    assert first.status_code == 200 and first.json()["errors"] == {}
+    assert unchanged == 0
+    assert second.status_code == 200 and top_up == 1
+
+    reader = SnapshotReader(app_main.SNAPSHOT_PATH)
+    saved = [sender.id for sender in reader.senders(CHAT)]
+    assert sorted(saved) == sorted(sender["id"] for sender in served["senders"])
+
+
+# ==================== Config export | 設定匯出 ====================
+
+def test_generate_config_formats(api):
+    """Every format describes the same config | 每種格式描述相同的設定"""
+    chats = [{"id": -100, "name": "Group: one"}, {"id": -200, "name": "二"}]
+    senders = [{"id": 7, "name": "Seven", "chat_id": -100}]
+
+    async def run():
+        async with api() as client:
+            return {
+                fmt: (await client.post("/api/generate-config", json={
+                    "chats": chats, "senders": senders, "format": fmt
+                })).json()
+                for fmt in ("yaml", "json", "toml")
+            }
+
+    results = asyncio.run(run())
+    config = results["yaml"]["config"]
+    assert yaml.safe_load(results["yaml"]["yaml"]) == config
+    assert tomllib.loads(results["toml"]["toml"]) == config
+    assert results["json"]["config"] == config
+    assert config["telegram"]["chats"][0]["senders"] == [{"id": 7, "name": "Seven"}]
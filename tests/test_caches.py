@@ -0,0 +1,76 @@
+"""
+Cache tests | 快取測試
+"""
+
+from app.caches import DialogCache
+from app.models import DialogInfo, DialogType
+from app.search_index import SearchIndex
+
+
+def _dialogs() -> list[DialogInfo]:
+    return [
+        DialogInfo(1, "First", DialogType.GROUP),
+        DialogInfo(2, "Second", DialogType.CHANNEL),
+        DialogInfo(3, "Third", DialogType.USER),
+    ]
+
+
+def test_rename_leaves_handed_out_lists_alone():
+    """Lists served before a rename keep their names | 改名前交出的列表保留原名稱"""
+    cache = DialogCache()
+    cache.set(_dialogs())
+    before = cache.snapshot()
+
+    cache.rename(2, "Renamed")
+
+    assert [d.name for d in before.value] == ["First", "Second", "Third"]
+    after = cache.snapshot()
+    assert [d.name for d in after.value] == ["First", "Renamed", "Third"]
+    assert after.version == before.version + 1
+
+
+def test_rename_updates_search_index():
+    """The index follows the renamed copy | 索引跟隨改名後的副本"""
+    index = SearchIndex()
+    cache = DialogCache(search_index=index)
+    cache.set(_dialogs())
+
+    cache.rename(2, "Zebra Crossing")
+
+    assert [hit.value.name for hit in index.search("zeb")] == ["Zebra Crossing"]
+    assert index.search("second") == []
+
+
+def test_rename_to_same_name_keeps_version():
+    """No change, no new version | 未變更則不產生新版本"""
+    cache = DialogCache()
+    cache.set(_dialogs())
+    version = cache.version
+
+    cache.rename(2, "Second")
+    cache.rename(99, "Missing")
+
+    assert cache.version == version
+
+
+def test_identical_refetch_keeps_version():
+    """Re-fetching the same list keeps ETags valid | 重新取得相同列表時 ETag 仍有效"""
+    cache = DialogCache()
+    cache.set(_dialogs())
+    version = cache.version
+
+    cache.set(_dialogs())
+    assert cache.version == version
+
+    cache.set(_dialogs()[:2])
+    assert cache.version == version + 1
+
+
+def test_upsert_moves_dialog_to_front():
+    """New activity moves a dialog first | 新活動使對話移至最前"""
+    cache = DialogCache()
+    cache.set(_dialogs())
+
+    cache.upsert(DialogInfo(3, "Third", DialogType.USER))
+
+    assert [d.id for d in cache.get()] == [3, 1, 2]
@@ -0,0 +1,83 @@
+"""
+Config export tests | 設定匯出測試
+"""
+
+import json
+import tomllib
+
+import pytest
+import yaml
+
+from app.config_export import build_config, export, iter_chat_configs, iter_export
+
+
+def _config(chats: int, senders_per_chat: int = 3) -> tuple[list[dict], list[dict]]:
+    """Chats and senders with awkward names | 名稱較刁鑽的聊天與發送者"""
+    names = ["Plain", "With: colon", "多語言 名稱", "- dash", "quote ' \"", "tab\tand\nnewline", "yes", ""]
+    chat_list = [{"id": -1000 - i, "name": names[i % len(names)] + f" {i}"} for i in range(chats)]
+    sender_list = [
+        {"id": 10_000 * i + j, "name": names[(i + j) % len(names)], "chat_id": -1000 - i}
+        for i in range(0, chats, 2)
+        for j in range(senders_per_chat)
+    ]
+    return chat_list, sender_list
+
+
+@pytest.mark.parametrize("chats", [0, 1, 7, 1201])
+def test_yaml_matches_yaml_dump(chats):
+    """Streamed YAML equals one yaml.dump of the whole config | 串流 YAML 等同整份設定的 yaml.dump"""
+    chat_list, sender_list = _config(chats)
+    expected = yaml.dump(
+        build_config(chat_list, sender_list),
+        Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper),
+        allow_unicode=True,
+        default_flow_style=False,
+        sort_keys=False
+    )
+
+    assert "".join(iter_export(iter_chat_configs(chat_list, sender_list), "yaml")) == expected
+
+
+def test_long_names_wrap_like_yaml_dump():
+    """Folding happens at the same column as yaml.dump | 折行欄位與 yaml.dump 相同"""
+    chat_list = [{"id": 1, "name": " ".join(["word"] * 40)}]
+    expected = yaml.dump(build_config(chat_list, []), allow_unicode=True, sort_keys=False)
+    assert export(iter_chat_configs(chat_list, []), "yaml") == expected
+
+
+@pytest.mark.parametrize("chats", [0, 1, 7])
+def test_json_matches_json_dumps(chats):
+    """Streamed JSON equals json.dumps of the whole config | 串流 JSON 等同整份設定的 json.dumps"""
+    chat_list, sender_list = _config(chats)
+    expected = json.dumps(build_config(chat_list, sender_list), ensure_ascii=False, indent=2)
+    assert export(iter_chat_configs(chat_list, sender_list), "json") == expected
+
+
+@pytest.mark.parametrize("chats", [0, 1, 7])
+def test_toml_parses_to_the_config(chats):
+    """TOML output parses back to the same config | TOML 輸出可解析回相同設定"""
+    chat_list, sender_list = _config(chats)
+    text = export(iter_chat_configs(chat_list, sender_list), "toml")
+    assert tomllib.loads(text) == build_config(chat_list, sender_list)
+
+
+def test_toml_escapes_control_characters():
+    """DEL and other control characters stay valid TOML | DEL 與其他控制字元仍為有效 TOML"""
+    name = "del\x7f nul\x00 bell\x07 esc\x1b"
+    text = export([{"id": 1, "name": name}], "toml")
+    assert "\x7f" not in text
+    assert tomllib.loads(text)["telegram"]["chats"][0]["name"] == name
+
+
+def test_toml_omits_none_values():
+    """TOML has no null, so None values are left out | TOML 沒有 null，因此省略 None 值"""
+    chat_configs = [{"id": 1, "name": None, "senders": [{"id": 2, "name": None}]}]
+    text = export(chat_configs, "toml")
+    assert "None" not in text
+    assert tomllib.loads(text) == {"telegram": {"chats": [{"id": 1, "senders": [{"id": 2}]}]}}
+
+
+def test_unknown_format_is_rejected():
+    """Only yaml, json and toml are supported | 只支援 yaml、json 與 toml"""
+    with pytest.raises(ValueError):
+        iter_export([], "xml")
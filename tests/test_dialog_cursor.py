@@ -0,0 +1,108 @@
+"""
+Dialog cursor tests | 對話游標測試
+"""
+
+import asyncio
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+from telethon.tl.types import (
+    InputPeerChannel,
+    InputPeerChat,
+    InputPeerEmpty,
+    InputPeerSelf,
+    InputPeerUser,
+)
+
+from app.telegram_service import _decode_dialog_cursor, _encode_dialog_cursor
+from benchmarks.fake_telegram import chat_id
+
+
+DATE = datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("peer", [
+    InputPeerChannel(1234, -987654321),
+    InputPeerUser(42, 2**62),
+    InputPeerChat(77),
+    InputPeerSelf(),
+    InputPeerEmpty(),
+])
+def test_cursor_round_trip(peer):
+    """Every peer kind survives encode/decode | 各種對象皆可編碼後還原"""
+    cursor = _encode_dialog_cursor(DATE, 555, peer)
+
+    date, offset_id, decoded = _decode_dialog_cursor(cursor)
+
+    assert date == int(DATE.timestamp())
+    assert offset_id == 555
+    assert decoded == peer
+
+
+def test_cursor_is_url_safe():
+    """Cursors need no quoting in a query string | 游標置於查詢字串中無需跳脫"""
+    cursor = _encode_dialog_cursor(DATE, 2**31, InputPeerChannel(2**40, -(2**62)))
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+def test_cursor_without_date():
+    """A missing offset date decodes as None | 缺少的偏移日期解碼為 None"""
+    date, offset_id, peer = _decode_dialog_cursor(_encode_dialog_cursor(None, 0, InputPeerEmpty()))
+    assert (date, offset_id, peer) == (None, 0, InputPeerEmpty())
+
+
+def _tamper(cursor: str, edit) -> str:
+    """Decode, edit and re-encode a cursor's payload | 解碼、修改並重新編碼游標內容"""
+    raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    return base64.urlsafe_b64encode(json.dumps(edit(raw)).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("edit", [
+    lambda raw: raw[:-1],                       # Missing field | 缺少欄位
+    lambda raw: [*raw[:2], "x", *raw[3:]],      # Unknown peer kind | 未知的對象種類
+    lambda raw: [*raw[:3], "1234", raw[4]],     # ID as a string | ID 為字串
+    lambda raw: [raw[0], 1.5, *raw[2:]],        # Non-integer offset | 非整數偏移
+    lambda raw: {"date": raw[0]},               # Not a list | 不是列表
+])
+def test_tampered_cursor_is_rejected(edit):
+    """Edited payloads raise ValueError, not TypeError | 被修改的內容拋出 ValueError 而非 TypeError"""
+    cursor = _tamper(_encode_dialog_cursor(DATE, 1, InputPeerChannel(1, 2)), edit)
+    with pytest.raises(ValueError):
+        _decode_dialog_cursor(cursor)
+
+
+@pytest.mark.parametrize("cursor", ["zzz", "!!!", "", "e30", "bnVsbA"])
+def test_malformed_cursor_is_rejected(cursor):
+    """Garbage, '{}' and 'null' payloads raise ValueError | 亂碼、'{}' 與 'null' 內容拋出 ValueError"""
+    with pytest.raises(ValueError):
+        _decode_dialog_cursor(cursor)
+
+
+def test_pages_cover_every_dialog_once(api):
+    """Following next_cursor lists each dialog exactly once | 依 next_cursor 翻頁時每個對話只出現一次"""
+    async def run():
+        async with api(dialogs=250) as client:
+            ids = []
+            cursor = None
+            while True:
+                params = {"limit": 60, **({"cursor": cursor} if cursor else {})}
+                response = await client.get("/api/dialogs", params=params)
+                assert response.status_code == 200
+                page = response.json()
+                ids += [dialog["id"] for dialog in page["dialogs"]]
+                cursor = page["next_cursor"]
+                if not cursor:
+                    return ids
+
+    assert asyncio.run(run()) == [chat_id(i) for i in range(250)]
+
+
+def test_invalid_cursor_is_a_client_error(api):
+    """A tampered cursor is answered with 400 | 被竄改的游標回應 400"""
+    async def run():
+        async with api() as client:
+            return await client.get("/api/dialogs", params={"cursor": "zzz"})
+
+    assert asyncio.run(run()).status_code == 400
@@ -0,0 +1,58 @@
+"""
+Peer reference parsing tests | 對象參照解析測試
+"""
+
+import pytest
+
+from app.telegram_service import _parse_peer_reference
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Usernames | 用戶名
+    ("durov", ("username", "durov")),
+    ("@Durov", ("username", "durov")),
+    ("  @bench_3  ", ("username", "bench_3")),
+    # Links | 連結
+    ("https://t.me/bench_3", ("username", "bench_3")),
+    ("http://www.t.me/bench_3/", ("username", "bench_3")),
+    ("t.me/bench_3/55", ("username", "bench_3")),
+    ("t.me/bench_3?start=1", ("username", "bench_3")),
+    ("T.ME/Bench_3", ("username", "bench_3")),
+    ("telegram.me/bench_3", ("username", "bench_3")),
+    ("t.me/s/bench_5", ("username", "bench_5")),
+    # Marked and bare IDs | 標記與未標記的 ID
+    ("-1001234567890", ("id", -1001234567890)),
+    ("42", ("id", 42)),
+    (" -55 ", ("id", -55)),
+    # Private message links carry a bare channel ID | 私人訊息連結帶有未標記的頻道 ID
+    ("https://t.me/c/1004/9", ("id", -1000000001004)),
+])
+def test_parse_peer_reference(text, expected):
+    """Usernames, links and IDs are normalised | 用戶名、連結與 ID 皆被正規化"""
+    assert _parse_peer_reference(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "t.me/+abcdef",
+    "https://t.me/joinchat/AAAA",
+])
+def test_invite_links_are_rejected(text):
+    """Invite links cannot be resolved without joining | 邀請連結需加入後才能解析"""
+    with pytest.raises(ValueError, match="Invite"):
+        _parse_peer_reference(text)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "nope!",
+    "ab",
+    "1abc",
+    "a" * 33,
+    "@",
+    "t.me/",
+    "https://example.com/durov",
+])
+def test_unrecognised_text_is_rejected(text):
+    """Anything else is not a peer reference | 其他文字皆不是對象參照"""
+    with pytest.raises(ValueError):
+        _parse_peer_reference(text)
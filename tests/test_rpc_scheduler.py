@@ -0,0 +1,88 @@
+"""
+RPC scheduler tests | RPC 排程器測試
+"""
+
+import asyncio
+
+import pytest
+from telethon.errors import FloodWaitError
+
+from app.rpc_scheduler import RpcScheduler, low_priority
+
+
+def _flooding(*waits: int):
+    """RPC raising FloodWait with each wait in turn, then succeeding | 依序拋出各 FloodWait 後成功的 RPC"""
+    waits = list(waits)
+
+    async def call():
+        if waits:
+            raise FloodWaitError(request=None, capture=waits.pop(0))
+        return "ok"
+
+    return call
+
+
+def test_flood_wait_is_retried_after_the_pause():
+    """Short waits are slept through and counted | 短暫等待會被等過並計入"""
+    async def run():
+        scheduler = RpcScheduler(rate=1e9, burst=10**9)
+        result = await scheduler.call(_flooding(0, 0))
+        return result, scheduler.stats()
+
+    result, stats = asyncio.run(run())
+    assert result == "ok"
+    assert stats["calls"] == 3 and stats["retries"] == 2
+    assert stats["flood_waits"] == 2
+
+
+@pytest.mark.parametrize("waits, max_retries, expected", [
+    # Longer than max_flood_wait | 超過 max_flood_wait
+    ((60,), 3, 60.0),
+    # Retries exhausted | 重試次數用盡
+    ((0, 5), 1, 5.0),
+])
+def test_raised_flood_wait_is_counted(waits, max_retries, expected):
+    """Waits that are re-raised still add to flood_wait_seconds | 被拋出的等待仍計入 flood_wait_seconds"""
+    async def run():
+        scheduler = RpcScheduler(rate=1e9, burst=10**9, max_flood_wait=10, max_retries=max_retries)
+        with pytest.raises(FloodWaitError):
+            await scheduler.call(_flooding(*waits))
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["flood_waits"] == len(waits)
+    assert stats["flood_wait_seconds"] == expected
+
+
+def test_background_calls_are_counted():
+    """Calls inside low_priority() are background calls | low_priority() 內的呼叫為背景呼叫"""
+    async def run():
+        scheduler = RpcScheduler(rate=1e9, burst=10**9)
+        await scheduler.call(_flooding())
+        with low_priority():
+            await scheduler.call(_flooding())
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["calls"] == 2 and stats["background_calls"] == 1
+
+
+def test_foreground_calls_go_first():
+    """Queued foreground calls are served before background ones | 排隊中的前景呼叫先於背景呼叫"""
+    async def run():
+        scheduler = RpcScheduler(rate=50, burst=1)
+        order = []
+
+        async def record(name):
+            order.append(name)
+
+        async def background():
+            with low_priority():
+                await scheduler.call(record, "background")
+
+        # Drain the bucket so both calls queue | 清空 token 使兩個呼叫皆需排隊
+        await scheduler.call(record, "first")
+        await asyncio.gather(background(), scheduler.call(record, "foreground"))
+        return order
+
+    assert asyncio.run(run()) == ["first", "foreground", "background"]
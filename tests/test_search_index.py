@@ -0,0 +1,158 @@
+"""
+Search index tests | 搜尋索引測試
+"""
+
+import asyncio
+
+import pytest
+
+from app.models import DialogInfo, DialogType, SenderInfo
+from app.offline import OfflineTelegramService
+from app.search_index import KIND_DIALOG, KIND_SENDER, SearchIndex, matches_prefix
+from app.snapshot import SnapshotReader, write_snapshot
+from benchmarks.fake_telegram import chat_id
+
+
+def _ids(hits) -> list[int]:
+    return [hit.value.id for hit in hits]
+
+
+@pytest.fixture
+def index() -> SearchIndex:
+    index = SearchIndex()
+    index.set_dialogs([
+        DialogInfo(1, "Alpha Beta", DialogType.GROUP, username="alphabeta", members_count=10),
+        DialogInfo(2, "Beta", DialogType.CHANNEL, members_count=500),
+        DialogInfo(3, "Gamma Betamax", DialogType.GROUP, members_count=2000),
+        DialogInfo(4, "Ｆｕｌｌ Width", DialogType.USER),
+        DialogInfo(5, "Support Bot", DialogType.BOT),
+    ])
+    index.add_sender(SenderInfo(100, "Alice Smith", username="alice_s"), chat_id=1)
+    index.add_sender(SenderInfo(101, "Helper", username="beta_bot", is_bot=True), chat_id=2)
+    return index
+
+
+# ==================== Prefix queries | 字首查詢 ====================
+
+def test_short_query_matches_word_starts(index):
+    """One or two characters match the start of a word | 一至兩個字元比對字首"""
+    # Leading matches (name or username) first, then word starts, larger chats first
+    # 開頭相符（名稱或用戶名）在前，其次為字首，較大的聊天在前
+    assert _ids(index.search("be")) == [2, 101, 3, 1]
+    assert index.search("et") == []
+
+
+def test_short_query_ranks_exact_then_leading(index):
+    """Exact names, then leading matches, then larger chats | 完全相符、開頭相符，其次為較大的聊天"""
+    index.upsert_dialog(DialogInfo(6, "Be", DialogType.GROUP))
+    assert _ids(index.search("be", kind=KIND_DIALOG)) == [6, 2, 3, 1]
+
+
+def test_short_query_respects_filters(index):
+    """Filters narrow prefix matches | 篩選條件縮小字首結果"""
+    assert _ids(index.search("b", kind=KIND_SENDER)) == [101]
+    assert _ids(index.search("b", is_bot=False, kind=KIND_SENDER)) == []
+    assert _ids(index.search("be", types={DialogType.GROUP})) == [3, 1]
+    assert _ids(index.search("be", min_members=100, max_members=1000)) == [2]
+
+
+def test_short_query_stops_at_limit(index):
+    """The ranked walk stops once the limit is reached | 排名走訪達上限即停止"""
+    assert _ids(index.search("be", limit=2)) == [2, 101]
+
+
+# ==================== Trigram queries | 三字元組查詢 ====================
+
+def test_long_query_matches_anywhere(index):
+    """Three or more characters match inside words | 三個字元以上可比對字詞內部"""
+    assert _ids(index.search("etama")) == [3]
+    assert set(_ids(index.search("eta"))) == {1, 2, 3, 101}
+
+
+def test_long_query_needs_every_trigram(index):
+    """Sharing some trigrams is not enough | 只共有部分三字元組不算符合"""
+    assert index.search("betx") == []
+    assert index.search("xyz") == []
+
+
+def test_username_query(index):
+    """'@name' searches usernames | '@name' 搜尋用戶名"""
+    assert _ids(index.search("@alice_s")) == [100]
+    assert _ids(index.search("@alphab")) == [1]
+
+
+def test_query_is_normalized(index):
+    """Case and full-width characters are folded | 大小寫與全形字元皆統一"""
+    assert _ids(index.search("FULL")) == [4]
+    assert _ids(index.search("ｗｉ")) == [4]
+
+
+def test_empty_query_applies_filters_only(index):
+    """No text returns everything the filters allow | 無文字時回傳篩選允許的全部結果"""
+    assert _ids(index.search("", kind=KIND_DIALOG, types={DialogType.BOT})) == [5]
+    # Bot dialogs count as bots | 機器人對話視為機器人
+    assert sorted(_ids(index.search("", is_bot=True))) == [5, 101]
+
+
+# ==================== Updates | 更新 ====================
+
+def test_upsert_replaces_old_keys(index):
+    """A renamed dialog no longer matches its old name | 改名後的對話不再符合舊名稱"""
+    index.upsert_dialog(DialogInfo(2, "Delta", DialogType.CHANNEL, members_count=500))
+    assert 2 not in _ids(index.search("beta"))
+    assert _ids(index.search("delta")) == [2]
+
+
+def test_set_dialogs_removes_missing(index):
+    """A full list drops dialogs not in it but keeps senders | 完整列表會移除不在其中的對話但保留發送者"""
+    index.set_dialogs([DialogInfo(2, "Beta", DialogType.CHANNEL, members_count=500)])
+    assert index.stats()["dialogs"] == 1
+    assert _ids(index.search("al")) == [100]
+
+
+def test_sender_chats_accumulate(index):
+    """Senders remember every chat they were seen in | 發送者記錄所有出現過的聊天"""
+    index.add_sender(SenderInfo(100, "Alice Smith", username="alice_s"), chat_id=3)
+    [hit] = index.search("alice")
+    assert sorted(hit.chat_ids) == [1, 3]
+
+
+# ==================== Member prefix filter | 成員前綴篩選 ====================
+
+@pytest.mark.parametrize("prefix, expected", [
+    ("", True),
+    ("ali", True),
+    ("SMI", True),
+    ("alice_", True),
+    ("lice", False),
+    ("alice smith", False),
+])
+def test_matches_prefix(prefix, expected):
+    """Any name word or the username may start with the prefix | 任一名稱字詞或用戶名以前綴開頭即可"""
+    assert matches_prefix(SenderInfo(1, "Alice Smith", username="Alice_S"), prefix) is expected
+
+
+def test_offline_member_filter_matches_online(make_service, tmp_path):
+    """Snapshot member filters give the live service's result | 快照成員篩選與線上服務結果相同"""
+    async def run():
+        service = make_service(dialogs=3, senders_per_chat=60)
+        await service.start()
+        try:
+            senders = await service.get_messages_senders(chat_id(1), 300)
+            online = {
+                search: (await service.get_chat_senders(chat_id(1), "messages", 300, search=search))[1]
+                for search in ("", "user", "USER_100006", "1000", "x")
+            }
+        finally:
+            await service.stop()
+        return senders, online
+
+    senders, online = asyncio.run(run())
+    assert len(online[""]) == 60 and online["x"] == []
+    path = str(tmp_path / "snapshot.jsonl")
+    write_snapshot(path, [], {chat_id(1): senders})
+    offline = OfflineTelegramService(SnapshotReader(path))
+
+    for search, expected in online.items():
+        _, result = asyncio.run(offline.get_chat_senders(chat_id(1), "messages", 300, search=search))
+        assert [s.id for s in result] == [s.id for s in expected], search
@@ -0,0 +1,312 @@
+"""
+Sender index tests | 發送者索引測試
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+from telethon.errors import FloodWaitError
+
+from app.models import SenderInfo
+from app.sender_index import ScanRange, SenderIndex
+from benchmarks.fake_telegram import chat_id
+
+
+CHAT = chat_id(1)
+
+
+def _sender(user_id: int) -> SenderInfo:
+    return SenderInfo(user_id, f"User {user_id}", username=f"user_{user_id}")
+
+
+# ==================== Storage | 儲存 ====================
+
+def test_version_bumps_only_when_senders_are_found(tmp_path):
+    """Range-only writes keep the version and modification time | 只更新範圍時保留版本與修改時間"""
+    async def run():
+        index = SenderIndex(str(tmp_path / "i.db"))
+        empty = await index.get_senders(CHAT)
+
+        await index.record_scan(CHAT, ScanRange(10, 20), [(_sender(1), 20), (_sender(2), 15)])
+        first = await index.get_senders(CHAT)
+
+        await index.record_scan(CHAT, ScanRange(10, 30), [])
+        range_only = await index.get_senders(CHAT)
+
+        await index.record_scan(CHAT, ScanRange(10, 40), [(_sender(3), 40), (_sender(1), 12)])
+        second = await index.get_senders(CHAT)
+
+        index.close()
+        return empty, first, range_only, second, await index.get_range(CHAT)
+
+    empty, first, range_only, second, scan_range = asyncio.run(run())
+
+    assert (empty.version, empty.value) == (0, [])
+    assert first.version == 1 and first.modified_at > 0
+    assert range_only[:2] == first[:2]
+    assert second.version == 2 and second.modified_at >= first.modified_at
+    # Most recently active first; older sightings never move a sender back
+    # 最近活躍者在前；較舊的出現紀錄不會讓發送者往後移
+    assert [s.id for s in second.value] == [3, 1, 2]
+    assert scan_range == ScanRange(10, 40)
+
+
+def test_versions_survive_restart(tmp_path):
+    """A reopened index serves the same validators | 重新開啟的索引提供相同的驗證器"""
+    path = str(tmp_path / "i.db")
+
+    async def write():
+        index = SenderIndex(path)
+        await index.record_scan(CHAT, ScanRange(1, 5), [(_sender(1), 5)])
+        result = await index.get_senders(CHAT)
+        index.close()
+        return result
+
+    async def read():
+        index = SenderIndex(path)
+        result = await index.get_senders(CHAT)
+        index.close()
+        return result
+
+    written = asyncio.run(write())
+    assert asyncio.run(read()) == written
+
+
+def test_old_schema_is_migrated(tmp_path):
+    """Indexes written before versions were stored gain the columns | 儲存版本之前寫入的索引會補上欄位"""
+    path = str(tmp_path / "i.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE scans (chat_id INTEGER PRIMARY KEY, "
+        "min_id INTEGER NOT NULL, max_id INTEGER NOT NULL)"
+    )
+    conn.execute("INSERT INTO scans VALUES (?, 1, 5)", (CHAT,))
+    conn.commit()
+    conn.close()
+
+    async def run():
+        index = SenderIndex(path)
+        before = await index.get_senders(CHAT)
+        await index.record_scan(CHAT, ScanRange(1, 9), [(_sender(1), 9)])
+        after = await index.get_senders(CHAT)
+        index.close()
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert before[:2] == (0, 0.0)
+    assert after.version == 1
+
+
+def test_clear_deletes_the_file(tmp_path):
+    """Logging out removes the index file | 登出時移除索引檔案"""
+    path = tmp_path / "i.db"
+
+    async def run():
+        index = SenderIndex(str(path))
+        await index.record_scan(CHAT, ScanRange(1, 5), [(_sender(1), 5)])
+        await index.clear()
+
+    asyncio.run(run())
+    assert not path.exists()
+
+
+# ==================== Scanned range | 已掃描範圍 ====================
+
+def test_first_scan_records_its_range(make_service):
+    """A first scan covers the newest `limit` messages | 首次掃描涵蓋最新的 limit 則訊息"""
+    async def run():
+        service = make_service()
+        await service.start()
+        result = await service.get_messages_senders_versioned(CHAT, 100)
+        scan_range = await service._sender_index.get_range(CHAT)
+        await service.stop()
+        return result, scan_range
+
+    result, scan_range = asyncio.run(run())
+    assert scan_range == ScanRange(201, 300)
+    assert result.version == 1 and len(result.value) == 30
+
+
+def test_backfill_extends_the_range_down(make_service, count_scans):
+    """Backfill reads older messages below the range | 回填讀取範圍以下的較舊訊息"""
+    async def run():
+        service = make_service()
+        await service.start()
+        await service.get_messages_senders_versioned(CHAT, 100)
+        scans = count_scans(service)
+        await service.get_messages_senders_versioned(CHAT, 100, backfill=50)
+        scan_range = await service._sender_index.get_range(CHAT)
+        await service.stop()
+        return scans[0], scan_range
+
+    scans, scan_range = asyncio.run(run())
+    # Top-up (nothing new) then one backfill walk | 補掃（無新訊息）後進行一次回填
+    assert scans == 2
+    assert scan_range == ScanRange(151, 300)
+
+
+def test_unchanged_top_up_keeps_the_version(make_service):
+    """No new messages, no new version | 沒有新訊息則不產生新版本"""
+    async def run():
+        service = make_service()
+        await service.start()
+        first = await service.get_messages_senders_versioned(CHAT, 100)
+        second = await service.get_messages_senders_versioned(CHAT, 100)
+        await service.stop()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert second.version == first.version
+    assert second.modified_at == first.modified_at
+
+
+def test_top_up_joins_new_messages_to_the_range(make_service):
+    """New messages within the limit extend the range up | 上限內的新訊息使範圍向上延伸"""
+    async def run():
+        service = make_service()
+        await service.start()
+        await service.get_messages_senders_versioned(CHAT, 100)
+        service.options.messages_per_chat = 400
+        result = await service.get_messages_senders_versioned(CHAT, 200)
+        scan_range = await service._sender_index.get_range(CHAT)
+        await service.stop()
+        return result, scan_range
+
+    result, scan_range = asyncio.run(run())
+    assert scan_range == ScanRange(201, 400)
+    assert result.version == 2
+
+
+def test_top_up_past_the_limit_restarts_the_range(make_service):
+    """A gap below the top-up restarts the range | 補掃以下若有缺口則範圍重新起算"""
+    async def run():
+        service = make_service(messages_per_chat=1000)
+        await service.start()
+        await service.get_messages_senders_versioned(CHAT, 100)
+        service.options.messages_per_chat = 1500
+        await service.get_messages_senders_versioned(CHAT, 100)
+        scan_range = await service._sender_index.get_range(CHAT)
+        await service.stop()
+        return scan_range
+
+    assert asyncio.run(run()) == ScanRange(1401, 1500)
+
+
+def test_failed_first_scan_records_what_it_read(make_service, fail_scans):
+    """A cut-short first scan still records its contiguous part | 中斷的首次掃描仍記錄其連續部分"""
+    async def run():
+        service = make_service()
+        await service.start()
+        fail_scans(service)
+        senders = await service.get_messages_senders(CHAT, 200)
+        scan_range = await service._sender_index.get_range(CHAT)
+        versioned = await service._sender_index.get_senders(CHAT)
+        await service.stop()
+        return senders, scan_range, versioned
+
+    senders, scan_range, versioned = asyncio.run(run())
+    assert scan_range == ScanRange(261, 300)
+    assert versioned.version == 1
+    assert [s.id for s in senders] == [s.id for s in versioned.value]
+
+
+def test_failed_top_up_keeps_the_known_range(make_service, fail_scans):
+    """A cut-short top-up would leave a gap, so the range stays | 中斷的補掃會留下缺口，因此範圍不變"""
+    async def run():
+        service = make_service()
+        await service.start()
+        await service.get_messages_senders_versioned(CHAT, 100)
+        service.options.messages_per_chat = 400
+        failing = fail_scans(service)
+        failed = await service.get_messages_senders_versioned(CHAT, 200)
+        after_failure = await service._sender_index.get_range(CHAT)
+        failing["on"] = False
+        await service.get_messages_senders_versioned(CHAT, 200)
+        after_retry = await service._sender_index.get_range(CHAT)
+        await service.stop()
+        return failed, after_failure, after_retry
+
+    failed, after_failure, after_retry = asyncio.run(run())
+    assert after_failure == ScanRange(201, 300)
+    # Senders found before the failure are kept | 失敗前找到的發送者會保留
+    assert failed.version == 2
+    assert after_retry == ScanRange(201, 400)
+
+
+def test_failed_backfill_keeps_what_it_read(make_service, fail_scans):
+    """A cut-short backfill still extends the range down | 中斷的回填仍使範圍向下延伸"""
+    async def run():
+        service = make_service()
+        await service.start()
+        await service.get_messages_senders_versioned(CHAT, 100)
+        fail_scans(service, 20)
+        await service.get_messages_senders_versioned(CHAT, 100, backfill=100)
+        scan_range = await service._sender_index.get_range(CHAT)
+        await service.stop()
+        return scan_range
+
+    assert asyncio.run(run()) == ScanRange(181, 300)
+
+
+def test_flood_wait_is_raised_after_recording(make_service):
+    """FloodWait propagates, but the covered range is kept | FloodWait 會拋出，但已涵蓋的範圍會保留"""
+    async def run():
+        service = make_service()
+        await service.start()
+        original = service._client.iter_messages
+
+        async def flooding(*args, **kwargs):
+            seen = 0
+            async for message in original(*args, **kwargs):
+                seen += 1
+                if seen > 40:
+                    raise FloodWaitError(request=None, capture=30)
+                yield message
+
+        service._client.iter_messages = flooding
+        with pytest.raises(FloodWaitError):
+            await service.get_messages_senders_versioned(CHAT, 200)
+        scan_range = await service._sender_index.get_range(CHAT)
+        await service.stop()
+        return scan_range
+
+    assert asyncio.run(run()) == ScanRange(261, 300)
+
+
+# ==================== Concurrency | 並行 ====================
+
+def test_scans_of_one_chat_do_not_interleave(make_service):
+    """Each scan reads the range the previous one recorded | 每次掃描皆讀取前一次記錄的範圍"""
+    async def run():
+        service = make_service(messages_per_chat=1000)
+        await service.start()
+        index = service._sender_index
+        events = []
+        get_range, record_scan = index.get_range, index.record_scan
+
+        async def logged_get_range(chat):
+            events.append("read")
+            return await get_range(chat)
+
+        async def logged_record_scan(chat, scan_range, senders):
+            events.append("write")
+            await record_scan(chat, scan_range, senders)
+
+        index.get_range = logged_get_range
+        index.record_scan = logged_record_scan
+        await asyncio.gather(
+            service.get_messages_senders_versioned(CHAT, 50, backfill=200),
+            service.get_messages_senders_versioned(CHAT, 20),
+            service.get_messages_senders(CHAT, 100),
+        )
+        scan_range = await get_range(CHAT)
+        await service.stop()
+        return events, scan_range
+
+    events, scan_range = asyncio.run(run())
+    # Later scans start after the first one's write and find nothing new to write
+    # 之後的掃描於第一次寫入後才開始，且沒有需寫入的新內容
+    assert events == ["read", "write", "read", "read"]
+    # The first scan's backfill is kept by the scans after it | 第一次掃描的回填由之後的掃描保留
+    assert scan_range == ScanRange(751, 1000)
@@ -0,0 +1,154 @@
+"""
+Session pool tests | Session 池測試
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from app import main as app_main
+from app.rpc_scheduler import RpcScheduler
+from app.session_pool import SessionPool, is_valid_key
+from benchmarks.bench_api import FakeTelegramService
+from benchmarks.fake_telegram import FakeTelegramOptions
+
+
+@pytest.fixture
+def pool(tmp_path) -> SessionPool:
+    """Pool holding one live client | 只保留一個存活客戶端的池"""
+    def factory(key: str, api_id: int, api_hash: str) -> FakeTelegramService:
+        return FakeTelegramService(
+            FakeTelegramOptions(latency=0.0, dialogs=3),
+            api_id=api_id,
+            api_hash=api_hash,
+            session_name=os.path.join(str(tmp_path), key),
+            rpc_scheduler=RpcScheduler(rate=1e9, burst=10**9)
+        )
+
+    pool = SessionPool(factory, max_clients=1)
+    for key in "abc":
+        pool.register(key, 1, "test")
+    return pool
+
+
+def _pending_login(service) -> None:
+    """Put a service between send-code and sign-in | 使服務處於送出驗證碼與登入之間"""
+    service.auth_state.is_logged_in = False
+    service.auth_state.phone_code_hash = "hash"
+
+
+def test_leased_service_is_not_evicted(pool):
+    """A service held by a request survives going over the cap | 被請求持有的服務在超過上限時仍保留"""
+    async def run():
+        a = await pool.acquire("a")
+        await pool.get("b")
+        live_while_held = list(pool._services)
+        still_connected = a.is_connected()
+        await pool.release("a")
+        live_after_release = list(pool._services)
+        stats = pool.stats()
+        await pool.close()
+        return live_while_held, still_connected, live_after_release, stats
+
+    live_while_held, still_connected, live_after_release, stats = asyncio.run(run())
+    assert live_while_held == ["a", "b"] and still_connected
+    # The deferred eviction runs on release | 延後的淘汰於釋放時執行
+    assert live_after_release == ["b"]
+    assert stats["in_use"] == 0 and stats["evictions"] == 1
+
+
+def test_nested_leases_hold_until_the_last_release(pool):
+    """Concurrent requests on one key each hold it | 同一鍵的並行請求各自持有"""
+    async def run():
+        await pool.acquire("a")
+        await pool.acquire("a")
+        await pool.get("b")
+        await pool.release("a")
+        after_first = list(pool._services)
+        await pool.release("a")
+        after_second = list(pool._services)
+        await pool.close()
+        return after_first, after_second
+
+    after_first, after_second = asyncio.run(run())
+    # The older "a" is still held, so the cap is met by evicting "b"
+    # 較舊的 "a" 仍被持有，因此以淘汰 "b" 符合上限
+    assert after_first == ["a"]
+    assert after_second == ["a"]
+
+
+def test_pending_login_is_not_evicted(pool):
+    """A session waiting for its login code keeps its client | 等待登入驗證碼的 session 保留其客戶端"""
+    async def run():
+        _pending_login(await pool.get("b"))
+        await pool.get("c")
+        live = list(pool._services)
+        await pool.close()
+        return live
+
+    assert asyncio.run(run()) == ["b", "c"]
+
+
+def test_evicted_unauthorized_key_is_forgotten(pool):
+    """Keys that never logged in lose their credentials and lock | 從未登入的鍵會失去憑證與鎖"""
+    async def run():
+        b = await pool.get("b")
+        _pending_login(b)
+        await pool.get("c")
+        # The login was abandoned | 登入已放棄
+        b.auth_state.phone_code_hash = None
+        await pool.get("a")
+        state = list(pool._services), sorted(pool._credentials), sorted(pool._locks)
+        await pool.close()
+        return state
+
+    live, credentials, locks = asyncio.run(run())
+    assert live == ["a"]
+    assert credentials == ["a", "c"]
+    assert locks == ["a"]
+
+
+def test_evict_idle_skips_leased(pool):
+    """Idle reaping leaves held services alone | 閒置回收不影響被持有的服務"""
+    async def run():
+        pool.max_clients = 3
+        pool.idle_timeout = 0
+        await pool.acquire("a")
+        await pool.get("b")
+        await pool.evict_idle()
+        live = list(pool._services)
+        await pool.release("a")
+        await pool.close()
+        return live
+
+    assert asyncio.run(run()) == ["a"]
+
+
+@pytest.mark.parametrize("key, valid", [
+    ("default", True),
+    ("a-b_C9", True),
+    ("", False),
+    (None, False),
+    ("../x", False),
+    ("a" * 65, False),
+])
+def test_is_valid_key(key, valid):
+    """Keys become file names, so only safe characters pass | 鍵會成為檔名，因此只允許安全字元"""
+    assert is_valid_key(key) is valid
+
+
+def test_requests_release_their_lease(api):
+    """LeaseMiddleware releases the service after each response | LeaseMiddleware 於每次回應後釋放服務"""
+    async def run():
+        async with api() as client:
+            responses = [
+                await client.get("/api/dialogs"),
+                await client.get("/api/dialogs/stream"),
+                await client.get("/api/search?q=bench"),
+            ]
+            return responses, app_main.session_pool.stats()["in_use"]
+
+    responses, in_use = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert in_use == 0
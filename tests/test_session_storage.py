@@ -0,0 +1,74 @@
+"""
+Session storage tests | Session 儲存測試
+"""
+
+from typing import Optional
+
+import pytest
+from telethon.tl.types import User
+
+from app.session_storage import FileSessionStore, SessionStore, SnapshotSession
+
+
+def test_incomplete_store_fails_when_created():
+    """A store missing a method cannot be instantiated | 缺少方法的儲存後端無法建立實例"""
+    class LoadOnly(SessionStore):
+        def load(self) -> Optional[dict]:
+            return None
+
+    with pytest.raises(TypeError, match="delete"):
+        LoadOnly()
+
+
+def test_complete_store_can_be_created():
+    """Stores implementing every method work as before | 實作所有方法的儲存後端照常運作"""
+    class Memory(SessionStore):
+        def __init__(self):
+            self.snapshot = None
+
+        def load(self) -> Optional[dict]:
+            return self.snapshot
+
+        def save(self, snapshot: dict) -> None:
+            self.snapshot = snapshot
+
+        def delete(self) -> None:
+            self.snapshot = None
+
+    store = Memory()
+    store.save({"version": 1})
+    assert store.load() == {"version": 1}
+
+
+def test_file_store_round_trip(tmp_path):
+    """Snapshots survive a save and load through a file | 快照經由檔案儲存與讀取後保持不變"""
+    store = FileSessionStore(str(tmp_path / "s.session.json"))
+    assert store.load() is None
+
+    session = SnapshotSession()
+    session.process_entities([User(id=9, access_hash=1, first_name="Nine", username="nine")])
+    store.save(session.to_snapshot())
+
+    restored = SnapshotSession(store.load())
+    assert restored.get_entity_rows_by_id(9) == (9, 1)
+    assert restored.get_entity_rows_by_username("nine") == (9, 1)
+
+    store.delete()
+    store.delete()
+    assert store.load() is None
+
+
+def test_snapshot_session_tracks_changes():
+    """Only real changes mark the session dirty | 只有實際變更會標記 session 為已變更"""
+    user = User(id=9, access_hash=1, first_name="Nine", username="nine")
+    session = SnapshotSession()
+    session.process_entities([user])
+    assert session.dirty
+
+    session.to_snapshot()
+    session.process_entities([user])
+    assert not session.dirty
+
+    session.process_entities([User(id=9, access_hash=1, first_name="Nine", username="renamed")])
+    assert session.dirty
+    assert session.get_entity_rows_by_username("nine") is None
@@ -0,0 +1,188 @@
+"""
+TelegramService tests on the fake backend | 以模擬後端進行的 TelegramService 測試
+"""
+
+import asyncio
+
+import pytest
+from telethon.errors import FloodWaitError
+
+from benchmarks.fake_telegram import chat_id
+
+
+CHAT = chat_id(1)
+
+
+def _ids(senders) -> list[int]:
+    return [sender.id for sender in senders]
+
+
+# ==================== Coalescing | 請求合併 ====================
+
+@pytest.mark.parametrize("index", [True, False])
+def test_concurrent_scans_share_one_walk(make_service, count_scans, index):
+    """Plain, versioned and batch scans of one chat share a walk | 同一聊天的一般、帶版本與批次掃描共用一次走訪"""
+    async def run():
+        service = make_service(index=index, latency=0.005)
+        await service.start()
+        scans = count_scans(service)
+
+        async def batch():
+            return [result async for result in service.scan_senders_batch([CHAT], limit=100)]
+
+        plain, versioned, [batched] = await asyncio.gather(
+            service.get_messages_senders(CHAT, 100),
+            service.get_messages_senders_versioned(CHAT, 100),
+            batch(),
+        )
+        await service.stop()
+        return scans[0], plain, versioned, batched
+
+    scans, plain, versioned, batched = asyncio.run(run())
+    assert scans == 1
+    assert _ids(versioned.value) == _ids(plain) == _ids(batched.senders)
+    assert len(plain) == 30 and versioned.version > 0 and batched.error is None
+
+
+def test_batch_scans_use_the_sender_index(make_service, count_scans):
+    """Batch results land in the index and later batches only top up | 批次結果寫入索引，之後的批次只補掃"""
+    async def run():
+        service = make_service()
+        await service.start()
+        chats = [chat_id(i) for i in range(3)]
+        first = {r.chat_id: r async for r in service.scan_senders_batch(chats, limit=100)}
+        ranges = [await service._sender_index.get_range(chat) for chat in chats]
+
+        rpc_before = service._client.rpc_calls.get("messages.getHistory", 0)
+        second = {r.chat_id: r async for r in service.scan_senders_batch(chats, limit=100)}
+        rpc_after = service._client.rpc_calls.get("messages.getHistory", 0)
+
+        single = await service.get_messages_senders(chats[0], 100)
+        await service.stop()
+        return chats, first, ranges, second, rpc_after - rpc_before, single
+
+    chats, first, ranges, second, history_rpcs, single = asyncio.run(run())
+    assert all(scan_range is not None for scan_range in ranges)
+    # Nothing newer than the indexed range | 沒有比已索引範圍更新的訊息
+    assert history_rpcs == 0
+    assert [_ids(second[chat].senders) for chat in chats] == [_ids(first[chat].senders) for chat in chats]
+    assert _ids(single) == _ids(first[chats[0]].senders)
+
+
+def test_batch_reports_errors_per_chat(make_service):
+    """One failing chat does not hide the others | 單一聊天失敗不影響其他聊天"""
+    async def run():
+        service = make_service(index=False)
+        await service.start()
+        original = service._client.iter_messages
+
+        def flaky(entity, *args, **kwargs):
+            if int(entity) == chat_id(0):
+                raise FloodWaitError(request=None, capture=12)
+            if int(entity) == chat_id(1):
+                raise RuntimeError("broken chat")
+            return original(entity, *args, **kwargs)
+
+        service._client.iter_messages = flaky
+        results = {
+            r.chat_id: r
+            async for r in service.scan_senders_batch([chat_id(i) for i in range(3)], limit=50)
+        }
+        await service.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert "12 seconds" in results[chat_id(0)].error
+    assert results[chat_id(1)].error == "broken chat"
+    assert results[chat_id(2)].error is None and results[chat_id(2)].senders
+
+
+# ==================== Failed scans | 失敗的掃描 ====================
+
+def test_failed_scan_is_served_unversioned_and_not_repeated(make_service, count_scans, fail_scans):
+    """Without the index, an uncacheable scan runs once with version 0 | 無索引時，無法快取的掃描只執行一次且版本為 0"""
+    async def run():
+        service = make_service(index=False)
+        await service.start()
+        fail_scans(service)
+        scans = count_scans(service)
+        result = await service.get_messages_senders_versioned(CHAT, 200)
+        await service.stop()
+        return scans[0], result
+
+    scans, result = asyncio.run(run())
+    assert scans == 1
+    assert result.version == 0
+    assert len(result.value) == 30
+
+
+def test_complete_scan_is_served_from_cache(make_service, count_scans):
+    """Without the index, a complete scan is cached and versioned | 無索引時，完整掃描會被快取並帶版本"""
+    async def run():
+        service = make_service(index=False)
+        await service.start()
+        scans = count_scans(service)
+        first = await service.get_messages_senders_versioned(CHAT, 200)
+        second = await service.get_messages_senders_versioned(CHAT, 200)
+        await service.stop()
+        return scans[0], first, second
+
+    scans, first, second = asyncio.run(run())
+    assert scans == 1
+    assert first.version > 0 and second == first
+
+
+# ==================== Warm-up | 預熱 ====================
+
+def test_warm_up_targets_latest_activity(make_service):
+    """Pinned dialogs do not push recent chats out of the warm-up | 置頂對話不會把最近的聊天擠出預熱"""
+    async def run():
+        service = make_service(index=False, dialogs=10)
+        await service.start()
+        original = service._client.iter_dialogs
+
+        async def pinned_first(*args, **kwargs):
+            dialogs = [dialog async for dialog in original(*args, **kwargs)]
+            # The oldest chat is pinned to the top | 最舊的聊天被置頂
+            for dialog in [dialogs[-1], *dialogs[:-1]]:
+                yield dialog
+
+        service._client.iter_dialogs = pinned_first
+        scanned = []
+        iter_messages_senders = service.iter_messages_senders
+
+        def record(chat, *args, **kwargs):
+            scanned.append(chat)
+            return iter_messages_senders(chat, *args, **kwargs)
+
+        service.iter_messages_senders = record
+        warmed = await service.warm_up(top=3, limit=50)
+        await service.stop()
+        return warmed, scanned
+
+    warmed, scanned = asyncio.run(run())
+    assert warmed == 3
+    assert scanned == [chat_id(i) for i in range(3)]
+
+
+def test_warm_up_does_not_share_interactive_fetches(make_service):
+    """A request during warm-up fetches at normal priority | 預熱期間的請求以一般優先權取得"""
+    async def run():
+        service = make_service(index=False, dialogs=10, latency=0.005)
+        await service.start()
+        background_before = service._scheduler.background_calls
+        warm_up = asyncio.create_task(service.warm_up(top=3, limit=50))
+        await asyncio.sleep(0)
+        dialogs = await service.get_dialogs()
+        await warm_up
+        stats = service._scheduler.stats()
+        await service.stop()
+        return dialogs, stats["background_calls"] - background_before, service._client.rpc_calls
+
+    dialogs, background_calls, rpc_calls = asyncio.run(run())
+    assert len(dialogs) == 10
+    # The request made its own dialog fetch | 請求自行取得對話列表
+    assert rpc_calls["messages.getDialogs"] == 2
+    # Warm-up RPCs only: one dialog page and one history page per chat
+    # 僅預熱 RPC：一頁對話與每個聊天一頁歷史
+    assert background_calls == 4